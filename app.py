@@ -22,12 +22,22 @@ from controllers.productadmin_controller import ProductAdminController
 from controllers.order_admin_controller import OrderAdminController
 from controllers.pages_controller import PagesController
 from controllers.inbox_user_controller import InboxUserController
+from controllers.search_controller import SearchController
 from forms.signup_form import SignupForm
 from forms.forgot_password_form import ForgotPasswordForm
+from utils.db import init_db
+from utils.cache import init_cache
+from utils.images import init_images
+from utils.assets import init_assets, asset_response
+from utils.http import send_media
+from utils.compression import init_compression
+from utils.log import init_logging
+from utils.idempotency import idempotent, init_idempotency
 
 app = Flask(__name__, template_folder='views/templates', static_folder='views/static')
 CORS(app, supports_credentials=True, origins=['*'])
-logging.basicConfig(level=logging.DEBUG)
+# LOG_LEVEL / LOG_LEVELS / LOG_FORMAT from the environment; JSON lines with request ids
+init_logging(app)
 logger = logging.getLogger(__name__)
 
 # Fixed secret key to avoid session issues
@@ -43,6 +53,19 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Pooled SQLite connections, released back to the pool on app context teardown
+init_db(app)
+# Catalog cache: invalidated by product admin writes, TTL covers out-of-band edits
+init_cache(app)
+# Background pool that builds resized WebP/AVIF variants of uploaded images
+init_images(app)
+# Content-hashed asset URLs: url_for('serve_assets', ...) emits them, hashed once at startup
+init_assets(app)
+# gzip / brotli / zstd for JSON and HTML responses, negotiated per request
+init_compression(app)
+# Idempotency-Key replay window for the order-creating endpoints
+init_idempotency(app)
+
 # Initialize controllers
 auth_controller = AuthController()
 signup_controller = SignupController()
@@ -63,6 +86,7 @@ user_management_controller = UserManagementController()
 order_admin_controller = OrderAdminController()
 pages_controller = PagesController()
 inbox_user_controller = InboxUserController()
+search_controller = SearchController()
 
 
 # Register user routes from user_controller
@@ -135,6 +159,10 @@ def admin_products():
 def get_products():
     return product_controller.get_products()
 
+@app.route('/api/products/stock', methods=['GET'])
+def get_product_stock():
+    return product_controller.get_product_stock()
+
 @app.route('/api/products/<product_id>', methods=['GET'])
 def get_product_by_id(product_id):
     return product_controller.get_product_by_id(product_id)
@@ -161,6 +189,11 @@ def update_cart_item():
 def remove_from_cart():
     return cart_controller.remove_from_cart()
 
+@app.route('/api/cart/batch', methods=['POST'])
+@idempotent
+def batch_update_cart():
+    return cart_controller.batch_update_cart()
+
 @app.route('/checkout')
 def checkout():
     return checkout_controller.checkout()
@@ -172,6 +205,7 @@ def checkout_api():
     return checkout_controller.add_checkout()
 
 @app.route('/api/create-order', methods=['POST'])
+@idempotent
 def create_user_order():
     return order_controller.create_user_order()
 
@@ -229,6 +263,11 @@ def inbox():
     logger.debug("Accessing inbox route")
     return inbox_controller.inbox()
 
+@app.route('/inbox/stream')
+def inbox_stream():
+    logger.debug("Accessing inbox event stream")
+    return inbox_controller.stream()
+
 @app.route('/get_threads')
 def get_threads():
     logger.debug("Accessing get_threads API")
@@ -252,17 +291,30 @@ def send_message():
 def user_messages(user_id):
     return inbox_user_controller.get_user_messages(user_id)
 
+@app.route('/user_messages/<user_id>/stream')
+def user_messages_stream(user_id):
+    return inbox_user_controller.stream(user_id)
+
 
 @app.route('/assign_admin', methods=['POST'])
 def assign_admin():
     logger.debug("Accessing assign_admin API")
     return inbox_controller.assign_admin()
 
+@app.route('/api/search')
+def search():
+    logger.debug("Accessing search API")
+    return search_controller.search()
+
 @app.route('/order_lists')
 def order_lists():
     logger.debug("Accessing order_lists route")
     return order_lists_controller.order_lists()
 
+@app.route('/api/order_lists', methods=['GET'])
+def get_order_lists():
+    return order_lists_controller.get_orders()
+
 @app.route('/stock/add', methods=['POST'])
 def add_stock_item():
     logger.debug("Accessing add_stock_item API")
@@ -445,7 +497,7 @@ def serve_static(filename):
             return jsonify({"error": f"Yêu cầu không hợp lệ: {filename}"}), 404
         if filename.startswith('templates/'):
             filename = filename[len('templates/'):]
-        return send_from_directory('views/templates', filename)
+        return asset_response(filename) or send_media('views/templates', filename)
     except Exception as e:
         logger.error(f"Lỗi khi phục vụ tệp tĩnh {filename}: {str(e)}")
         return jsonify({"error": f"Không tìm thấy tệp: {filename}"}), 404
@@ -453,7 +505,7 @@ def serve_static(filename):
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
     try:
-        return send_from_directory('views/templates', filename)
+        return asset_response(filename) or send_media('views/templates', filename)
     except Exception as e:
         logger.error(f"Lỗi khi phục vụ tệp tài nguyên {filename}: {str(e)}")
         return jsonify({"error": f"Không tìm thấy tệp: {filename}"}), 404
@@ -470,8 +522,10 @@ def serve_review_image(filename):
         return jsonify({"error": f"Lỗi khi phục vụ tệp: {str(e)}"}), 500
 
 # Log registered routes at startup
-logger.info(f"Registered routes: {[rule.rule for rule in app.url_map.iter_rules()]}")
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("Registered routes: %s", [rule.rule for rule in app.url_map.iter_rules()])
 
 if __name__ == '__main__':
     logger.info("Starting Flask server with /get_customer_id endpoint - Version 2025-06-15-v4")
-    app.run(debug=True)
\ No newline at end of file
+    # threaded: each open event stream occupies a worker thread
+    app.run(debug=True, threaded=True)
\ No newline at end of file
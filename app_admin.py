@@ -12,11 +12,29 @@ from wtforms import StringField, PasswordField, SubmitField, DateField
 from wtforms.validators import DataRequired, Email, Length, Optional
 from flask_cors import CORS
 import logging
+from utils.db import get_db_connection, init_db
+from utils.cache import store_cache
+from models.stock_reservation import StockReservation
+from models.order_model import OrderModel
+from utils.ids import next_id, next_ids
+from models.cart_model import CartModel
+from models.dashboard import Dashboard
+from models.order_lists import OrderLists, ORDER_PAGE_SIZE, ORDER_MAX_PAGE_SIZE
+from models.pages import Pages, INVOICE_PAGE_SIZE, INVOICE_MAX_PAGE_SIZE
+from models.inbox import (Inbox, parse_message_cursor, MESSAGE_PAGE_SIZE, MESSAGE_MAX_PAGE_SIZE,
+                          THREAD_PAGE_SIZE, THREAD_MAX_PAGE_SIZE)
+from models.inbox_user import InboxUser
+from utils.images import image_pipeline, init_images
+from utils.assets import init_assets, asset_response
+from utils.compression import init_compression
+from utils.log import init_logging
+from utils.idempotency import idempotent, init_idempotency
+from utils.http import send_media
 
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 CORS(app, supports_credentials=True, origins=['*'])
-logging.basicConfig(level=logging.DEBUG)
+init_logging(app)
 logger = logging.getLogger(__name__)
 
 class SignupForm(FlaskForm):
@@ -49,12 +67,12 @@ if not os.path.exists(UPLOAD_FOLDER):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Kết nối database
-def get_db_connection():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA foreign_keys = ON')
-    return conn
+# Kết nối database: dùng chung pool và pragma của utils/db
+init_db(app)
+init_images(app)
+init_assets(app, 'templates')
+init_compression(app)
+init_idempotency(app)
 
 # Format tiền tệ
 def format_currency(value):
@@ -76,111 +94,50 @@ def dashboard():
         print("No admin_id in session, redirecting to login")
         flash("Vui lòng đăng nhập với tư cách admin", "error")
         return redirect(url_for('login'))
-    
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        admin_id = session['admin_id']  # Không dùng giá trị mặc định nữa
-        print(f"Fetching admin with admin_id={admin_id}")
-        cursor.execute('SELECT first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
-        admin = cursor.fetchone()
-        if not admin:
-            print(f"Admin not found for admin_id={admin_id}")
-            flash("Tài khoản admin không tồn tại", "error")
-            session.pop('admin_id', None)
-            conn.close()
-            return redirect(url_for('login'))
-
-        cursor.execute('SELECT COUNT(*) as count FROM users')
-        total_users = cursor.fetchone()['count']
-        print(f"Total users: {total_users}")
-
-        cursor.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'Delivered'")
-        total_orders = cursor.fetchone()['count']
-        print(f"Total delivered orders: {total_orders}")
-
-        cursor.execute("""
-            SELECT SUM(od.total_price) as total 
-            FROM order_details od
-            JOIN orders o ON od.order_id = o.order_id
-            WHERE o.status = 'Delivered'
-        """)
-        total_sales = cursor.fetchone()['total'] or 0
-        print(f"Total sales: {total_sales}")
-
-        cursor.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'Pending'")
-        total_pending = cursor.fetchone()['count']
-        print(f"Total pending orders: {total_pending}")
-
-        sales_data = [0] * 12
-        cursor.execute("""
-            SELECT strftime('%m', o.order_date) as month, SUM(od.total_price) as total
-            FROM order_details od
-            JOIN orders o ON od.order_id = o.order_id
-            WHERE o.status = 'Delivered' AND strftime('%Y', o.order_date) = '2025'
-            GROUP BY month
-        """)
-        for row in cursor:
-            month = int(row['month']) - 1
-            sales_data[month] = row['total'] / 1_000_000 if row['total'] else 0
-        print(f"Sales data: {sales_data}")
-
-        cursor.execute("""
-            SELECT p.product_name, s.address as location, o.order_date,
-                   od.quantity, od.total_price, o.status
-            FROM order_details od
-            JOIN products p ON od.product_id = p.product_id
-            JOIN orders o ON od.order_id = o.order_id
-            JOIN stores s ON o.store_id = s.store_id
-            WHERE o.status IN ('Delivered', 'Pending')
-            ORDER BY o.order_date DESC
-            LIMIT 10
-        """)
-        deals = []
-        for row in cursor:
-            status_color = {'Delivered': 'success', 'Pending': 'warning', 'Cancelled': 'danger'}.get(row['status'], 'secondary')
-            deals.append({
-                'product_name': row['product_name'],
-                'location': row['location'],
-                'order_date': row['order_date'],
-                'quantity': row['quantity'],
-                'total_price': row['total_price'],
-                'status': row['status'],
-                'status_color': status_color
-            })
-        print(f"Deals: {deals}")
-
-        conn.close()
 
+    try:
+        # Số liệu đọc từ bảng tổng hợp (models/dashboard.py), không quét lại orders/order_details
+        admin_id = session['admin_id']
+        dashboard_data = Dashboard.get_dashboard_data(admin_id, request.args.get('year', type=int), request.args.get('store') or None)
         return render_template(
             'admin_dashboard/dashboard/dashboard.html',
-            total_users=total_users,
-            total_orders=total_orders,
-            total_sales=total_sales,
-            total_pending=total_pending,
+            total_users=dashboard_data['total_users'],
+            total_orders=dashboard_data['total_orders'],
+            total_sales=dashboard_data['total_sales'],
+            total_pending=dashboard_data['total_pending'],
             user_percentage=8.5,
             order_percentage=1.3,
             sales_percentage=4.3,
             pending_percentage=1.8,
-            sales_data=sales_data,
-            deals=deals,
-            admin=dict(admin)
+            sales_data=dashboard_data['sales_data'],
+            year=dashboard_data['year'],
+            years=dashboard_data['years'],
+            deals=dashboard_data['deals'],
+            admin=dashboard_data['admin']
         )
-    except sqlite3.Error as e:
-        if conn:
-            conn.close()
-        print(f"Database error in dashboard: {str(e)}")
-        flash(f"Lỗi cơ sở dữ liệu: {str(e)}", "error")
-        return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+    except ValueError as e:
+        print(f"Admin not found for admin_id={session.get('admin_id')}")
+        flash("Tài khoản admin không tồn tại", "error")
+        session.pop('admin_id', None)
+        return redirect(url_for('login'))
     except Exception as e:
-        if conn:
-            conn.close()
         print(f"Unexpected error in dashboard: {str(e)}")
         flash(f"Lỗi: {str(e)}", "error")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def order_list_args():
+    # Same filters and keyset paging as OrderListsController
+    filters = {
+        'status': request.args.get('status') or None,
+        'store_id': request.args.get('store') or None,
+        'customer_id': request.args.get('customer') or None,
+        'date_from': request.args.get('from') or None,
+        'date_to': request.args.get('to') or None
+    }
+    limit = request.args.get('limit', ORDER_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, ORDER_MAX_PAGE_SIZE))
+    return filters, request.args.get('cursor') or None, limit
+
 @app.route('/order_lists')
 def order_lists():
     if 'admin_id' not in session:
@@ -188,51 +145,20 @@ def order_lists():
         return redirect(url_for('login'))
     conn = None
     try:
+        filters, cursor, limit = order_list_args()
+        page = OrderLists.get_orders(cursor=cursor, limit=limit, **filters)
         conn = get_db_connection()
         cursor = conn.cursor()
         admin_id = session['admin_id']
-        cursor.execute("""
-            SELECT 
-                o.order_id, 
-                u.first_name, 
-                u.last_name, 
-                o.order_date, 
-                o.status,
-                o.order_date AS raw_date
-            FROM orders o
-            JOIN users u ON o.customer_id = u.customer_id
-        """)
-        orders = []
-        for row in cursor.fetchall():
-            order = dict(row)
-            cursor.execute("""
-                SELECT 
-                    p.product_name, 
-                    od.quantity, 
-                    ps.size, 
-                    od.total_price
-                FROM order_details od
-                JOIN products p ON od.product_id = p.product_id
-                JOIN product_size ps ON od.size_id = ps.size_id
-                WHERE od.order_id = ?
-            """, (order['order_id'],))
-            order_details = cursor.fetchall()
-            order['product_list'] = [f"{detail['product_name']} x{detail['quantity']}" for detail in order_details]
-            order['size_list'] = [detail['size'] for detail in order_details]
-            order['price_list'] = [detail['total_price'] for detail in order_details]
-            formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
-            order['order_date'] = formatted_date
-            order['status_color'] = {
-                'Delivered': 'success',
-                'Pending': 'warning',
-                'Cancelled': 'danger',
-                'Processing': 'info'
-            }.get(order['status'], 'secondary')
-            orders.append(order)
         cursor.execute('SELECT first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
         admin = cursor.fetchone() or {'first_name': 'Admin', 'last_name': ''}
         conn.close()
-        return render_template('admin_dashboard/dashboard/order_lists.html', orders=orders, admin=admin)
+        return render_template('admin_dashboard/dashboard/order_lists.html', orders=page['orders'],
+                               next_cursor=page['next_cursor'], filters=filters, admin=dict(admin))
+    except ValueError as e:
+        if conn:
+            conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except sqlite3.Error as e:
         if conn:
             conn.close()
@@ -242,6 +168,20 @@ def order_lists():
             conn.close()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/order_lists', methods=['GET'])
+def get_order_lists():
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
+    try:
+        filters, cursor, limit = order_list_args()
+        page = OrderLists.get_orders(cursor=cursor, limit=limit, **filters)
+        return jsonify({'success': True, 'orders': page['orders'], 'next_cursor': page['next_cursor']})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error("Error in get_order_lists: %s", e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/order/options')
 def order_options():
     conn = None
@@ -257,7 +197,9 @@ def order_options():
                            'price', ps.price,
                            'size_id', ps.size_id
                        )
-                   ) FROM product_size ps WHERE ps.product_id = p.product_id) AS sizes
+                   ) FROM (SELECT size, price, size_id FROM product_size
+                           WHERE product_id = p.product_id
+                           ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END) ps) AS sizes
             FROM products p
         """)
         products = [
@@ -293,6 +235,7 @@ def order_options():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/order/create', methods=['POST'])
+@idempotent
 def create_order():
     conn = None
     try:
@@ -339,8 +282,11 @@ def create_order():
             return jsonify({'success': False, 'message': 'ID cửa hàng không hợp lệ'}), 400
 
         order_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        order_id = str(uuid.uuid4())[:8]
-        order_detail_id = str(uuid.uuid4())[:8]
+        order_id = next_id('orders', conn)
+        order_detail_id = next_id('order_details', conn)
+        # Trừ tồn kho có điều kiện trong cùng giao dịch (models/stock_reservation.py)
+        if status != 'Cancelled':
+            StockReservation.reserve(cursor, order_id, [(product_id, quantity)], hold=status != 'Delivered')
         cursor.execute("""
             INSERT INTO orders (order_id, customer_id, order_date, status, store_id)
             VALUES (?, ?, ?, ?, ?)
@@ -403,6 +349,11 @@ def create_order():
             conn.rollback()
             conn.close()
         return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+    except ValueError as e:
+        if conn:
+            conn.rollback()
+            conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         if conn:
             conn.rollback()
@@ -460,6 +411,8 @@ def update_order(order_id):
             conn.close()
             return jsonify({'success': False, 'message': 'ID cửa hàng không hợp lệ'}), 400
 
+        # Trả phần đã giữ của đơn về kho rồi giữ lại theo dòng mới, trước khi đổi trạng thái
+        StockReservation.rebook(cursor, order_id, [(product_id, quantity)], status)
         cursor.execute("""
             UPDATE orders
             SET customer_id = ?, status = ?, store_id = ?
@@ -468,7 +421,7 @@ def update_order(order_id):
 
         cursor.execute('DELETE FROM order_details WHERE order_id = ?', (order_id,))
 
-        order_detail_id = str(uuid.uuid4())[:8]
+        order_detail_id = next_id('order_details', conn)
         cursor.execute("""
             INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -526,6 +479,11 @@ def update_order(order_id):
             conn.rollback()
             conn.close()
         return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+    except ValueError as e:
+        if conn:
+            conn.rollback()
+            conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         if conn:
             conn.rollback()
@@ -773,6 +731,7 @@ def get_product(product_id):
             SELECT size_id, size, price
             FROM product_size
             WHERE product_id = ?
+            ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
         """, (product_id,))
         sizes = [{'size_id': row['size_id'], 'size': row['size'], 'price': row['price']} for row in cursor.fetchall()]
 
@@ -883,23 +842,23 @@ def add_product():
             except ValueError:
                 return jsonify({'success': False, 'message': 'Giá trị chiết khấu không hợp lệ.'}), 400
 
+        # ID lấy trước khi mở giao dịch (utils/ids.py), không cần đọc lại dòng vừa thêm
+        product_id = next_id('products')
+        size_ids = next_ids('product_size', len(sizes))
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
             INSERT INTO products (product_id, product_name, stock, description, image_url, image_url_2, discount, category)
-            VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)
-        """, (product_name, stock, description, image_url, image_url_2, discount_value, category))
-
-        cursor.execute("SELECT product_id FROM products WHERE rowid = last_insert_rowid()")
-        product_id = cursor.fetchone()['product_id']
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (product_id, product_name, stock, description, image_url, image_url_2, discount_value, category))
 
         price_m_value = None
-        for size, price in sizes:
+        for (size, price), size_id in zip(sizes, size_ids):
             cursor.execute("""
                 INSERT INTO product_size (size_id, product_id, size, price)
-                VALUES (NULL, ?, ?, ?)
-            """, (product_id, size, price))
+                VALUES (?, ?, ?, ?)
+            """, (size_id, product_id, size, price))
             if size == 'M':
                 price_m_value = price
 
@@ -912,6 +871,9 @@ def add_product():
 
         conn.commit()
         conn.close()
+        # Ảnh thu nhỏ WebP/AVIF được tạo trong luồng nền
+        image_pipeline.submit(image_path, image_url)
+        image_pipeline.submit(image_path_2, image_url_2)
 
         return jsonify({
             'success': True,
@@ -1069,6 +1031,7 @@ def edit_product(product_id):
         # Xử lý ảnh mới
         image_file = request.files.get('image_file')
         image_file_2 = request.files.get('image_file_2')
+        uploads = []
 
         if image_file and image_file.filename and allowed_file(image_file.filename):
             filename = secure_filename(image_file.filename)
@@ -1077,6 +1040,7 @@ def edit_product(product_id):
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
             image_file.save(file_path)
             image_url = f"/{file_path}"
+            uploads.append((file_path, image_url))
 
         if image_file_2 and image_file_2.filename and allowed_file(image_file_2.filename):
             filename = secure_filename(image_file_2.filename)
@@ -1085,6 +1049,7 @@ def edit_product(product_id):
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
             image_file_2.save(file_path)
             image_url_2 = f"/{file_path}"
+            uploads.append((file_path, image_url_2))
 
         # Cập nhật sản phẩm
         cursor.execute("""
@@ -1136,8 +1101,8 @@ def edit_product(product_id):
                 # Thêm kích thước mới
                 cursor.execute("""
                     INSERT INTO product_size (size_id, product_id, size, price)
-                    VALUES (NULL, ?, ?, ?)
-                """, (product_id, size, price))
+                    VALUES (?, ?, ?, ?)
+                """, (next_id('product_size', conn), product_id, size, price))
             if size == 'M':
                 price_m_value = price
 
@@ -1164,6 +1129,8 @@ def edit_product(product_id):
 
         conn.commit()
         conn.close()
+        for path, url in uploads:
+            image_pipeline.submit(path, url)
 
         return jsonify({
             'success': True,
@@ -1310,9 +1277,9 @@ def add_favorite():
             conn.close()
             return jsonify({'success': False, 'message': 'Product already in favorites'}), 400
         cursor.execute("""
-            INSERT INTO favorites (admin_id, product_id)
-            VALUES (?, ?)
-        """, (admin_id, product_id))
+            INSERT INTO favorites (favorite_id, admin_id, product_id)
+            VALUES (?, ?, ?)
+        """, (next_id('favorites', conn), admin_id, product_id))
         conn.commit()
         conn.close()
         return jsonify({'success': True})
@@ -1418,25 +1385,27 @@ def add_stock():
         if not all([item_name, category, stock_quantity >= 0, store_id]):
             return jsonify({'success': False, 'message': 'Missing or invalid fields'}), 400
 
+        stock_item_id = next_id('stock_items')
         conn = get_db_connection()
         cursor = conn.cursor()
 
         last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cursor.execute("""
-            INSERT INTO stock_items (item_name, category, stock_quantity, store_id, last_updated)
-            VALUES (?, ?, ?, ?, ?)
-        """, (item_name, category, stock_quantity, store_id, last_updated))
+            INSERT INTO stock_items (stock_item_id, item_name, category, stock_quantity, store_id, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (stock_item_id, item_name, category, stock_quantity, store_id, last_updated))
 
         cursor.execute("""
             SELECT si.stock_item_id, si.item_name, si.category, si.stock_quantity, si.store_id, si.last_updated, s.store_name
             FROM stock_items si
             JOIN stores s ON si.store_id = s.store_id
-            WHERE si.rowid = last_insert_rowid()
-        """)
+            WHERE si.stock_item_id = ?
+        """, (stock_item_id,))
         item = cursor.fetchone()
 
         conn.commit()
         conn.close()
+        store_cache.bump()
 
         formatted_last_updated = datetime.strptime(item['last_updated'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
         return jsonify({
@@ -1500,6 +1469,7 @@ def edit_stock(stock_item_id):
 
         conn.commit()
         conn.close()
+        store_cache.bump()
 
         formatted_last_updated = datetime.strptime(item['last_updated'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
         return jsonify({
@@ -1540,6 +1510,7 @@ def delete_stock(stock_item_id):
         cursor.execute('DELETE FROM stock_items WHERE stock_item_id = ?', (stock_item_id,))
         conn.commit()
         conn.close()
+        store_cache.bump()
 
         return jsonify({'success': True})
     except sqlite3.Error as e:
@@ -1619,191 +1590,58 @@ def get_threads():
     if 'admin_id' not in session:
         return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
     admin_id = session['admin_id']
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT m.user_id, u.first_name || ' ' || u.last_name AS sender_name, 
-                   m.content, m.timestamp, m.is_read, m.direction,
-                   EXISTS (
-                       SELECT 1 FROM messages m2
-                       WHERE m2.user_id = m.user_id 
-                       AND (m2.admin_id = ? OR m2.admin_id IS NULL)
-                       AND m2.direction = 'user_to_admin' AND m2.is_read = 0
-                   ) AS has_unread
-            FROM messages m
-            JOIN users u ON m.user_id = u.customer_id
-            LEFT JOIN user_admin_assignments ua ON m.user_id = ua.user_id
-            WHERE (m.admin_id = ? OR m.admin_id IS NULL) 
-            AND (ua.admin_id = ? OR ua.admin_id IS NULL)
-            AND m.message_id = (
-                SELECT message_id 
-                FROM messages m2 
-                WHERE m2.user_id = m.user_id 
-                AND (m2.admin_id = ? OR m2.admin_id IS NULL)
-                ORDER BY m2.timestamp DESC 
-                LIMIT 1
-            )
-            ORDER BY m.timestamp DESC
-        """, (admin_id, admin_id, admin_id, admin_id))
-        
-        threads = []
-        for row in cursor:
-            dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-            local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-            time_str = local_dt.strftime('%I:%M %p')
-            
-            threads.append({
-                'user_id': row['user_id'],
-                'sender_name': row['sender_name'],
-                'content': row['content'],
-                'time': time_str,
-                'is_read': row['is_read'],
-                'direction': row['direction'],
-                'has_unread': bool(row['has_unread'])
-            })
-        
-        conn.close()
-        return jsonify({'success': True, 'threads': threads})
-    except sqlite3.Error as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi cơ sở dữ liệu trong get_threads: {str(e)}")
-        return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+        before = parse_message_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    limit = request.args.get('limit', THREAD_PAGE_SIZE, type=int)
+    try:
+        page = Inbox.get_threads(admin_id, before, max(1, min(limit, THREAD_MAX_PAGE_SIZE)))
+        return jsonify({'success': True, 'threads': page['threads'], 'next_cursor': page['next_cursor']})
     except Exception as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi không xác định trong get_threads: {str(e)}")
+        logger.error("Lỗi trong get_threads: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def message_page_args():
+    # Same paging as the inbox controllers: a cursor page of at most MESSAGE_MAX_PAGE_SIZE messages
+    before = parse_message_cursor(request.args.get('before'))
+    after = parse_message_cursor(request.args.get('after'))
+    limit = request.args.get('limit', MESSAGE_PAGE_SIZE, type=int)
+    return before, after, max(1, min(limit, MESSAGE_MAX_PAGE_SIZE))
+
 @app.route('/get_messages/<user_id>')
 def get_messages(user_id):
     if 'admin_id' not in session:
         return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
     admin_id = session['admin_id']
-    
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Kiểm tra xem user đã được gán cho admin khác chưa
-        cursor.execute("SELECT admin_id FROM user_admin_assignments WHERE user_id = ?", (user_id,))
-        assigned_admin = cursor.fetchone()
-        if assigned_admin and assigned_admin['admin_id'] != admin_id:
-            conn.close()
-            return jsonify({'success': False, 'message': 'Cuộc trò chuyện này đã được admin khác xử lý'}), 403
-        
-        cursor.execute("""
-            SELECT m.message_id, m.user_id, m.admin_id, m.direction, 
-                   m.content, m.timestamp, m.is_read,
-                   CASE 
-                       WHEN m.direction = 'user_to_admin' THEN (u.first_name || ' ' || u.last_name)
-                       WHEN m.direction = 'admin_to_user' THEN (a.first_name || ' ' || a.last_name)
-                   END AS sender_name
-            FROM messages m
-            LEFT JOIN users u ON m.user_id = u.customer_id
-            LEFT JOIN admins a ON m.admin_id = a.admin_id
-            WHERE m.user_id = ? 
-            AND (m.admin_id = ? OR m.admin_id IS NULL)
-            ORDER BY m.timestamp ASC
-        """, (user_id, admin_id))
-        
-        messages = []
-        for row in cursor:
-            dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-            local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-            time_str = local_dt.strftime('%I:%M %p')
-            
-            messages.append({
-                'message_id': row['message_id'],
-                'user_id': row['user_id'],
-                'admin_id': row['admin_id'],
-                'sender_name': row['sender_name'],
-                'content': row['content'],
-                'time': time_str,
-                'is_read': row['is_read'],
-                'direction': row['direction']
-            })
-        
-        cursor.execute("""
-            UPDATE messages SET is_read = 1
-            WHERE user_id = ? AND (admin_id = ? OR admin_id IS NULL) 
-            AND direction = 'user_to_admin' AND is_read = 0
-        """, (user_id, admin_id))
-        conn.commit()
-        conn.close()
-        return jsonify({'success': True, 'messages': messages})
-    except sqlite3.Error as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi cơ sở dữ liệu trong get_messages: {str(e)}")
-        return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+        before, after, limit = message_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        # Chỉ đánh dấu đã đọc các tin trong trang vừa trả về
+        page = Inbox.get_messages(user_id, admin_id, before, after, limit)
+        return jsonify({'success': True, **page})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 403
     except Exception as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi không xác định trong get_messages: {str(e)}")
+        logger.error("Lỗi trong get_messages: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/user_messages/<user_id>')
 def user_messages(user_id):
     if 'customer_id' not in session or session['customer_id'] != user_id:
         return jsonify({'success': False, 'message': 'Không có quyền truy cập hoặc chưa đăng nhập'}), 401
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Lấy admin_id từ user_admin_assignments nếu đã gán
-        cursor.execute("SELECT admin_id FROM user_admin_assignments WHERE user_id = ?", (user_id,))
-        assigned_admin = cursor.fetchone()
-        admin_id = assigned_admin['admin_id'] if assigned_admin else None
-        
-        # Lấy tất cả tin nhắn của user, bất kể admin_id
-        cursor.execute("""
-            SELECT m.message_id, m.user_id, m.admin_id, m.direction, 
-                   m.content, m.timestamp, m.is_read,
-                   CASE 
-                       WHEN m.direction = 'user_to_admin' THEN (u.first_name || ' ' || u.last_name)
-                       WHEN m.direction = 'admin_to_user' THEN (a.first_name || ' ' || a.last_name)
-                   END AS sender_name
-            FROM messages m
-            LEFT JOIN users u ON m.user_id = u.customer_id
-            LEFT JOIN admins a ON m.admin_id = a.admin_id
-            WHERE m.user_id = ?
-            ORDER BY m.timestamp ASC
-        """, (user_id,))
-        
-        messages = []
-        for row in cursor:
-            dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-            local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-            time_str = local_dt.strftime('%I:%M %p')
-            
-            messages.append({
-                'message_id': row['message_id'],
-                'user_id': row['user_id'],
-                'admin_id': row['admin_id'],
-                'sender_name': row['sender_name'],
-                'content': row['content'],
-                'time': time_str,
-                'is_read': row['is_read'],
-                'direction': row['direction']
-            })
-        
-        conn.close()
-        return jsonify({'success': True, 'messages': messages})
-    except sqlite3.Error as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi cơ sở dữ liệu trong user_messages: {str(e)}")
-        return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
+        before, after, limit = message_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        # Tất cả tin nhắn của user, bất kể admin_id; tin của admin trong trang được đánh dấu đã đọc
+        page = InboxUser.get_user_messages_data(user_id, before, after, limit)
+        return jsonify({'success': True, **page})
     except Exception as e:
-        if conn:
-            conn.close()
-        logger.error(f"Lỗi không xác định trong user_messages: {str(e)}")
+        logger.error("Lỗi trong user_messages: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/assign_admin', methods=['POST'])
@@ -1919,15 +1757,14 @@ def send_message():
                 return jsonify({'success': False, 'message': 'User đã được gán cho admin khác'}), 403
 
         # Lưu tin nhắn
+        message_id = next_id('messages')
         cursor.execute("""
             INSERT INTO messages (message_id, user_id, admin_id, direction, content, timestamp, is_read)
-            VALUES (NULL, ?, ?, ?, ?, ?, ?)
-        """, (user_id, admin_id, direction, content, datetime.now().isoformat(), 0))
-        cursor.execute('SELECT message_id FROM messages WHERE rowid = last_insert_rowid()')
-        message = cursor.fetchone()
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (message_id, user_id, admin_id, direction, content, datetime.now().isoformat(), 0))
         conn.commit()
         conn.close()
-        return jsonify({'success': True, 'message_id': message['message_id']})
+        return jsonify({'success': True, 'message_id': message_id})
     except sqlite3.Error as e:
         if conn:
             conn.rollback()
@@ -2090,105 +1927,19 @@ def invoices():
 
 @app.route('/api/invoices', methods=['GET'])
 def get_invoices():
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-      
-        filter_date = request.args.get('date')
-        filter_customer = request.args.get('customer')
-
-        
-        query = """
-        SELECT o.order_id AS code, u.first_name || ' ' || u.last_name AS customer_name, o.order_date AS date, o.status
-        FROM orders o
-        JOIN users u ON o.customer_id = u.customer_id
-        WHERE o.status = 'Delivered'
-        """
-        params = []
-
-    
-        if filter_date:
-            try:
-                date_obj = datetime.strptime(filter_date, '%Y-%m-%d')
-                formatted_date = date_obj.strftime('%Y-%m-%d %H:%M:%S')
-                query += " AND o.order_date LIKE ?"
-                params.append(f"{formatted_date}%")
-            except ValueError:
-                pass
-        if filter_customer:
-            query += " AND LOWER(u.first_name || ' ' || u.last_name) = LOWER(?)"
-            params.append(filter_customer)
-
-    
-        cursor.execute(query, params)
-        invoices = cursor.fetchall()
-
-       
-        invoices_list = []
-        total_amount = 0
-        for row in invoices:
-       
-            cursor.execute("""
-                SELECT p.product_name, od.quantity, ps.size
-                FROM order_details od
-                JOIN products p ON od.product_id = p.product_id
-                JOIN product_size ps ON od.size_id = ps.size_id
-                WHERE od.order_id = ?
-            """, (row['code'],))
-            products = cursor.fetchall()
-
-         
-            cursor.execute("""
-                SELECT SUM(total_price) as order_total
-                FROM order_details
-                WHERE order_id = ?
-            """, (row['code'],))
-            order_total = cursor.fetchone()['order_total'] or 0
-
-            product_list = []
-            for product in products:
-                product_list.append({
-                    'product_name': product['product_name'],
-                    'quantity': product['quantity'],
-                    'size': product['size']
-                })
-
-            total_amount += order_total
-            invoices_list.append({
-                'code': row['code'],
-                'customer_name': row['customer_name'],
-                'date': row['date'],
-                'total_price': order_total,
-                'status': row['status'],
-                'description': f"Payment for order {row['code']}",
-                'products': product_list
-            })
-
-      
-        cursor.execute("""
-            SELECT DISTINCT u.first_name || ' ' || u.last_name AS customer_name 
-            FROM orders o
-            JOIN users u ON o.customer_id = u.customer_id
-            WHERE o.status = 'Delivered'
-        """)
-        customers = [row['customer_name'] for row in cursor.fetchall()]
-
-        conn.close()
-
-        return jsonify({
-            'invoices': invoices_list,
-            'customers': customers,
-            'total_amount': total_amount
-        })
+    # Same set-based, keyset-paged invoice query as PagesController.get_invoices
+    try:
+        limit = request.args.get('limit', INVOICE_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, INVOICE_MAX_PAGE_SIZE))
+        invoice_data = Pages.get_invoice_data(request.args.get('date'), request.args.get('customer'),
+                                              request.args.get('from'), request.args.get('to'),
+                                              request.args.get('cursor'), limit)
+        return jsonify(invoice_data)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except sqlite3.Error as e:
-        if conn:
-            conn.close()
         return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
     except Exception as e:
-        if conn:
-            conn.close()
         return jsonify({'success': False, 'message': str(e)}), 500
     
 @app.route('/pages/setting')
@@ -2260,7 +2011,7 @@ def serve_static(filename):
             return jsonify({"error": f"Yêu cầu không hợp lệ: {filename}"}), 404
         if filename.startswith('templates/'):
             filename = filename[len('templates/'):]
-        return send_from_directory('templates', filename)
+        return asset_response(filename) or send_media('templates', filename)
     except Exception as e:
         logger.error(f"Lỗi khi phục vụ tệp tĩnh {filename}: {str(e)}")
         return jsonify({"error": f"Không tìm thấy tệp: {filename}"}), 404
@@ -2268,7 +2019,7 @@ def serve_static(filename):
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
     try:
-        return send_from_directory('templates', filename)
+        return asset_response(filename) or send_media('templates', filename)
     except Exception as e:
         logger.error(f"Lỗi khi phục vụ tệp tài nguyên {filename}: {str(e)}")
         return jsonify({"error": f"Không tìm thấy tệp: {filename}"}), 404
@@ -2385,18 +2136,19 @@ def create_event():
             conn.close()
             return jsonify({'success': False, 'message': 'Invalid admin ID'}), 400
 
-        # Chèn sự kiện vào database (event_id sẽ được trigger tự động tạo)
+        # Chèn sự kiện vào database
+        event_id = next_id('events')
         cursor.execute("""
-            INSERT INTO events (event_name, date, time, admin_id, adminname, color)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (event_name, date, time, admin_id, adminname, color))
+            INSERT INTO events (event_id, event_name, date, time, admin_id, adminname, color)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (event_id, event_name, date, time, admin_id, adminname, color))
 
         # Lấy sự kiện vừa tạo
         cursor.execute("""
             SELECT event_id, event_name, date, time, admin_id, adminname, color
             FROM events
-            WHERE rowid = last_insert_rowid()
-        """)
+            WHERE event_id = ?
+        """, (event_id,))
         event = cursor.fetchone()
 
         conn.commit()
@@ -2664,8 +2416,8 @@ def signup():
                 return render_template('signup/sign_up.html')
 
             cursor.execute(
-                "INSERT INTO users (first_name, last_name, email, password, phone, birthdate) VALUES (?, ?, ?, ?, ?, ?)",
-                (first_name, last_name, email, password, None, None)
+                "INSERT INTO users (customer_id, first_name, last_name, email, password, phone, birthdate) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (next_id('users'), first_name, last_name, email, password, None, None)
             )
             conn.commit()
             conn.close()
@@ -2809,6 +2561,7 @@ def get_products():
             SELECT p.*, ps.size, ps.price, ps.size_id
             FROM products p
             LEFT JOIN product_size ps ON p.product_id = ps.product_id
+            ORDER BY p.rowid, CASE ps.size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
         ''').fetchall()
         conn.close()
         product_dict = {}
@@ -2833,7 +2586,8 @@ def get_products():
                     "size_id": row['size_id']
                 })
         products_list = list(product_dict.values())
-        logger.debug(f"Trả về {len(products_list)} sản phẩm: {json.dumps(products_list, ensure_ascii=False)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trả về %d sản phẩm: %s", len(products_list), json.dumps(products_list, ensure_ascii=False))
         return jsonify(products_list)
     except Exception as e:
         logger.error(f"Lỗi khi lấy sản phẩm: {str(e)}")
@@ -2848,7 +2602,10 @@ def get_product_by_id(product_id):
         if not product:
             conn.close()
             return jsonify({"error": "Product not found"}), 404
-        sizes = conn.execute("SELECT size, price, size_id FROM product_size WHERE product_id = ?", (product_id,)).fetchall()
+        sizes = conn.execute('''
+            SELECT size, price, size_id FROM product_size WHERE product_id = ?
+            ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
+        ''', (product_id,)).fetchall()
         conn.close()
         sizes_list = [{"size": row['size'], "price": row['price'], "size_id": row['size_id']} for row in sizes]
         return jsonify({
@@ -2878,6 +2635,24 @@ def add_checkout():
 def get_checkout():
     return jsonify(session.get("cart", []))
 
+def format_cart_items(rows):
+    cart_items = []
+    for row in rows:
+        discount = row['discount'] or 0
+        discounted_price = row['price'] * (1 - discount / 100)
+        cart_items.append({
+            'cart_id': row['cart_id'],
+            'product_id': row['product_id'],
+            'quantity': row['quantity'],
+            'size_id': row['size_id'],
+            'size': row['size'],
+            'price': row['price'],
+            'discounted_price': discounted_price,
+            'product_name': row['product_name'],
+            'image_url': row['image_url']
+        })
+    return cart_items
+
 # API lấy giỏ hàng
 @app.route('/api/cart', methods=['GET'])
 def get_cart():
@@ -2895,21 +2670,7 @@ def get_cart():
             JOIN products p ON c.product_id = p.product_id
             WHERE c.customer_id = ?
         ''', (customer_id,))
-        cart_items = []
-        for row in cursor.fetchall():
-            discount = row['discount'] or 0
-            discounted_price = row['price'] * (1 - discount / 100)
-            cart_items.append({
-                'cart_id': row['cart_id'],
-                'product_id': row['product_id'],
-                'quantity': row['quantity'],
-                'size_id': row['size_id'],
-                'size': row['size'],
-                'price': row['price'],
-                'discounted_price': discounted_price,
-                'product_name': row['product_name'],
-                'image_url': row['image_url']
-            })
+        cart_items = format_cart_items(cursor.fetchall())
         conn.close()
         return jsonify(cart_items), 200
     except Exception as e:
@@ -2946,11 +2707,14 @@ def add_to_cart():
         price = size_data['price']
         discount = size_data['discount'] or 0
         discounted_price = price * (1 - discount / 100)
-        cart_id = str(uuid.uuid4())
+        # Đã có cùng kích cỡ trong giỏ thì cộng dồn số lượng (chỉ mục UNIQUE, migration 011)
         cursor.execute('''
             INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity)
             VALUES (?, ?, ?, ?, ?)
-        ''', (cart_id, customer_id, product_id, size_id, quantity))
+            ON CONFLICT (customer_id, size_id) DO UPDATE SET quantity = cart.quantity + excluded.quantity
+        ''', (str(uuid.uuid4()), customer_id, product_id, size_id, quantity))
+        cursor.execute('SELECT cart_id FROM cart WHERE customer_id = ? AND size_id = ?', (customer_id, size_id))
+        cart_id = cursor.fetchone()['cart_id']
         conn.commit()
         conn.close()
         logger.debug(f"Thêm vào giỏ hàng: cart_id={cart_id}, customer_id={customer_id}, discounted_price={discounted_price}")
@@ -2998,7 +2762,7 @@ def update_cart_item():
         logger.error(f"Lỗi cơ sở dữ liệu khi cập nhật giỏ hàng: {str(e)}")
         return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
     except Exception as e:
-        logger.error(f"Lỗi khi cập nhật giỏ hàng: {str(e)}")
+        logger.error("Lỗi khi cập nhật giỏ hàng: %s", e)
         return jsonify({"error": str(e)}), 500
 
 # API xóa khỏi giỏ hàng
@@ -3028,6 +2792,29 @@ def remove_from_cart():
         logger.error(f"Lỗi khi xóa sản phẩm khỏi giỏ hàng: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# API thêm/sửa/xóa nhiều mục giỏ hàng trong một giao dịch, trả về giỏ hàng mới
+@app.route('/api/cart/batch', methods=['POST'])
+@idempotent
+def batch_update_cart():
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Vui lòng đăng nhập'}), 401
+    try:
+        customer_id = session['customer_id']
+        data = request.json
+        operations = data.get('operations') if isinstance(data, dict) else None
+        cart_items = CartModel.apply_batch(customer_id, operations)
+        logger.debug("Cập nhật giỏ hàng theo lô: %s thao tác, customer_id=%s", len(operations), customer_id)
+        return jsonify({
+            "message": "Cập nhật giỏ hàng thành công",
+            "cart": format_cart_items(cart_items)
+        }), 200
+    except ValueError as e:
+        logger.error("Lỗi dữ liệu khi cập nhật giỏ hàng: %s", e)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Lỗi khi cập nhật giỏ hàng: %s", e)
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/products')
 def products_user():
     conn = None
@@ -3081,6 +2868,7 @@ def confirm_calendar():
 
 # API tạo đơn hàng
 @app.route('/api/create-order', methods=["POST"])
+@idempotent
 def create_user_order():
     if 'customer_id' not in session:
         return jsonify({'error': 'Vui lòng đăng nhập'}), 401
@@ -3100,101 +2888,28 @@ def create_user_order():
         if not calendar_info:
             logger.error(f"Order creation failed: Missing calendar info for customer_id={customer_id}")
             return jsonify({"error": "Thiếu thông tin lịch giao hàng"}), 400
-        logger.debug(f"Nội dung đơn hàng: {items}")
-        order_date = datetime.now(pytz.timezone('Asia/Ho_Chi_Minh')).strftime('%Y-%m-%d %H:%M:%S')
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        # Use default store_id (ST1 from schema.sql)
-        default_store_id = 'ST1'
-        cursor.execute('SELECT store_id FROM stores WHERE store_id = ?', (default_store_id,))
-        if not cursor.fetchone():
-            logger.error(f"Default store_id {default_store_id} does not exist")
-            raise ValueError(f"Cửa hàng mặc định {default_store_id} không tồn tại")
-        cursor.execute('''
-            INSERT INTO orders (order_id, customer_id, order_date, status, store_id) 
-            VALUES (NULL, ?, ?, ?, ?)
-        ''', (customer_id, order_date, 'Pending', default_store_id))
-        cursor.execute("SELECT order_id FROM orders WHERE rowid = last_insert_rowid()")
-        order_id = cursor.fetchone()['order_id']
-        total_amount = 0
-        for item in items:
-            order_detail_id = str(uuid.uuid4())
-            cart_id = item.get('cart_id')
-            quantity = item.get('quantity', 1)
-            price = item.get('price')
-            cursor.execute('''
-                SELECT product_id, size_id 
-                FROM cart 
-                WHERE cart_id = ? AND customer_id = ?
-            ''', (cart_id, customer_id))
-            cart_item = cursor.fetchone()
-            if not cart_item:
-                logger.error(f"Mục giỏ hàng không tồn tại: cart_id={cart_id}, customer_id={customer_id}")
-                raise ValueError(f"Mục giỏ hàng không tồn tại: cart_id={cart_id}")
-            product_id, size_id = cart_item
-            cursor.execute('''
-                SELECT price, discount 
-                FROM products p 
-                JOIN product_size ps ON p.product_id = ps.product_id 
-                WHERE p.product_id = ? AND ps.size_id = ?
-            ''', (product_id, size_id))
-            product = cursor.fetchone()
-            if not product:
-                logger.error(f"Sản phẩm hoặc kích cỡ không tồn tại: product_id={product_id}, size_id={size_id}")
-                raise ValueError(f"Sản phẩm hoặc kích cỡ không tồn tại")
-            original_price = float(product['price'])
-            discount = float(product['discount'] or 0)
-            unit_price = price if price else original_price * (1 - discount / 100)
-            total_price = unit_price * quantity
-            total_amount += total_price
-            cursor.execute('''
-                INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price))
-        payment_id = str(uuid.uuid4())
-        payment_method = card_info.get('payment_method', 'cod')
-        cursor.execute('''
-            INSERT INTO payments (payment_id, payment_date, payment_method, order_id, amount) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (payment_id, order_date, payment_method, order_id, total_amount))
-        for item in items:
-            cursor.execute('DELETE FROM cart WHERE cart_id = ? AND customer_id = ?', (item['cart_id'], customer_id))
-        conn.commit()
-        # Verify order was saved
-        cursor.execute('SELECT order_id FROM orders WHERE order_id = ?', (order_id,))
-        if not cursor.fetchone():
-            logger.error(f"Order verification failed: order_id={order_id} not found after commit")
-            raise ValueError(f"Order {order_id} not found after creation")
+        logger.debug("Nội dung đơn hàng: %s", items)
+        # Cùng một giao dịch theo tập hợp như OrderModel.create_order: chọn cửa hàng, giữ hàng,
+        # thêm chi tiết đơn bằng executemany và xóa giỏ hàng bằng một câu DELETE
+        order_id, total_amount = OrderModel.create_order(customer_id, items, note, card_info, calendar_info)
         session.pop('cart', None)
         session.pop('card-info', None)
         session.pop('calendar-info', None)
-        logger.info(f"Tạo đơn hàng thành công: order_id={order_id}, customer_id={customer_id}, total_amount={total_amount}")
+        logger.info("Tạo đơn hàng thành công: order_id=%s, customer_id=%s, total_amount=%s", order_id, customer_id, total_amount)
         return jsonify({
             "message": "Tạo đơn hàng thành công",
             "order_id": order_id,
             "total_amount": total_amount
         }), 200
-    except sqlite3.Error as e:
-        logger.error(f"Lỗi cơ sở dữ liệu khi tạo đơn hàng: {str(e)}, customer_id={customer_id}")
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
-        return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
     except ValueError as e:
-        logger.error(f"Lỗi dữ liệu khi tạo đơn hàng: {str(e)}, customer_id={customer_id}")
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
+        logger.error("Lỗi dữ liệu khi tạo đơn hàng: %s, customer_id=%s", e, customer_id)
         return jsonify({"error": str(e)}), 400
+    except sqlite3.Error as e:
+        logger.error("Lỗi cơ sở dữ liệu khi tạo đơn hàng: %s, customer_id=%s", e, customer_id)
+        return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
     except Exception as e:
-        logger.error(f"Lỗi không xác định khi tạo đơn hàng: {str(e)}, customer_id={customer_id}")
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
+        logger.error("Lỗi không xác định khi tạo đơn hàng: %s, customer_id=%s", e, customer_id)
         return jsonify({"error": str(e)}), 500
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @app.route('/acc/myACC/my_account.html')
@@ -3418,9 +3133,10 @@ def get_orders():
                 logger.warning(f"Invalid date format: start_date={start_date}, end_date={end_date}")
                 return jsonify({"error": "Định dạng ngày không hợp lệ, phải là YYYY-MM-DD"}), 400
         query += ' ORDER BY o.order_date DESC, o.order_id'
-        logger.debug(f"Executing orders query: {query} with params: {params}")
+        logger.debug("Executing orders query: %s with params: %s", query, params)
         orders = conn.execute(query, params).fetchall()
-        logger.debug(f"Fetched orders: {[dict(row) for row in orders]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched orders: %s", [dict(row) for row in orders])
         conn.close()
         order_dict = {}
         for row in orders:
@@ -3734,16 +3450,13 @@ def submit_review():
 
         # Chèn đánh giá
         review_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        review_id = next_id('reviews')
         cursor.execute('''
-            INSERT INTO reviews (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_image_url))
+            INSERT INTO reviews (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_image_url))
         conn.commit()
 
-        # Lấy review_id vừa tạo
-        cursor.execute("SELECT review_id FROM reviews WHERE rowid = last_insert_rowid()")
-        review_id = cursor.fetchone()['review_id']
-        
         logger.info(f"Đã gửi đánh giá thành công: customer_id={customer_id}, product_id={product_id}, order_id={order_id}, review_id={review_id}")
         conn.close()
         return jsonify({"message": "Đánh giá được gửi thành công", "review_image_url": review_image_url, "review_id": review_id}), 200
@@ -3914,30 +3627,28 @@ def add_user():
             return jsonify({'success': False, 'message': 'Email đã tồn tại trong bảng admins'}), 400
 
         if role == 'User':
+            user_id = next_id('users')
             cursor.execute("""
                 INSERT INTO users (customer_id, first_name, last_name, email, password)
-                VALUES (NULL, ?, ?, ?, ?)
-            """, (first_name, last_name, email, password))
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, first_name, last_name, email, password))
         else:
+            user_id = next_id('admins')
             cursor.execute("""
                 INSERT INTO admins (admin_id, first_name, last_name, email, password)
-                VALUES (NULL, ?, ?, ?, ?)
-            """, (first_name, last_name, email, password))
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, first_name, last_name, email, password))
 
         conn.commit()
 
         # Lấy thông tin user vừa thêm
         if role == 'User':
-            cursor.execute("SELECT customer_id FROM users WHERE rowid = last_insert_rowid()")
-            user_id = cursor.fetchone()['customer_id']
             cursor.execute("""
                 SELECT customer_id AS user_id, first_name, last_name, email, 'User' AS role
                 FROM users
                 WHERE customer_id = ?
             """, (user_id,))
         else:
-            cursor.execute("SELECT admin_id FROM admins WHERE rowid = last_insert_rowid()")
-            user_id = cursor.fetchone()['admin_id']
             cursor.execute("""
                 SELECT admin_id AS user_id, first_name, last_name, email, 'Admin' AS role
                 FROM admins
@@ -4175,6 +3886,7 @@ def get_top10_products():
                 SELECT size_id, size, price
                 FROM product_size
                 WHERE product_id = ?
+                ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
             ''', (product['product_id'],))
             sizes = [{'size_id': row['size_id'], 'size': row['size'], 'price': row['price']} for row in cursor.fetchall()]
             product_dict = {
@@ -47,7 +47,7 @@ class AuthController:
                     session['first_name'] = user['first_name']
                     session['is_admin'] = False
                     logger.info(f"User login successful: customer_id={user['customer_id']}")
-                    logger.debug(f"Session after login: {session}")
+                    logger.debug("Session after login: %s", session)
                     return redirect(url_for('index'))
                 else:
                     flash("Email hoặc mật khẩu không đúng", "error")
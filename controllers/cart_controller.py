@@ -1,32 +1,39 @@
 from flask import jsonify, request, session
+import sqlite3
 from models.cart_model import CartModel
+from utils.images import attach_variants
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CartController:
+    @staticmethod
+    def _format_cart(cart_items):
+        formatted_cart = []
+        for row in cart_items:
+            discount = row['discount'] or 0
+            discounted_price = row['price'] * (1 - discount / 100)
+            formatted_cart.append({
+                'cart_id': row['cart_id'],
+                'product_id': row['product_id'],
+                'quantity': row['quantity'],
+                'size_id': row['size_id'],
+                'size': row['size'],
+                'price': row['price'],
+                'discounted_price': discounted_price,
+                'product_name': row['product_name'],
+                'image_url': row['image_url']
+            })
+        attach_variants(formatted_cart)
+        return formatted_cart
+
     def get_cart(self):
         if 'customer_id' not in session:
             return jsonify({'error': 'Vui lòng đăng nhập'}), 401
         try:
             customer_id = session['customer_id']
             cart_items = CartModel.get_cart(customer_id)
-            formatted_cart = []
-            for row in cart_items:
-                discount = row['discount'] or 0
-                discounted_price = row['price'] * (1 - discount / 100)
-                formatted_cart.append({
-                    'cart_id': row['cart_id'],
-                    'product_id': row['product_id'],
-                    'quantity': row['quantity'],
-                    'size_id': row['size_id'],
-                    'size': row['size'],
-                    'price': row['price'],
-                    'discounted_price': discounted_price,
-                    'product_name': row['product_name'],
-                    'image_url': row['image_url']
-                })
-            return jsonify(formatted_cart), 200
+            return jsonify(self._format_cart(cart_items)), 200
         except Exception as e:
             logger.error(f"Lỗi khi lấy giỏ hàng: {str(e)}")
             return jsonify({"error": str(e)}), 500
@@ -82,7 +89,7 @@ class CartController:
             logger.error(f"Lỗi cơ sở dữ liệu khi cập nhật giỏ hàng: {str(e)}")
             return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
         except Exception as e:
-            logger.error(f"Lỗi khi cập nhật giỏ hàng: {str(e)}")
+            logger.error("Lỗi khi cập nhật giỏ hàng: %s", e)
             return jsonify({"error": str(e)}), 500
 
     def remove_from_cart(self):
@@ -103,4 +110,26 @@ class CartController:
             return jsonify({"message": "Đã xóa sản phẩm khỏi giỏ hàng"}), 200
         except Exception as e:
             logger.error(f"Lỗi khi xóa sản phẩm khỏi giỏ hàng: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    def batch_update_cart(self):
+        # Several add/update/remove operations in one request and one
+        # transaction; the new cart comes back in the same response
+        if 'customer_id' not in session:
+            return jsonify({'error': 'Vui lòng đăng nhập'}), 401
+        try:
+            customer_id = session['customer_id']
+            data = request.json
+            operations = data.get('operations') if isinstance(data, dict) else None
+            cart_items = CartModel.apply_batch(customer_id, operations)
+            logger.debug("Cập nhật giỏ hàng theo lô: %s thao tác, customer_id=%s", len(operations), customer_id)
+            return jsonify({
+                "message": "Cập nhật giỏ hàng thành công",
+                "cart": self._format_cart(cart_items)
+            }), 200
+        except ValueError as e:
+            logger.error("Lỗi dữ liệu khi cập nhật giỏ hàng: %s", e)
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error("Lỗi khi cập nhật giỏ hàng: %s", e)
             return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import render_template, redirect, url_for, jsonify, request, session, flash
 from models.checkout_model import CheckoutModel
+from utils.images import attach_variants
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ class CheckoutController:
                     'product_name': row['product_name'],
                     'image_url': row['image_url']
                 })
+            attach_variants(formatted_cart)
             if not formatted_cart:
                 flash("Giỏ hàng trống!", "error")
                 return redirect(url_for('products_user'))
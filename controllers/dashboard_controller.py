@@ -20,8 +20,10 @@ class DashboardController:
         
         try:
             admin_id = session['admin_id']
+            year = request.args.get('year', type=int)
+            store_id = request.args.get('store') or None
             logger.debug(f"Fetching dashboard data for admin_id={admin_id}")
-            dashboard_data = Dashboard.get_dashboard_data(admin_id)
+            dashboard_data = Dashboard.get_dashboard_data(admin_id, year, store_id)
             
             if not dashboard_data['admin']:
                 logger.debug(f"Admin not found for admin_id={admin_id}")
@@ -41,6 +43,8 @@ class DashboardController:
                 sales_percentage=4.3,
                 pending_percentage=1.8,
                 sales_data=dashboard_data['sales_data'],
+                year=dashboard_data['year'],
+                years=dashboard_data['years'],
                 deals=dashboard_data['deals'],
                 admin=dashboard_data['admin']
             )
@@ -2,6 +2,7 @@ from flask import render_template, jsonify, request, session, flash, redirect, u
 from models.favorites import Favorites
 import logging
 from utils.db import get_db_connection
+from utils.images import attach_variants
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ class FavoritesController:
             conn = get_db_connection()
             cursor = conn.cursor()
             admin_id = session['admin_id']
-            favorites = Favorites.get_favorites(admin_id)
+            favorites = attach_variants(Favorites.get_favorites(admin_id))
             cursor.execute('SELECT first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
             admin = cursor.fetchone()
             if not admin:
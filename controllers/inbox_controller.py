@@ -1,12 +1,26 @@
 # controllers/inbox_controller.py
 from flask import render_template, jsonify, request, session, flash, redirect, url_for
-from models.inbox import Inbox
+from models.inbox import (Inbox, parse_message_cursor, MESSAGE_PAGE_SIZE, MESSAGE_MAX_PAGE_SIZE,
+                          THREAD_PAGE_SIZE, THREAD_MAX_PAGE_SIZE)
 import logging
 from utils.db import get_db_connection
+from utils.events import inbox_events, admin_channel, ADMINS_CHANNEL
+from utils.http import event_stream_response
 
 logger = logging.getLogger(__name__)
 
 class InboxController:
+    def _page_args(self):
+        before = parse_message_cursor(request.args.get('before'))
+        after = parse_message_cursor(request.args.get('after'))
+        limit = request.args.get('limit', MESSAGE_PAGE_SIZE, type=int)
+        return before, after, max(1, min(limit, MESSAGE_MAX_PAGE_SIZE))
+
+    def _thread_page_args(self):
+        before = parse_message_cursor(request.args.get('cursor'))
+        limit = request.args.get('limit', THREAD_PAGE_SIZE, type=int)
+        return before, max(1, min(limit, THREAD_MAX_PAGE_SIZE))
+
     def inbox(self):
         logger.debug("Accessing inbox")
         if 'admin_id' not in session:
@@ -39,12 +53,23 @@ class InboxController:
             return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
         admin_id = session['admin_id']
         try:
-            threads = Inbox.get_threads(admin_id)
-            return jsonify({'success': True, 'threads': threads}), 200
+            before, limit = self._thread_page_args()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        try:
+            page = Inbox.get_threads(admin_id, before, limit)
+            return jsonify({'success': True, 'threads': page['threads'], 'next_cursor': page['next_cursor']}), 200
         except Exception as e:
             logger.error(f"Error in get_threads: {str(e)}")
             return jsonify({'success': False, 'message': str(e)}), 500
 
+    def stream(self):
+        logger.debug("Opening inbox event stream")
+        if 'admin_id' not in session:
+            logger.debug("No admin_id in session")
+            return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
+        return event_stream_response(inbox_events, [ADMINS_CHANNEL, admin_channel(session['admin_id'])])
+
     def get_messages(self, user_id):
         logger.debug(f"Getting messages for user_id={user_id}")
         if 'admin_id' not in session:
@@ -52,8 +77,12 @@ class InboxController:
             return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
         admin_id = session['admin_id']
         try:
-            messages = Inbox.get_messages(user_id, admin_id)
-            return jsonify({'success': True, 'messages': messages}), 200
+            before, after, limit = self._page_args()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        try:
+            page = Inbox.get_messages(user_id, admin_id, before, after, limit)
+            return jsonify({'success': True, **page}), 200
         except ValueError as e:
             logger.debug(f"ValueError in get_messages: {str(e)}")
             return jsonify({'success': False, 'message': str(e)}), 403
@@ -109,4 +138,4 @@ class InboxController:
             return jsonify({'success': False, 'message': str(e)}), 403
         except Exception as e:
             logger.error(f"Error in assign_admin: {str(e)}")
-            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
+            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
@@ -1,10 +1,13 @@
 from flask import jsonify, request, session
 import logging
+from utils.events import inbox_events, user_channel
+from utils.http import event_stream_response
 
 logger = logging.getLogger(__name__)
 
 try:
     from models.inbox_user import InboxUser
+    from models.inbox import parse_message_cursor, MESSAGE_PAGE_SIZE, MESSAGE_MAX_PAGE_SIZE
     logger.info("Imported InboxUser model successfully")
 except ImportError as e:
     logger.error(f"Failed to import InboxUser model: {str(e)}")
@@ -47,13 +50,26 @@ class InboxUserController:
             if 'customer_id' not in session or session['customer_id'] != user_id:
                 logger.warning(f"Unauthorized access attempt: session_customer_id={session.get('customer_id')}, requested_user_id={user_id}")
                 return jsonify({'success': False, 'message': 'Không có quyền truy cập hoặc chưa đăng nhập'}), 401
-            messages = InboxUser.get_user_messages_data(user_id)
-            logger.debug(f"Retrieved {len(messages)} messages for user_id={user_id}")
-            return jsonify({'success': True, 'messages': messages}), 200
+            try:
+                before = parse_message_cursor(request.args.get('before'))
+                after = parse_message_cursor(request.args.get('after'))
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            limit = max(1, min(request.args.get('limit', MESSAGE_PAGE_SIZE, type=int), MESSAGE_MAX_PAGE_SIZE))
+            page = InboxUser.get_user_messages_data(user_id, before, after, limit)
+            logger.debug("Retrieved %s messages for user_id=%s", len(page['messages']), user_id)
+            return jsonify({'success': True, **page}), 200
         except Exception as e:
             logger.error(f"Error in get_user_messages: {str(e)}")
             return jsonify({'success': False, 'message': str(e)}), 500
 
+    def stream(self, user_id):
+        logger.debug("Opening message stream for user_id=%s", user_id)
+        if 'customer_id' not in session or session['customer_id'] != user_id:
+            logger.warning("Unauthorized stream attempt: session_customer_id=%s, requested_user_id=%s", session.get('customer_id'), user_id)
+            return jsonify({'success': False, 'message': 'Không có quyền truy cập hoặc chưa đăng nhập'}), 401
+        return event_stream_response(inbox_events, [user_channel(user_id)])
+
     def send_message(self):
         logger.debug("Entering send_message method")
         try:
@@ -79,4 +95,4 @@ class InboxUserController:
             return jsonify({'success': False, 'message': str(e)}), 400
         except Exception as e:
             logger.error(f"Error in send_message: {str(e)}")
-            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
+            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
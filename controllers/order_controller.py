@@ -1,4 +1,5 @@
 from flask import jsonify, request, session
+import sqlite3
 from models.order_model import OrderModel
 import logging
 
@@ -1,12 +1,24 @@
 # controllers/order_lists_controller.py
-from flask import render_template, jsonify, session, flash, redirect, url_for
-from models.order_lists import OrderLists
+from flask import render_template, jsonify, session, flash, redirect, url_for, request
+from models.order_lists import OrderLists, ORDER_PAGE_SIZE, ORDER_MAX_PAGE_SIZE
 import logging
 from utils.db import get_db_connection
 
 logger = logging.getLogger(__name__)
 
 class OrderListsController:
+    def _list_args(self):
+        filters = {
+            'status': request.args.get('status') or None,
+            'store_id': request.args.get('store') or None,
+            'customer_id': request.args.get('customer') or None,
+            'date_from': request.args.get('from') or None,
+            'date_to': request.args.get('to') or None
+        }
+        limit = request.args.get('limit', ORDER_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, ORDER_MAX_PAGE_SIZE))
+        return filters, request.args.get('cursor') or None, limit
+
     def order_lists(self):
         logger.debug("Accessing order_lists")
         if 'admin_id' not in session:
@@ -14,15 +26,30 @@ class OrderListsController:
             flash("Vui lòng đăng nhập với tư cách admin", "error")
             return redirect(url_for('login'))
         try:
+            filters, cursor, limit = self._list_args()
+            page = OrderLists.get_orders(cursor=cursor, limit=limit, **filters)
+            admin_id = session['admin_id']
             conn = get_db_connection()
             cursor = conn.cursor()
-            admin_id = session['admin_id']
-            orders = OrderLists.get_orders()
             cursor.execute('SELECT first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
             admin = cursor.fetchone() or {'first_name': 'Admin', 'last_name': ''}
             conn.close()
-            return render_template('admin_dashboard/dashboard/order_lists.html', orders=orders, admin=dict(admin))
+            return render_template('admin_dashboard/dashboard/order_lists.html', orders=page['orders'],
+                                   next_cursor=page['next_cursor'], filters=filters, admin=dict(admin))
         except Exception as e:
             logger.error(f"Error in order_lists: {str(e)}")
             flash(f"Lỗi: {str(e)}", "error")
-            return jsonify({'success': False, 'message': str(e)}), 500
\ No newline at end of file
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    def get_orders(self):
+        if 'admin_id' not in session:
+            return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
+        try:
+            filters, cursor, limit = self._list_args()
+            page = OrderLists.get_orders(cursor=cursor, limit=limit, **filters)
+            return jsonify({'success': True, 'orders': page['orders'], 'next_cursor': page['next_cursor']})
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except Exception as e:
+            logger.error("Error in get_orders: %s", e)
+            return jsonify({'success': False, 'message': str(e)}), 500
@@ -5,7 +5,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 try:
-    from models.pages import Pages
+    from models.pages import Pages, INVOICE_PAGE_SIZE, INVOICE_MAX_PAGE_SIZE
     logger.info("Imported Pages model successfully")
 except ImportError as e:
     logger.error(f"Failed to import Pages model: {str(e)}")
@@ -132,13 +132,17 @@ class PagesController:
         try:
             filter_date = request.args.get('date')
             filter_customer = request.args.get('customer')
-            invoice_data = Pages.get_invoice_data(filter_date, filter_customer)
+            date_from = request.args.get('from')
+            date_to = request.args.get('to')
+            cursor = request.args.get('cursor')
+            limit = request.args.get('limit', INVOICE_PAGE_SIZE, type=int)
+            limit = max(1, min(limit, INVOICE_MAX_PAGE_SIZE))
+            invoice_data = Pages.get_invoice_data(filter_date, filter_customer, date_from, date_to, cursor, limit)
             logger.debug(f"Retrieved {len(invoice_data['invoices'])} invoices")
-            return jsonify({
-                'invoices': invoice_data['invoices'],
-                'customers': invoice_data['customers'],
-                'total_amount': invoice_data['total_amount']
-            })
+            return jsonify(invoice_data)
+        except ValueError as e:
+            logger.warning("Invalid invoice query: %s", e)
+            return jsonify({'success': False, 'message': str(e)}), 400
         except Exception as e:
             logger.error(f"Error in get_invoices: {str(e)}")
             return jsonify({'success': False, 'message': str(e)}), 500
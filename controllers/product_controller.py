@@ -1,37 +1,21 @@
 from flask import render_template, redirect, url_for, jsonify, session, flash, request
 from models.product_model import ProductModel
 from models.account_model import AccountModel
-import json
+from utils.http import json_body, cached_json_response
+from utils.images import attach_variants
+import sqlite3
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Catalog responses always revalidate so admin edits show up at once; the
+# best-seller list moves slowly enough to be reused for a few minutes
+TOP10_MAX_AGE = 300
+
 class ProductController:
     def products_user(self):
         try:
-            products = ProductModel.get_all_products()
-            product_dict = {}
-            for row in products:
-                product_id = row['product_id']
-                if product_id not in product_dict:
-                    product_dict[product_id] = {
-                        "product_id": row['product_id'],
-                        "product_name": row['product_name'],
-                        "category": row['category'],
-                        "stock": row['stock'],
-                        "description": row['description'],
-                        "image_url": row['image_url'],
-                        "image_url_2": row['image_url_2'],
-                        "discount": row['discount'] or 0,
-                        "sizes": []
-                    }
-                if row['size']:
-                    product_dict[product_id]['sizes'].append({
-                        "size": row['size'],
-                        "price": row['price'],
-                        "size_id": row['size_id']
-                    })
-            products_list = list(product_dict.values())
+            products_list = ProductModel.get_catalog()['products']
             customer_id = session.get('customer_id')
             user = AccountModel.get_user_details(customer_id) if customer_id else None
             return render_template(
@@ -55,6 +39,7 @@ class ProductController:
             products = ProductModel.get_admin_products(admin_id)
             for product in products:
                 product['avg_rating'] = float(product['avg_rating']) if product['avg_rating'] is not None else 0.0
+            attach_variants(products)
             admin = AccountModel.get_user_details(admin_id) or {'first_name': 'Admin', 'last_name': ''}
             return render_template('admin_dashboard/dashboard/products.html', products_query=products, admin=admin)
         except sqlite3.Error as e:
@@ -66,59 +51,33 @@ class ProductController:
 
     def get_products(self):
         try:
-            products = ProductModel.get_all_products()
-            product_dict = {}
-            for row in products:
-                product_id = row['product_id']
-                if product_id not in product_dict:
-                    product_dict[product_id] = {
-                        "product_id": row['product_id'],
-                        "product_name": row['product_name'],
-                        "category": row['category'],
-                        "stock": row['stock'],
-                        "description": row['description'],
-                        "image_url": row['image_url'],
-                        "image_url_2": row['image_url_2'],
-                        "discount": row['discount'] or 0,
-                        "sizes": []
-                    }
-                if row['size']:
-                    product_dict[product_id]['sizes'].append({
-                        "size": row['size'],
-                        "price": row['price'],
-                        "size_id": row['size_id']
-                    })
-            products_list = list(product_dict.values())
-            logger.debug(f"Trả về {len(products_list)} sản phẩm: {json.dumps(products_list, ensure_ascii=False)}")
-            return jsonify(products_list)
+            catalog = ProductModel.get_catalog()
+            logger.debug("Trả về %s sản phẩm từ cache", len(catalog['products']))
+            return cached_json_response(catalog['products_json'], catalog['products_etag'])
         except Exception as e:
             logger.error(f"Lỗi khi lấy sản phẩm: {str(e)}")
             return jsonify({"error": str(e)}), 500
 
+    def get_product_stock(self):
+        # Stock moves with every order, so it is not part of the cached
+        # catalog; the ETag still lets an unchanged listing come back as 304
+        try:
+            return cached_json_response(json_body(ProductModel.get_stock_levels()))
+        except Exception as e:
+            logger.error("Lỗi khi lấy tồn kho: %s", e)
+            return jsonify({"error": str(e)}), 500
+
     def get_product_by_id(self, product_id):
             logger.debug(f"Fetching product by ID: {product_id}")
             try:
-                product, sizes = ProductModel.get_product_by_id(product_id)
-                if not product:
+                payload = ProductModel.get_catalog()['product_payloads'].get(product_id)
+                stock = ProductModel.get_stock(product_id) if payload else None
+                if stock is None:
                     logger.warning(f"Product not found: {product_id}")
                     return jsonify({'success': False, 'message': 'Sản phẩm không tồn tại'}), 404
-            
-                sizes_list = [{"size": row['size'], "price": row['price'], "size_id": row['size_id']} for row in sizes]
                 logger.info(f"Product {product_id} fetched successfully")
-                return jsonify({
-                    'success': True,
-                    'product': {
-                        'product_id': product['product_id'],
-                        'product_name': product['product_name'],
-                        'category': product['category'],
-                        'stock': product['stock'],
-                        'description': product['description'] or '',
-                        'image_url': product['image_url'] or '/static/Upload/default.jpg',
-                        'image_url_2': product['image_url_2'] or '/static/Upload/default.jpg',
-                        'discount': product['discount'] or 0
-                    },
-                    'sizes': sizes_list
-                }), 200
+                body = json_body({**payload, 'product': {**payload['product'], 'stock': stock}})
+                return cached_json_response(body)
             except sqlite3.Error as e:
                 logger.error(f"Database error fetching product {product_id}: {str(e)}")
                 return jsonify({'success': False, 'message': f'Lỗi cơ sở dữ liệu: {str(e)}'}), 500
@@ -128,9 +87,13 @@ class ProductController:
 
     def get_top10_products(self):
         try:
-            products_list = ProductModel.get_top10_products()
+            days = request.args.get('days', type=int)
+            if days is not None and not 1 <= days <= 365:
+                return jsonify({"error": "Tham số days phải từ 1 đến 365"}), 400
+            category = request.args.get('category') or None
+            products_list = ProductModel.get_top10_products(days, category)
             logger.debug(f"Trả về {len(products_list)} sản phẩm bán chạy nhất")
-            return jsonify(products_list), 200
+            return cached_json_response(json_body(products_list), max_age=TOP10_MAX_AGE)
         except sqlite3.Error as e:
             logger.error(f"Lỗi cơ sở dữ liệu khi lấy top 10 sản phẩm: {str(e)}")
             return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
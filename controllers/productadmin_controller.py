@@ -5,6 +5,8 @@ import uuid
 from werkzeug.utils import secure_filename
 from models.productadmin import ProductAdmin
 from utils.db import get_db_connection 
+from utils.cache import catalog_cache
+from utils.images import image_pipeline
 import sqlite3
 
 logger = logging.getLogger(__name__)
@@ -92,6 +94,9 @@ class ProductAdminController:
             product_id, price_m_value = ProductAdmin.add_product(
                 product_name, stock, description, discount_value, category, sizes, image_url, image_url_2
             )
+            # Resized WebP/AVIF variants are built in the background
+            image_pipeline.submit(image_path, image_url)
+            image_pipeline.submit(image_path_2, image_url_2)
 
             return jsonify({
                 'success': True,
@@ -175,6 +180,7 @@ class ProductAdminController:
 
             image_file = request.files.get('image_file')
             image_file_2 = request.files.get('image_file_2')
+            uploads = []
 
             allowed_extensions = {'jpg', 'jpeg', 'png', 'avif'}
             if image_file and image_file.filename and ('.' in image_file.filename and image_file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
@@ -184,6 +190,7 @@ class ProductAdminController:
                 file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
                 image_file.save(file_path)
                 image_url = f"/static/Upload/{unique_filename}"
+                uploads.append((file_path, image_url))
 
             if image_file_2 and image_file_2.filename and ('.' in image_file_2.filename and image_file_2.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
                 filename = secure_filename(image_file_2.filename)
@@ -192,12 +199,15 @@ class ProductAdminController:
                 file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
                 image_file_2.save(file_path)
                 image_url_2 = f"/static/Upload/{unique_filename}"
+                uploads.append((file_path, image_url_2))
 
             product, price_m_value = ProductAdmin.edit_product(
                 product_id, product_name, stock, description, discount_value, category, sizes, image_url, image_url_2
             )
             if not product:
                 return jsonify({'success': False, 'message': 'Sản phẩm không tồn tại.'}), 404
+            for path, url in uploads:
+                image_pipeline.submit(path, url)
 
             product['price_m'] = price_m_value or 0
             return jsonify({
@@ -236,6 +246,7 @@ class ProductAdminController:
             cursor.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
             conn.commit()
             conn.close()
+            catalog_cache.bump()
 
             return jsonify({'success': True}), 200
         except sqlite3.Error as e:
@@ -6,6 +6,9 @@ import os
 import uuid
 from datetime import datetime
 from utils.db import get_db_connection
+from utils.ids import next_id
+from utils.http import json_body, cached_json_response
+from utils.images import image_pipeline, attach_variants
 import sqlite3  # Import sqlite3
 
 logger = logging.getLogger(__name__)
@@ -24,8 +27,9 @@ class ReviewController:
                     "review_img": row['review_img']
                 } for row in reviews
             ]
+            attach_variants(reviews_list, 'review_img', 'review_img_variants')
             logger.debug(f"Trả về {len(reviews_list)} đánh giá cho product_id: {product_id}")
-            return jsonify(reviews_list), 200
+            return cached_json_response(json_body(reviews_list))
         except sqlite3.Error as e:
             logger.error(f"Lỗi cơ sở dữ liệu khi lấy đánh giá: {str(e)}")
             return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
@@ -108,13 +112,14 @@ class ReviewController:
                 review_image.save(file_path)
                 review_image_url = f"/reviews_upload/{filename}"
             review_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            review_id = next_id('reviews')
             cursor.execute('''
-                INSERT INTO reviews (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_image_url))
+                INSERT INTO reviews (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_image_url))
             conn.commit()
-            cursor.execute("SELECT review_id FROM reviews WHERE rowid = last_insert_rowid()")
-            review_id = cursor.fetchone()['review_id']
+            if review_image_url:
+                image_pipeline.submit(file_path, review_image_url)
             logger.info(f"Đã gửi đánh giá thành công: customer_id={customer_id}, product_id={product_id}, order_id={order_id}, review_id={review_id}")
             conn.close()
             return jsonify({"message": "Đánh giá được gửi thành công", "review_image_url": review_image_url, "review_id": review_id}), 200
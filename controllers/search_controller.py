@@ -0,0 +1,33 @@
+# controllers/search_controller.py
+from flask import jsonify, request, session
+from models.search import Search, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ('products', 'users', 'messages')
+
+
+class SearchController:
+    def search(self):
+        text = (request.args.get('q') or '').strip()
+        search_type = request.args.get('type', 'products')
+        logger.debug("Search: type=%s, q=%s", search_type, text)
+        if search_type not in SEARCH_TYPES:
+            return jsonify({'success': False, 'message': 'Loại tìm kiếm không hợp lệ'}), 400
+        # Customers and conversations are admin-only; the catalog is public
+        if search_type != 'products' and 'admin_id' not in session:
+            return jsonify({'success': False, 'message': 'Vui lòng đăng nhập với tư cách admin'}), 401
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_PAGE_SIZE))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        try:
+            if search_type == 'products':
+                page = Search.search_products(text, limit, offset)
+            elif search_type == 'users':
+                page = Search.search_users(text, limit, offset)
+            else:
+                page = Search.search_messages(text, session['admin_id'], limit, offset)
+            return jsonify({'success': True, 'type': search_type, **page}), 200
+        except Exception as e:
+            logger.error("Error in search: %s", e)
+            return jsonify({'success': False, 'message': str(e)}), 500
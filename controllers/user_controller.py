@@ -2,6 +2,7 @@ from flask import jsonify, request, session, current_app
 import logging
 import sqlite3
 from utils.db import get_db_connection
+from utils.images import image_pipeline, attach_variants
 import os
 import uuid
 
@@ -22,8 +23,10 @@ def register_user_routes(app):
             if not user:
                 logger.warning(f"No user found for customer_id: {customer_id}")
                 return jsonify({"error": "Không tìm thấy người dùng"}), 404
-            logger.debug(f"User data retrieved: {dict(user)}")
-            return jsonify(dict(user)), 200
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("User data retrieved: %s", dict(user))
+            user = attach_variants([dict(user)], 'user_img', 'user_img_variants')[0]
+            return jsonify(user), 200
         except sqlite3.Error as e:
             logger.error(f"Lỗi cơ sở dữ liệu khi lấy người dùng: {str(e)}")
             return jsonify({"error": f"Lỗi cơ sở dữ liệu: {str(e)}"}), 500
@@ -119,6 +122,7 @@ def register_user_routes(app):
             conn.execute('UPDATE users SET user_img = ? WHERE customer_id = ?', (image_url, customer_id))
             conn.commit()
             conn.close()
+            image_pipeline.submit(file_path, image_url)
             logger.debug(f"Tải ảnh hồ sơ thành công cho customer_id: {customer_id}, image_url: {image_url}")
             return jsonify({"message": "Tải ảnh hồ sơ thành công", "image_url": image_url}), 200
         except sqlite3.Error as e:
@@ -294,9 +298,10 @@ def register_user_routes(app):
                 query += ' AND DATE(o.order_date) BETWEEN ? AND ?'
                 params.extend([start_date, end_date])
             query += ' ORDER BY o.order_date DESC, o.order_id'
-            logger.debug(f"Executing orders query: {query} with params: {params}")
+            logger.debug("Executing orders query: %s with params: %s", query, params)
             orders = conn.execute(query, params).fetchall()
-            logger.debug(f"Fetched orders: {[dict(row) for row in orders]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Fetched orders: %s", [dict(row) for row in orders])
             conn.close()
             order_dict = {}
             for row in orders:
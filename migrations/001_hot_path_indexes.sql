@@ -0,0 +1,40 @@
+-- Chỉ mục cho các khóa ngoại và cột lọc dùng trong models/*.py
+
+-- Chi tiết đơn hàng: join theo order_id, kiểm tra sản phẩm/kích thước đã được đặt
+CREATE INDEX IF NOT EXISTS idx_order_details_order_id ON order_details(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_details_product_id ON order_details(product_id);
+CREATE INDEX IF NOT EXISTS idx_order_details_size_id ON order_details(size_id);
+
+-- Kích thước sản phẩm theo sản phẩm (catalog, top 10, giỏ hàng)
+CREATE INDEX IF NOT EXISTS idx_product_size_product_id ON product_size(product_id, size);
+
+-- Giỏ hàng theo khách hàng
+CREATE INDEX IF NOT EXISTS idx_cart_customer_id ON cart(customer_id);
+CREATE INDEX IF NOT EXISTS idx_cart_size_id ON cart(size_id);
+
+-- Đơn hàng: theo khách hàng, theo trạng thái + ngày (dashboard, hóa đơn), theo ngày (danh sách)
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_order_date ON orders(status, order_date);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders(order_date);
+CREATE INDEX IF NOT EXISTS idx_orders_store_id ON orders(store_id);
+
+-- Tin nhắn: lịch sử theo user, theo admin, theo thời gian
+CREATE INDEX IF NOT EXISTS idx_messages_user_id_timestamp ON messages(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_admin_id ON messages(admin_id);
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_user_admin_assignments_admin_id ON user_admin_assignments(admin_id);
+
+-- Đánh giá theo sản phẩm
+CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON reviews(product_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_order_id ON reviews(order_id);
+
+-- Yêu thích theo admin
+CREATE INDEX IF NOT EXISTS idx_favorites_admin_id ON favorites(admin_id, product_id);
+CREATE INDEX IF NOT EXISTS idx_favorites_product_id ON favorites(product_id);
+
+-- Địa chỉ theo khách hàng
+CREATE INDEX IF NOT EXISTS idx_addresses_customer_id ON addresses(customer_id);
+
+-- Thanh toán theo đơn hàng
+CREATE INDEX IF NOT EXISTS idx_payments_order_id ON payments(order_id);
@@ -0,0 +1,137 @@
+-- Thay các bảng *_sequence (mỗi bảng một dòng, cập nhật bởi trigger) bằng một bảng id_sequences duy nhất.
+-- Code ứng dụng lấy ID trước khi INSERT qua utils/ids.py (cấp theo khối, không cần đọc lại dòng vừa thêm).
+-- Trigger cũ bị xóa, không thay thế: mọi đường INSERT đều truyền ID lấy từ utils/ids.py.
+
+CREATE TABLE IF NOT EXISTS id_sequences (
+    name TEXT PRIMARY KEY,
+    prefix TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- users (KH1, KH2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('users', 'KH', MAX(
+    COALESCE((SELECT MAX(seq) FROM user_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(customer_id, 3) AS INTEGER)) FROM users WHERE customer_id LIKE 'KH%'), 0)
+));
+DROP TRIGGER IF EXISTS user_id_trigger;
+DROP TABLE IF EXISTS user_sequence;
+
+-- admins (AD1, AD2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('admins', 'AD', MAX(
+    COALESCE((SELECT MAX(seq) FROM admin_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(admin_id, 3) AS INTEGER)) FROM admins WHERE admin_id LIKE 'AD%'), 0)
+));
+DROP TRIGGER IF EXISTS admin_id_trigger;
+DROP TABLE IF EXISTS admin_sequence;
+
+-- managers (MG1, MG2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('managers', 'MG', MAX(
+    COALESCE((SELECT MAX(seq) FROM manager_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(manager_id, 3) AS INTEGER)) FROM managers WHERE manager_id LIKE 'MG%'), 0)
+));
+DROP TRIGGER IF EXISTS manager_id_trigger;
+DROP TABLE IF EXISTS manager_sequence;
+
+-- stores (ST1, ST2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('stores', 'ST', MAX(
+    COALESCE((SELECT MAX(seq) FROM store_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(store_id, 3) AS INTEGER)) FROM stores WHERE store_id LIKE 'ST%'), 0)
+));
+DROP TRIGGER IF EXISTS store_id_trigger;
+DROP TABLE IF EXISTS store_sequence;
+
+-- products (PR1, PR2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('products', 'PR', MAX(
+    COALESCE((SELECT MAX(seq) FROM product_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(product_id, 3) AS INTEGER)) FROM products WHERE product_id LIKE 'PR%'), 0)
+));
+DROP TRIGGER IF EXISTS product_id_trigger;
+DROP TABLE IF EXISTS product_sequence;
+
+-- product_size (SZ1, SZ2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('product_size', 'SZ', MAX(
+    COALESCE((SELECT MAX(seq) FROM size_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(size_id, 3) AS INTEGER)) FROM product_size WHERE size_id LIKE 'SZ%'), 0)
+));
+DROP TRIGGER IF EXISTS size_id_trigger;
+DROP TABLE IF EXISTS size_sequence;
+
+-- favorites (FA1, FA2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('favorites', 'FA', MAX(
+    COALESCE((SELECT MAX(seq) FROM favorite_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(favorite_id, 3) AS INTEGER)) FROM favorites WHERE favorite_id LIKE 'FA%'), 0)
+));
+DROP TRIGGER IF EXISTS favorite_id_trigger;
+DROP TABLE IF EXISTS favorite_sequence;
+
+-- stock_items (STK1, STK2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('stock_items', 'STK', MAX(
+    COALESCE((SELECT MAX(seq) FROM stock_item_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(stock_item_id, 4) AS INTEGER)) FROM stock_items WHERE stock_item_id LIKE 'STK%'), 0)
+));
+DROP TRIGGER IF EXISTS stock_item_id_trigger;
+DROP TABLE IF EXISTS stock_item_sequence;
+
+-- cart (CA1, CA2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('cart', 'CA', MAX(
+    COALESCE((SELECT MAX(seq) FROM cart_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(cart_id, 3) AS INTEGER)) FROM cart WHERE cart_id LIKE 'CA%'), 0)
+));
+DROP TRIGGER IF EXISTS cart_id_trigger;
+DROP TABLE IF EXISTS cart_sequence;
+
+-- orders (OR1, OR2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('orders', 'OR', MAX(
+    COALESCE((SELECT MAX(seq) FROM order_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(order_id, 3) AS INTEGER)) FROM orders WHERE order_id LIKE 'OR%'), 0)
+));
+DROP TRIGGER IF EXISTS order_id_trigger;
+DROP TABLE IF EXISTS order_sequence;
+
+-- order_details (OD1, OD2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('order_details', 'OD', MAX(
+    COALESCE((SELECT MAX(seq) FROM order_detail_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(order_detail_id, 3) AS INTEGER)) FROM order_details WHERE order_detail_id LIKE 'OD%'), 0)
+));
+DROP TRIGGER IF EXISTS order_detail_id_trigger;
+DROP TABLE IF EXISTS order_detail_sequence;
+
+-- payments (PM1, PM2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('payments', 'PM', MAX(
+    COALESCE((SELECT MAX(seq) FROM payment_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(payment_id, 3) AS INTEGER)) FROM payments WHERE payment_id LIKE 'PM%'), 0)
+));
+DROP TRIGGER IF EXISTS payment_id_trigger;
+DROP TABLE IF EXISTS payment_sequence;
+
+-- messages (MS1, MS2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('messages', 'MS', MAX(
+    COALESCE((SELECT MAX(seq) FROM message_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(message_id, 3) AS INTEGER)) FROM messages WHERE message_id LIKE 'MS%'), 0)
+));
+DROP TRIGGER IF EXISTS message_id_trigger;
+DROP TABLE IF EXISTS message_sequence;
+
+-- events (EV1, EV2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('events', 'EV', MAX(
+    COALESCE((SELECT MAX(seq) FROM event_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(event_id, 3) AS INTEGER)) FROM events WHERE event_id LIKE 'EV%'), 0)
+));
+DROP TRIGGER IF EXISTS event_id_trigger;
+DROP TABLE IF EXISTS event_sequence;
+
+-- reviews (RV1, RV2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('reviews', 'RV', MAX(
+    COALESCE((SELECT MAX(seq) FROM review_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(review_id, 3) AS INTEGER)) FROM reviews WHERE review_id LIKE 'RV%'), 0)
+));
+DROP TRIGGER IF EXISTS review_id_trigger;
+DROP TABLE IF EXISTS review_sequence;
+
+-- addresses (AD1, AD2,...)
+INSERT OR IGNORE INTO id_sequences (name, prefix, value) VALUES ('addresses', 'AD', MAX(
+    COALESCE((SELECT MAX(seq) FROM address_sequence), 0),
+    COALESCE((SELECT MAX(CAST(SUBSTR(address_id, 3) AS INTEGER)) FROM addresses WHERE address_id LIKE 'AD%'), 0)
+));
+DROP TRIGGER IF EXISTS address_id_trigger;
+DROP TABLE IF EXISTS address_sequence;
@@ -0,0 +1,144 @@
+-- Bảng tổng hợp số lượng bán của đơn 'Delivered' cho /api/top10products.
+-- product_sales_daily: theo sản phẩm và ngày đặt hàng (xếp hạng 7/30 ngày gần nhất).
+-- product_sales_rollup: tổng toàn thời gian, đọc top N qua chỉ mục total_sold.
+-- Trigger cập nhật tăng dần khi đơn đổi trạng thái, bị xóa, hoặc chi tiết đơn thay đổi,
+-- nên mọi đường ghi (OrderAdmin, app_admin.py, khách hủy đơn) đều giữ bảng đúng.
+-- Dòng có số lượng về 0 bị xóa, để bảng giống kết quả dựng lại (python -m utils.rollups)
+-- và top 10 không xếp một sản phẩm bán 0.
+
+CREATE TABLE IF NOT EXISTS product_sales_daily (
+    product_id TEXT NOT NULL,
+    sale_date TEXT NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, sale_date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_product_sales_daily_date ON product_sales_daily(sale_date, product_id, quantity);
+
+CREATE TABLE IF NOT EXISTS product_sales_rollup (
+    product_id TEXT PRIMARY KEY,
+    total_sold INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_product_sales_rollup_total ON product_sales_rollup(total_sold DESC, product_id);
+
+-- Dữ liệu ban đầu từ các đơn đã giao
+DELETE FROM product_sales_daily;
+DELETE FROM product_sales_rollup;
+INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+SELECT od.product_id, date(o.order_date), SUM(od.quantity)
+FROM order_details od
+JOIN orders o ON o.order_id = od.order_id
+WHERE o.status = 'Delivered'
+GROUP BY od.product_id, date(o.order_date);
+INSERT INTO product_sales_rollup (product_id, total_sold)
+SELECT product_id, SUM(quantity)
+FROM product_sales_daily
+GROUP BY product_id;
+
+-- Tổng toàn thời gian đi theo bảng theo ngày
+DROP TRIGGER IF EXISTS product_sales_daily_insert;
+CREATE TRIGGER product_sales_daily_insert
+AFTER INSERT ON product_sales_daily
+FOR EACH ROW
+BEGIN
+    INSERT INTO product_sales_rollup (product_id, total_sold) VALUES (NEW.product_id, NEW.quantity)
+    ON CONFLICT (product_id) DO UPDATE SET total_sold = total_sold + excluded.total_sold;
+END;
+
+DROP TRIGGER IF EXISTS product_sales_daily_update;
+CREATE TRIGGER product_sales_daily_update
+AFTER UPDATE OF quantity ON product_sales_daily
+FOR EACH ROW
+BEGIN
+    UPDATE product_sales_rollup SET total_sold = total_sold + NEW.quantity - OLD.quantity
+    WHERE product_id = NEW.product_id;
+END;
+
+DROP TRIGGER IF EXISTS product_sales_daily_empty;
+CREATE TRIGGER product_sales_daily_empty
+AFTER UPDATE OF quantity ON product_sales_daily
+FOR EACH ROW
+WHEN NEW.quantity = 0
+BEGIN
+    DELETE FROM product_sales_daily WHERE product_id = NEW.product_id AND sale_date = NEW.sale_date;
+END;
+
+DROP TRIGGER IF EXISTS product_sales_rollup_empty;
+CREATE TRIGGER product_sales_rollup_empty
+AFTER UPDATE OF total_sold ON product_sales_rollup
+FOR EACH ROW
+WHEN NEW.total_sold = 0
+BEGIN
+    DELETE FROM product_sales_rollup WHERE product_id = NEW.product_id;
+END;
+
+-- Đơn rời trạng thái 'Delivered' (hoặc đổi ngày khi đang 'Delivered'): trừ theo ngày cũ
+DROP TRIGGER IF EXISTS product_sales_order_leave;
+CREATE TRIGGER product_sales_order_leave
+AFTER UPDATE OF status, order_date ON orders
+FOR EACH ROW
+WHEN OLD.status = 'Delivered' AND (NEW.status IS NOT 'Delivered' OR NEW.order_date IS NOT OLD.order_date)
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT product_id, date(OLD.order_date), -SUM(quantity) FROM order_details WHERE order_id = NEW.order_id GROUP BY product_id
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
+
+-- Đơn chuyển sang 'Delivered' (hoặc đổi ngày khi đang 'Delivered'): cộng theo ngày mới
+DROP TRIGGER IF EXISTS product_sales_order_enter;
+CREATE TRIGGER product_sales_order_enter
+AFTER UPDATE OF status, order_date ON orders
+FOR EACH ROW
+WHEN NEW.status = 'Delivered' AND (OLD.status IS NOT 'Delivered' OR NEW.order_date IS NOT OLD.order_date)
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT product_id, date(NEW.order_date), SUM(quantity) FROM order_details WHERE order_id = NEW.order_id GROUP BY product_id
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
+
+-- Xóa đơn đã giao: trừ trước khi ON DELETE CASCADE xóa order_details
+DROP TRIGGER IF EXISTS product_sales_order_delete;
+CREATE TRIGGER product_sales_order_delete
+BEFORE DELETE ON orders
+FOR EACH ROW
+WHEN OLD.status = 'Delivered'
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT product_id, date(OLD.order_date), -SUM(quantity) FROM order_details WHERE order_id = OLD.order_id GROUP BY product_id
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
+
+-- Chi tiết đơn thêm/xóa/sửa trong một đơn đã giao (vd. OrderAdmin.update_order)
+DROP TRIGGER IF EXISTS product_sales_detail_insert;
+CREATE TRIGGER product_sales_detail_insert
+AFTER INSERT ON order_details
+FOR EACH ROW
+WHEN (SELECT status FROM orders WHERE order_id = NEW.order_id) = 'Delivered'
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT NEW.product_id, date(order_date), NEW.quantity FROM orders WHERE order_id = NEW.order_id
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
+
+DROP TRIGGER IF EXISTS product_sales_detail_delete;
+CREATE TRIGGER product_sales_detail_delete
+AFTER DELETE ON order_details
+FOR EACH ROW
+WHEN (SELECT status FROM orders WHERE order_id = OLD.order_id) = 'Delivered'
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT OLD.product_id, date(order_date), -OLD.quantity FROM orders WHERE order_id = OLD.order_id
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
+
+DROP TRIGGER IF EXISTS product_sales_detail_update;
+CREATE TRIGGER product_sales_detail_update
+AFTER UPDATE OF product_id, quantity, order_id ON order_details
+FOR EACH ROW
+BEGIN
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT OLD.product_id, date(order_date), -OLD.quantity FROM orders WHERE order_id = OLD.order_id AND status = 'Delivered'
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT NEW.product_id, date(order_date), NEW.quantity FROM orders WHERE order_id = NEW.order_id AND status = 'Delivered'
+    ON CONFLICT (product_id, sale_date) DO UPDATE SET quantity = quantity + excluded.quantity;
+END;
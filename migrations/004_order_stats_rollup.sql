@@ -0,0 +1,161 @@
+-- Bảng tổng hợp số đơn và doanh thu cho dashboard, theo cửa hàng và trạng thái.
+-- order_stats_daily: theo ngày đặt hàng; order_stats_monthly: theo tháng ('YYYY-MM'),
+-- dashboard đọc bảng tháng nên chi phí chỉ phụ thuộc số tháng, không phụ thuộc số đơn.
+-- Trigger cập nhật tăng dần khi tạo đơn, đổi trạng thái/cửa hàng/ngày, xóa đơn, hoặc chi tiết đơn thay đổi.
+-- Dòng có số đơn về 0 bị xóa, để bảng giống kết quả dựng lại toàn bộ: python -m utils.rollups
+
+CREATE TABLE IF NOT EXISTS order_stats_daily (
+    day TEXT NOT NULL,
+    store_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    sales REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, store_id, status)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS order_stats_monthly (
+    month TEXT NOT NULL,
+    store_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    sales REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, store_id, status)
+) WITHOUT ROWID;
+
+-- Dữ liệu ban đầu (trước khi tạo trigger)
+DELETE FROM order_stats_daily;
+DELETE FROM order_stats_monthly;
+INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+SELECT date(o.order_date), o.store_id, o.status, COUNT(*), COALESCE(SUM(t.sales), 0)
+FROM orders o
+LEFT JOIN (SELECT order_id, SUM(total_price) AS sales FROM order_details GROUP BY order_id) t ON t.order_id = o.order_id
+GROUP BY date(o.order_date), o.store_id, o.status;
+INSERT INTO order_stats_monthly (month, store_id, status, order_count, sales)
+SELECT substr(day, 1, 7), store_id, status, SUM(order_count), SUM(sales)
+FROM order_stats_daily
+GROUP BY substr(day, 1, 7), store_id, status;
+
+-- Bảng tháng đi theo bảng ngày
+DROP TRIGGER IF EXISTS order_stats_daily_insert;
+CREATE TRIGGER order_stats_daily_insert
+AFTER INSERT ON order_stats_daily
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_monthly (month, store_id, status, order_count, sales)
+    VALUES (substr(NEW.day, 1, 7), NEW.store_id, NEW.status, NEW.order_count, NEW.sales)
+    ON CONFLICT (month, store_id, status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        sales = sales + excluded.sales;
+END;
+
+DROP TRIGGER IF EXISTS order_stats_daily_update;
+CREATE TRIGGER order_stats_daily_update
+AFTER UPDATE OF order_count, sales ON order_stats_daily
+FOR EACH ROW
+BEGIN
+    UPDATE order_stats_monthly SET
+        order_count = order_count + NEW.order_count - OLD.order_count,
+        sales = sales + NEW.sales - OLD.sales
+    WHERE month = substr(NEW.day, 1, 7) AND store_id = NEW.store_id AND status = NEW.status;
+END;
+
+DROP TRIGGER IF EXISTS order_stats_daily_empty;
+CREATE TRIGGER order_stats_daily_empty
+AFTER UPDATE OF order_count ON order_stats_daily
+FOR EACH ROW
+WHEN NEW.order_count = 0
+BEGIN
+    DELETE FROM order_stats_daily WHERE day = NEW.day AND store_id = NEW.store_id AND status = NEW.status;
+END;
+
+DROP TRIGGER IF EXISTS order_stats_monthly_empty;
+CREATE TRIGGER order_stats_monthly_empty
+AFTER UPDATE OF order_count ON order_stats_monthly
+FOR EACH ROW
+WHEN NEW.order_count = 0
+BEGIN
+    DELETE FROM order_stats_monthly WHERE month = NEW.month AND store_id = NEW.store_id AND status = NEW.status;
+END;
+
+-- Tạo đơn (chi tiết đơn thường được thêm sau, xem order_stats_detail_insert)
+DROP TRIGGER IF EXISTS order_stats_order_insert;
+CREATE TRIGGER order_stats_order_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    VALUES (date(NEW.order_date), NEW.store_id, NEW.status, 1,
+            COALESCE((SELECT SUM(total_price) FROM order_details WHERE order_id = NEW.order_id), 0))
+    ON CONFLICT (day, store_id, status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        sales = sales + excluded.sales;
+END;
+
+-- Đổi trạng thái / cửa hàng / ngày: chuyển đơn từ khóa cũ sang khóa mới
+DROP TRIGGER IF EXISTS order_stats_order_update;
+CREATE TRIGGER order_stats_order_update
+AFTER UPDATE OF status, store_id, order_date ON orders
+FOR EACH ROW
+WHEN OLD.status IS NOT NEW.status OR OLD.store_id IS NOT NEW.store_id OR date(OLD.order_date) IS NOT date(NEW.order_date)
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    VALUES (date(OLD.order_date), OLD.store_id, OLD.status, -1,
+            -COALESCE((SELECT SUM(total_price) FROM order_details WHERE order_id = NEW.order_id), 0))
+    ON CONFLICT (day, store_id, status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        sales = sales + excluded.sales;
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    VALUES (date(NEW.order_date), NEW.store_id, NEW.status, 1,
+            COALESCE((SELECT SUM(total_price) FROM order_details WHERE order_id = NEW.order_id), 0))
+    ON CONFLICT (day, store_id, status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        sales = sales + excluded.sales;
+END;
+
+-- Xóa đơn: trừ trước khi ON DELETE CASCADE xóa order_details
+DROP TRIGGER IF EXISTS order_stats_order_delete;
+CREATE TRIGGER order_stats_order_delete
+BEFORE DELETE ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    VALUES (date(OLD.order_date), OLD.store_id, OLD.status, -1,
+            -COALESCE((SELECT SUM(total_price) FROM order_details WHERE order_id = OLD.order_id), 0))
+    ON CONFLICT (day, store_id, status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        sales = sales + excluded.sales;
+END;
+
+-- Chi tiết đơn: chỉ ảnh hưởng doanh thu của đơn cha
+DROP TRIGGER IF EXISTS order_stats_detail_insert;
+CREATE TRIGGER order_stats_detail_insert
+AFTER INSERT ON order_details
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    SELECT date(order_date), store_id, status, 0, COALESCE(NEW.total_price, 0) FROM orders WHERE order_id = NEW.order_id
+    ON CONFLICT (day, store_id, status) DO UPDATE SET sales = sales + excluded.sales;
+END;
+
+DROP TRIGGER IF EXISTS order_stats_detail_delete;
+CREATE TRIGGER order_stats_detail_delete
+AFTER DELETE ON order_details
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    SELECT date(order_date), store_id, status, 0, -COALESCE(OLD.total_price, 0) FROM orders WHERE order_id = OLD.order_id
+    ON CONFLICT (day, store_id, status) DO UPDATE SET sales = sales + excluded.sales;
+END;
+
+DROP TRIGGER IF EXISTS order_stats_detail_update;
+CREATE TRIGGER order_stats_detail_update
+AFTER UPDATE OF total_price, order_id ON order_details
+FOR EACH ROW
+BEGIN
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    SELECT date(order_date), store_id, status, 0, -COALESCE(OLD.total_price, 0) FROM orders WHERE order_id = OLD.order_id
+    ON CONFLICT (day, store_id, status) DO UPDATE SET sales = sales + excluded.sales;
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    SELECT date(order_date), store_id, status, 0, COALESCE(NEW.total_price, 0) FROM orders WHERE order_id = NEW.order_id
+    ON CONFLICT (day, store_id, status) DO UPDATE SET sales = sales + excluded.sales;
+END;
@@ -0,0 +1,123 @@
+-- Bảng tóm tắt hội thoại cho danh sách luồng của inbox: mỗi khách hàng một dòng với tin nhắn cuối,
+-- số tin chưa đọc của mỗi phía và admin được gán. Inbox.get_threads chỉ quét chỉ mục last_timestamp
+-- thay vì tìm tin nhắn cuối của từng khách trong toàn bộ bảng messages. Chỉ mục theo
+-- (last_timestamp, user_id) khớp với thứ tự sắp xếp và con trỏ phân trang của danh sách luồng.
+-- Trigger cập nhật trong cùng giao dịch với đường ghi: gửi tin, đánh dấu đã đọc, gán admin, xóa tin.
+
+CREATE TABLE IF NOT EXISTS conversations (
+    user_id TEXT PRIMARY KEY,
+    last_message_id TEXT,
+    last_timestamp TEXT,
+    last_direction TEXT,
+    preview TEXT,
+    unread_count_for_admin INTEGER NOT NULL DEFAULT 0,
+    unread_count_for_user INTEGER NOT NULL DEFAULT 0,
+    assigned_admin_id TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(customer_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_recent ON conversations(last_timestamp DESC, user_id DESC, assigned_admin_id);
+
+-- Dữ liệu ban đầu
+DELETE FROM conversations;
+INSERT INTO conversations (user_id, last_message_id, last_timestamp, last_direction, preview,
+                           unread_count_for_admin, unread_count_for_user, assigned_admin_id)
+SELECT u.customer_id, m.message_id, m.timestamp, m.direction, substr(m.content, 1, 100),
+       (SELECT COUNT(*) FROM messages x WHERE x.user_id = u.customer_id AND x.direction = 'user_to_admin' AND x.is_read = 0),
+       (SELECT COUNT(*) FROM messages x WHERE x.user_id = u.customer_id AND x.direction = 'admin_to_user' AND x.is_read = 0),
+       (SELECT admin_id FROM user_admin_assignments WHERE user_id = u.customer_id)
+FROM users u
+JOIN messages m ON m.message_id = (
+    SELECT message_id FROM messages WHERE user_id = u.customer_id ORDER BY timestamp DESC, rowid DESC LIMIT 1
+);
+
+-- Tin nhắn mới: thành tin cuối và tăng số chưa đọc của phía nhận
+DROP TRIGGER IF EXISTS conversations_message_insert;
+CREATE TRIGGER conversations_message_insert
+AFTER INSERT ON messages
+FOR EACH ROW
+BEGIN
+    INSERT INTO conversations (user_id, last_message_id, last_timestamp, last_direction, preview,
+                               unread_count_for_admin, unread_count_for_user, assigned_admin_id)
+    VALUES (NEW.user_id, NEW.message_id, NEW.timestamp, NEW.direction, substr(NEW.content, 1, 100),
+            NEW.direction = 'user_to_admin' AND NEW.is_read = 0,
+            NEW.direction = 'admin_to_user' AND NEW.is_read = 0,
+            (SELECT admin_id FROM user_admin_assignments WHERE user_id = NEW.user_id))
+    ON CONFLICT (user_id) DO UPDATE SET
+        last_message_id = CASE WHEN last_timestamp IS NULL OR excluded.last_timestamp >= last_timestamp
+                               THEN excluded.last_message_id ELSE last_message_id END,
+        last_direction = CASE WHEN last_timestamp IS NULL OR excluded.last_timestamp >= last_timestamp
+                              THEN excluded.last_direction ELSE last_direction END,
+        preview = CASE WHEN last_timestamp IS NULL OR excluded.last_timestamp >= last_timestamp
+                       THEN excluded.preview ELSE preview END,
+        last_timestamp = MAX(COALESCE(last_timestamp, ''), excluded.last_timestamp),
+        unread_count_for_admin = unread_count_for_admin + excluded.unread_count_for_admin,
+        unread_count_for_user = unread_count_for_user + excluded.unread_count_for_user;
+END;
+
+-- Đường INSERT cũ truyền message_id NULL, trigger cấp ID cập nhật lại dòng sau đó
+DROP TRIGGER IF EXISTS conversations_message_id_update;
+CREATE TRIGGER conversations_message_id_update
+AFTER UPDATE OF message_id ON messages
+FOR EACH ROW
+BEGIN
+    UPDATE conversations SET last_message_id = NEW.message_id
+    WHERE user_id = NEW.user_id AND last_message_id IS OLD.message_id;
+END;
+
+-- Đánh dấu đã đọc / chưa đọc
+DROP TRIGGER IF EXISTS conversations_message_read;
+CREATE TRIGGER conversations_message_read
+AFTER UPDATE OF is_read ON messages
+FOR EACH ROW
+WHEN OLD.is_read IS NOT NEW.is_read
+BEGIN
+    UPDATE conversations SET
+        unread_count_for_admin = unread_count_for_admin
+            + (NEW.direction = 'user_to_admin' AND NEW.is_read = 0) - (OLD.direction = 'user_to_admin' AND OLD.is_read = 0),
+        unread_count_for_user = unread_count_for_user
+            + (NEW.direction = 'admin_to_user' AND NEW.is_read = 0) - (OLD.direction = 'admin_to_user' AND OLD.is_read = 0)
+    WHERE user_id = NEW.user_id;
+END;
+
+-- Xóa tin: trừ số chưa đọc, tìm lại tin cuối nếu tin bị xóa là tin cuối
+DROP TRIGGER IF EXISTS conversations_message_delete;
+CREATE TRIGGER conversations_message_delete
+AFTER DELETE ON messages
+FOR EACH ROW
+BEGIN
+    UPDATE conversations SET
+        unread_count_for_admin = unread_count_for_admin - (OLD.direction = 'user_to_admin' AND OLD.is_read = 0),
+        unread_count_for_user = unread_count_for_user - (OLD.direction = 'admin_to_user' AND OLD.is_read = 0)
+    WHERE user_id = OLD.user_id;
+    UPDATE conversations SET (last_message_id, last_timestamp, last_direction, preview) = (
+        SELECT message_id, timestamp, direction, substr(content, 1, 100)
+        FROM messages WHERE user_id = OLD.user_id ORDER BY timestamp DESC, rowid DESC LIMIT 1
+    )
+    WHERE user_id = OLD.user_id AND last_message_id IS OLD.message_id;
+END;
+
+-- Gán / đổi / bỏ gán admin
+DROP TRIGGER IF EXISTS conversations_assignment_insert;
+CREATE TRIGGER conversations_assignment_insert
+AFTER INSERT ON user_admin_assignments
+FOR EACH ROW
+BEGIN
+    UPDATE conversations SET assigned_admin_id = NEW.admin_id WHERE user_id = NEW.user_id;
+END;
+
+DROP TRIGGER IF EXISTS conversations_assignment_update;
+CREATE TRIGGER conversations_assignment_update
+AFTER UPDATE OF admin_id, user_id ON user_admin_assignments
+FOR EACH ROW
+BEGIN
+    UPDATE conversations SET assigned_admin_id = NULL WHERE user_id = OLD.user_id;
+    UPDATE conversations SET assigned_admin_id = NEW.admin_id WHERE user_id = NEW.user_id;
+END;
+
+DROP TRIGGER IF EXISTS conversations_assignment_delete;
+CREATE TRIGGER conversations_assignment_delete
+AFTER DELETE ON user_admin_assignments
+FOR EACH ROW
+BEGIN
+    UPDATE conversations SET assigned_admin_id = NULL WHERE user_id = OLD.user_id;
+END;
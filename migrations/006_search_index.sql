@@ -0,0 +1,130 @@
+-- Chỉ mục tìm kiếm toàn văn (FTS5) cho /api/search: sản phẩm, nội dung tin nhắn, khách hàng.
+-- Bảng external-content: chỉ lưu chỉ mục, nội dung đọc từ bảng gốc qua rowid.
+-- unicode61 remove_diacritics 2 bỏ dấu tiếng Việt ("cà phê" khớp "ca phe"); riêng "đ" không phải dấu
+-- nên được đổi thành "d" khi ghi chỉ mục (và khi tìm, xem models/search.py).
+-- prefix='2 3' giúp tìm theo tiền tố ngắn nhanh hơn. Trigger giữ chỉ mục đồng bộ với mọi đường ghi.
+-- Sau VACUUM (có thể đổi rowid) cần dựng lại: python -m utils.rollups
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    product_name, description, category,
+    content='products', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    content='messages', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    first_name, last_name, email, phone,
+    content='users', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+-- Dữ liệu ban đầu
+INSERT INTO products_fts(products_fts) VALUES ('delete-all');
+INSERT INTO products_fts (rowid, product_name, description, category)
+SELECT rowid, replace(replace(product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(description, 'đ', 'd'), 'Đ', 'D'),
+       replace(replace(category, 'đ', 'd'), 'Đ', 'D')
+FROM products;
+INSERT INTO messages_fts(messages_fts) VALUES ('delete-all');
+INSERT INTO messages_fts (rowid, content)
+SELECT rowid, replace(replace(content, 'đ', 'd'), 'Đ', 'D') FROM messages;
+INSERT INTO users_fts(users_fts) VALUES ('delete-all');
+INSERT INTO users_fts (rowid, first_name, last_name, email, phone)
+SELECT rowid, replace(replace(first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(last_name, 'đ', 'd'), 'Đ', 'D'), email, phone
+FROM users;
+
+-- products
+DROP TRIGGER IF EXISTS products_fts_insert;
+CREATE TRIGGER products_fts_insert
+AFTER INSERT ON products
+FOR EACH ROW
+BEGIN
+    INSERT INTO products_fts (rowid, product_name, description, category)
+    VALUES (NEW.rowid, replace(replace(NEW.product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(NEW.description, 'đ', 'd'), 'Đ', 'D'),
+            replace(replace(NEW.category, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+DROP TRIGGER IF EXISTS products_fts_delete;
+CREATE TRIGGER products_fts_delete
+AFTER DELETE ON products
+FOR EACH ROW
+BEGIN
+    INSERT INTO products_fts (products_fts, rowid, product_name, description, category)
+    VALUES ('delete', OLD.rowid, replace(replace(OLD.product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(OLD.description, 'đ', 'd'), 'Đ', 'D'),
+            replace(replace(OLD.category, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+DROP TRIGGER IF EXISTS products_fts_update;
+CREATE TRIGGER products_fts_update
+AFTER UPDATE OF product_name, description, category ON products
+FOR EACH ROW
+BEGIN
+    INSERT INTO products_fts (products_fts, rowid, product_name, description, category)
+    VALUES ('delete', OLD.rowid, replace(replace(OLD.product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(OLD.description, 'đ', 'd'), 'Đ', 'D'),
+            replace(replace(OLD.category, 'đ', 'd'), 'Đ', 'D'));
+    INSERT INTO products_fts (rowid, product_name, description, category)
+    VALUES (NEW.rowid, replace(replace(NEW.product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(NEW.description, 'đ', 'd'), 'Đ', 'D'),
+            replace(replace(NEW.category, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+-- messages
+DROP TRIGGER IF EXISTS messages_fts_insert;
+CREATE TRIGGER messages_fts_insert
+AFTER INSERT ON messages
+FOR EACH ROW
+BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (NEW.rowid, replace(replace(NEW.content, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+DROP TRIGGER IF EXISTS messages_fts_delete;
+CREATE TRIGGER messages_fts_delete
+AFTER DELETE ON messages
+FOR EACH ROW
+BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', OLD.rowid, replace(replace(OLD.content, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+DROP TRIGGER IF EXISTS messages_fts_update;
+CREATE TRIGGER messages_fts_update
+AFTER UPDATE OF content ON messages
+FOR EACH ROW
+BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', OLD.rowid, replace(replace(OLD.content, 'đ', 'd'), 'Đ', 'D'));
+    INSERT INTO messages_fts (rowid, content) VALUES (NEW.rowid, replace(replace(NEW.content, 'đ', 'd'), 'Đ', 'D'));
+END;
+
+-- users
+DROP TRIGGER IF EXISTS users_fts_insert;
+CREATE TRIGGER users_fts_insert
+AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO users_fts (rowid, first_name, last_name, email, phone)
+    VALUES (NEW.rowid, replace(replace(NEW.first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(NEW.last_name, 'đ', 'd'), 'Đ', 'D'),
+            NEW.email, NEW.phone);
+END;
+
+DROP TRIGGER IF EXISTS users_fts_delete;
+CREATE TRIGGER users_fts_delete
+AFTER DELETE ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO users_fts (users_fts, rowid, first_name, last_name, email, phone)
+    VALUES ('delete', OLD.rowid, replace(replace(OLD.first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(OLD.last_name, 'đ', 'd'), 'Đ', 'D'),
+            OLD.email, OLD.phone);
+END;
+
+DROP TRIGGER IF EXISTS users_fts_update;
+CREATE TRIGGER users_fts_update
+AFTER UPDATE OF first_name, last_name, email, phone ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO users_fts (users_fts, rowid, first_name, last_name, email, phone)
+    VALUES ('delete', OLD.rowid, replace(replace(OLD.first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(OLD.last_name, 'đ', 'd'), 'Đ', 'D'),
+            OLD.email, OLD.phone);
+    INSERT INTO users_fts (rowid, first_name, last_name, email, phone)
+    VALUES (NEW.rowid, replace(replace(NEW.first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(NEW.last_name, 'đ', 'd'), 'Đ', 'D'),
+            NEW.email, NEW.phone);
+END;
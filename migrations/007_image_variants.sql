@@ -0,0 +1,15 @@
+-- Các bản ảnh đã xử lý cho ảnh tải lên (sản phẩm, ảnh hồ sơ, ảnh đánh giá), theo URL của ảnh gốc:
+-- thumb / card / detail, mã hóa lại WebP (và AVIF nếu Pillow hỗ trợ), đã bỏ metadata.
+-- utils.images ghi bảng này trong luồng nền sau khi request tải ảnh đã trả về; ảnh chưa có dòng nào
+-- thì giao diện dùng ảnh gốc. Xử lý lại toàn bộ ảnh đang dùng: python -m utils.images
+
+CREATE TABLE IF NOT EXISTS image_variants (
+    source_url TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    format TEXT NOT NULL,
+    url TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (source_url, variant, format)
+) WITHOUT ROWID;
@@ -0,0 +1,19 @@
+-- Khóa chống gửi trùng (header Idempotency-Key) cho các API tạo đơn hàng.
+-- Request đầu tiên giữ khóa (status_code NULL = đang xử lý), rồi lưu lại response;
+-- request gửi lại cùng khóa trong thời hạn nhận đúng response đó mà không tạo đơn lần nữa.
+-- scope = endpoint + người gửi, nên hai tài khoản dùng trùng khóa không ảnh hưởng nhau.
+-- Dòng hết hạn (expires_at, giây Unix) được utils.idempotency xóa định kỳ.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    response_body BLOB,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (scope, idempotency_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
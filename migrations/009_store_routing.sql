@@ -0,0 +1,4 @@
+-- Phân đơn hàng cho cửa hàng (models/store_router.py) đếm số đơn 'Pending' của từng cửa hàng
+-- trong mỗi lần đặt hàng; chỉ mục này cho phép đếm trên chỉ mục, không phải đọc bảng orders.
+
+CREATE INDEX IF NOT EXISTS idx_orders_status_store_id ON orders(status, store_id);
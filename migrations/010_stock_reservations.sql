@@ -0,0 +1,49 @@
+-- Giữ hàng khi đặt (models/stock_reservation.py): giao dịch tạo đơn trừ products.stock có điều kiện
+-- (stock >= số lượng) và ghi số đã giữ của từng sản phẩm vào stock_reservations.
+-- Trigger trả hàng về kho khi đơn bị hủy hoặc bị xóa, nên mọi đường ghi (OrderAdmin, app_admin.py,
+-- khách hủy đơn) đều giữ tồn kho đúng. Khi đơn được giao, phần giữ được đánh dấu sold = 1 (hàng đã bán):
+-- hủy hoặc xóa chỉ trả về phần còn giữ, còn StockReservation.rebook dựa vào đó khi admin sửa một đơn
+-- đã giao để trả đúng số đã bán về kho rồi lấy theo dòng mới, thay vì lấy hàng lần thứ hai.
+-- Đơn tạo trước migration này không có phần giữ nên hủy chúng không cộng thêm vào kho.
+
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    order_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL CHECK(quantity > 0),
+    sold INTEGER NOT NULL DEFAULT 0 CHECK(sold IN (0, 1)),
+    PRIMARY KEY (order_id, product_id)
+) WITHOUT ROWID;
+
+DROP TRIGGER IF EXISTS stock_reservations_cancel;
+CREATE TRIGGER stock_reservations_cancel
+AFTER UPDATE OF status ON orders
+FOR EACH ROW
+WHEN NEW.status = 'Cancelled' AND OLD.status <> 'Cancelled'
+BEGIN
+    UPDATE products
+    SET stock = stock + (SELECT r.quantity FROM stock_reservations r
+                         WHERE r.order_id = NEW.order_id AND r.product_id = products.product_id)
+    WHERE product_id IN (SELECT product_id FROM stock_reservations WHERE order_id = NEW.order_id AND sold = 0);
+    DELETE FROM stock_reservations WHERE order_id = NEW.order_id;
+END;
+
+DROP TRIGGER IF EXISTS stock_reservations_deliver;
+CREATE TRIGGER stock_reservations_deliver
+AFTER UPDATE OF status ON orders
+FOR EACH ROW
+WHEN NEW.status = 'Delivered'
+BEGIN
+    UPDATE stock_reservations SET sold = 1 WHERE order_id = NEW.order_id AND sold = 0;
+END;
+
+DROP TRIGGER IF EXISTS stock_reservations_delete;
+CREATE TRIGGER stock_reservations_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    UPDATE products
+    SET stock = stock + (SELECT r.quantity FROM stock_reservations r
+                         WHERE r.order_id = OLD.order_id AND r.product_id = products.product_id)
+    WHERE product_id IN (SELECT product_id FROM stock_reservations WHERE order_id = OLD.order_id AND sold = 0);
+    DELETE FROM stock_reservations WHERE order_id = OLD.order_id;
+END;
@@ -0,0 +1,15 @@
+-- Mỗi khách chỉ có một dòng giỏ hàng cho mỗi kích cỡ (size_id xác định luôn sản phẩm):
+-- thêm lại cùng kích cỡ thì CartModel cộng dồn số lượng vào dòng đã có (upsert) thay vì thêm dòng mới.
+-- Các dòng trùng hiện có được gộp vào dòng thêm sớm nhất trước khi tạo chỉ mục UNIQUE.
+-- Chỉ mục mới bắt đầu bằng customer_id nên thay luôn idx_cart_customer_id (migration 001).
+
+UPDATE cart
+SET quantity = (SELECT SUM(d.quantity) FROM cart d
+                WHERE d.customer_id = cart.customer_id AND d.size_id = cart.size_id)
+WHERE rowid IN (SELECT MIN(rowid) FROM cart GROUP BY customer_id, size_id HAVING COUNT(*) > 1);
+
+DELETE FROM cart
+WHERE rowid NOT IN (SELECT MIN(rowid) FROM cart GROUP BY customer_id, size_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cart_customer_size ON cart(customer_id, size_id);
+DROP INDEX IF EXISTS idx_cart_customer_id;
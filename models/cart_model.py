@@ -5,11 +5,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_OPERATIONS = 50
+
 class CartModel:
     @staticmethod
     def get_cart(customer_id):
         conn = get_db_connection()
         cursor = conn.cursor()
+        cart_items = CartModel._cart_rows(cursor, customer_id)
+        conn.close()
+        return cart_items
+
+    @staticmethod
+    def _cart_rows(cursor, customer_id):
         cursor.execute('''
             SELECT c.cart_id, c.product_id, c.quantity, c.size_id, ps.size, ps.price, 
                    p.product_name, p.image_url, p.discount
@@ -18,12 +26,11 @@ class CartModel:
             JOIN products p ON c.product_id = p.product_id
             WHERE c.customer_id = ?
         ''', (customer_id,))
-        cart_items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return cart_items
+        return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
     def add_to_cart(customer_id, product_id, quantity, size_id):
+        quantity = CartModel._quantity(quantity)
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('''
@@ -36,15 +43,29 @@ class CartModel:
         if not size_data:
             conn.close()
             raise ValueError("Kích thước không hợp lệ")
-        cart_id = str(uuid.uuid4())
-        cursor.execute('''
-            INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (cart_id, customer_id, product_id, size_id, quantity))
+        cart_id = CartModel._add_line(cursor, customer_id, product_id, size_id, quantity)
         conn.commit()
         conn.close()
         return cart_id, size_data['price'], size_data['discount'] or 0
 
+    @staticmethod
+    def _add_line(cursor, customer_id, product_id, size_id, quantity):
+        # One line per (customer_id, size_id) (migration 011): adding a size
+        # already in the cart raises that line's quantity
+        cursor.execute('''
+            INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (customer_id, size_id) DO UPDATE SET quantity = cart.quantity + excluded.quantity
+        ''', (str(uuid.uuid4()), customer_id, product_id, size_id, quantity))
+        cursor.execute('SELECT cart_id FROM cart WHERE customer_id = ? AND size_id = ?', (customer_id, size_id))
+        return cursor.fetchone()['cart_id']
+
+    @staticmethod
+    def _quantity(quantity, prefix=''):
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+            raise ValueError(f"{prefix}Số lượng phải là số nguyên dương")
+        return quantity
+
     @staticmethod
     def update_cart_item(customer_id, cart_id, quantity):
         conn = get_db_connection()
@@ -67,4 +88,67 @@ class CartModel:
         rows_affected = cursor.rowcount
         conn.commit()
         conn.close()
-        return rows_affected
\ No newline at end of file
+        return rows_affected
+
+    @staticmethod
+    def apply_batch(customer_id, operations):
+        # operations: [{'op': 'add', 'product_id', 'size_id', 'quantity'},
+        #              {'op': 'update', 'cart_id', 'quantity'}, {'op': 'remove', 'cart_id'}]
+        # applied in order in one transaction, all or none; returns the cart as
+        # it stands afterwards, read in the same transaction. Removing a line
+        # that is already gone is not an error.
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Thiếu danh sách thao tác")
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"Tối đa {MAX_BATCH_OPERATIONS} thao tác mỗi lần")
+        if not all(isinstance(operation, dict) for operation in operations):
+            raise ValueError("Thao tác không hợp lệ")
+        size_ids = sorted({operation.get('size_id') for operation in operations if operation.get('op') == 'add'})
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            sizes = {}
+            if size_ids:
+                # Every added size is checked against its product with one query
+                placeholders = ', '.join('?' * len(size_ids))
+                cursor.execute(f'''
+                    SELECT ps.size_id, ps.product_id
+                    FROM product_size ps
+                    JOIN products p ON ps.product_id = p.product_id
+                    WHERE ps.size_id IN ({placeholders})
+                ''', size_ids)
+                sizes = {row['size_id']: row['product_id'] for row in cursor.fetchall()}
+            for index, operation in enumerate(operations, 1):
+                prefix = f"Thao tác {index}: "
+                kind = operation.get('op')
+                cart_id = operation.get('cart_id')
+                if kind == 'add':
+                    product_id = operation.get('product_id')
+                    size_id = operation.get('size_id')
+                    if not product_id or sizes.get(size_id) != product_id:
+                        raise ValueError(f"{prefix}Kích thước không hợp lệ")
+                    quantity = CartModel._quantity(operation.get('quantity'), prefix)
+                    CartModel._add_line(cursor, customer_id, product_id, size_id, quantity)
+                elif kind == 'update':
+                    quantity = CartModel._quantity(operation.get('quantity'), prefix)
+                    cursor.execute('UPDATE cart SET quantity = ? WHERE cart_id = ? AND customer_id = ?',
+                                   (quantity, cart_id, customer_id))
+                    if cursor.rowcount == 0:
+                        raise ValueError(f"{prefix}Không tìm thấy mục trong giỏ hàng")
+                elif kind == 'remove':
+                    cursor.execute('DELETE FROM cart WHERE cart_id = ? AND customer_id = ?', (cart_id, customer_id))
+                else:
+                    raise ValueError(f"{prefix}Loại thao tác không hợp lệ: {kind}")
+            cart_items = CartModel._cart_rows(cursor, customer_id)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Database error in apply_batch: %s", e)
+            raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return cart_items
\ No newline at end of file
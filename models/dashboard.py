@@ -1,5 +1,6 @@
 import sqlite3
 import logging
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +13,9 @@ except ImportError as e:
 
 class Dashboard:
     @staticmethod
-    def get_dashboard_data(admin_id):
-        logger.debug(f"Fetching dashboard data for admin_id={admin_id}")
+    def get_dashboard_data(admin_id, year=None, store_id=None):
+        year = year or datetime.now().year
+        logger.debug("Fetching dashboard data for admin_id=%s, year=%s, store_id=%s", admin_id, year, store_id)
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
@@ -29,52 +31,50 @@ class Dashboard:
             total_users = cursor.fetchone()['count']
             logger.debug(f"Total users: {total_users}")
 
-            # Lấy tổng số đơn hàng đã giao
-            cursor.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'Delivered'")
-            total_orders = cursor.fetchone()['count']
-            logger.debug(f"Total orders: {total_orders}")
+            # Số đơn và doanh thu theo trạng thái, đọc từ bảng tổng hợp theo tháng (migration 004)
+            store_filter = ' AND store_id = ?' if store_id else ''
+            store_params = [store_id] if store_id else []
+            cursor.execute(f"""
+                SELECT status, SUM(order_count) as count, SUM(sales) as total
+                FROM order_stats_monthly
+                WHERE 1 = 1{store_filter}
+                GROUP BY status
+            """, store_params)
+            totals = {row['status']: row for row in cursor.fetchall()}
+            delivered = totals.get('Delivered')
+            total_orders = delivered['count'] if delivered else 0
+            total_sales = (delivered['total'] or 0) if delivered else 0
+            total_pending = totals['Pending']['count'] if 'Pending' in totals else 0
+            logger.debug("Total orders: %s, total sales: %s, total pending: %s", total_orders, total_sales, total_pending)
 
-            # Lấy tổng doanh thu
-            cursor.execute("""
-                SELECT SUM(od.total_price) as total 
-                FROM order_details od
-                JOIN orders o ON od.order_id = o.order_id
-                WHERE o.status = 'Delivered'
-            """)
-            total_sales = cursor.fetchone()['total'] or 0
-            logger.debug(f"Total sales: {total_sales}")
-
-            # Lấy tổng số đơn hàng đang chờ
-            cursor.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'Pending'")
-            total_pending = cursor.fetchone()['count']
-            logger.debug(f"Total pending orders: {total_pending}")
-
-            # Lấy dữ liệu doanh thu theo tháng
+            # Lấy dữ liệu doanh thu theo tháng của năm được chọn
             sales_data = [0] * 12
-            cursor.execute("""
-                SELECT strftime('%m', o.order_date) as month, SUM(od.total_price) as total
-                FROM order_details od
-                JOIN orders o ON od.order_id = o.order_id
-                WHERE o.status = 'Delivered' AND strftime('%Y', o.order_date) = '2025'
+            cursor.execute(f"""
+                SELECT month, SUM(sales) as total
+                FROM order_stats_monthly
+                WHERE month BETWEEN ? AND ? AND status = 'Delivered'{store_filter}
                 GROUP BY month
-            """)
+            """, [f"{year:04d}-01", f"{year:04d}-12"] + store_params)
             for row in cursor:
-                month = int(row['month']) - 1
+                month = int(row['month'][5:7]) - 1
                 sales_data[month] = row['total'] / 1_000_000 if row['total'] else 0
-            logger.debug(f"Sales data: {sales_data}")
+            logger.debug("Sales data: %s", sales_data)
+
+            cursor.execute("SELECT DISTINCT substr(month, 1, 4) as year FROM order_stats_monthly")
+            years = sorted({int(row['year']) for row in cursor.fetchall()} | {year}, reverse=True)
 
             # Lấy danh sách giao dịch gần đây
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT p.product_name, s.address as location, o.order_date,
                        od.quantity, od.total_price, o.status
                 FROM order_details od
                 JOIN products p ON od.product_id = p.product_id
                 JOIN orders o ON od.order_id = o.order_id
                 JOIN stores s ON o.store_id = s.store_id
-                WHERE o.status IN ('Delivered', 'Pending')
+                WHERE o.status IN ('Delivered', 'Pending'){' AND o.store_id = ?' if store_id else ''}
                 ORDER BY o.order_date DESC
                 LIMIT 10
-            """)
+            """, store_params)
             deals = []
             for row in cursor:
                 status_color = {
@@ -91,7 +91,7 @@ class Dashboard:
                     'status': row['status'],
                     'status_color': status_color
                 })
-            logger.debug(f"Deals: {deals}")
+            logger.debug("Deals: %s", deals)
 
             return {
                 'admin': dict(admin),
@@ -100,6 +100,8 @@ class Dashboard:
                 'total_sales': total_sales,
                 'total_pending': total_pending,
                 'sales_data': sales_data,
+                'year': year,
+                'years': years,
                 'deals': deals
             }
         except ValueError as e:
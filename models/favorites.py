@@ -1,5 +1,6 @@
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,9 +51,9 @@ class Favorites:
                 logger.debug(f"Product already in favorites: product_id={product_id}")
                 raise ValueError("Product already in favorites")
             cursor.execute("""
-                INSERT INTO favorites (admin_id, product_id)
-                VALUES (?, ?)
-            """, (admin_id, product_id))
+                INSERT INTO favorites (favorite_id, admin_id, product_id)
+                VALUES (?, ?, ?)
+            """, (next_id('favorites', conn), admin_id, product_id))
             conn.commit()
             logger.info(f"Favorite added: product_id={product_id}")
         except sqlite3.Error as e:
@@ -1,59 +1,88 @@
 # models/inbox.py
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
+from utils.events import inbox_events, conversation_channels, user_channel, admin_channel, ADMINS_CHANNEL
 import logging
 from datetime import datetime
-import pytz
+from utils.timefmt import format_clock, format_column
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_MAX_PAGE_SIZE = 200
+THREAD_PAGE_SIZE = 50
+THREAD_MAX_PAGE_SIZE = 200
+
+
+def message_cursor(timestamp, message_id):
+    return f"{timestamp}|{message_id}"
+
+
+def parse_message_cursor(value):
+    # Cursors are "timestamp|message_id" positions in a conversation, as returned by get_messages;
+    # thread list cursors have the same "last_timestamp|user_id" shape
+    if not value:
+        return None
+    timestamp, sep, message_id = value.partition('|')
+    if not sep or not timestamp or not message_id:
+        raise ValueError('Cursor không hợp lệ')
+    return timestamp, message_id
+
+
 class Inbox:
     @staticmethod
-    def get_threads(admin_id):
-        logger.debug(f"Fetching threads for admin_id={admin_id}")
+    def get_threads(admin_id, before=None, limit=THREAD_PAGE_SIZE):
+        # before is a parsed thread cursor: the page of threads older than it
+        logger.debug("Fetching threads for admin_id=%s, before=%s, limit=%s", admin_id, before, limit)
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT m.user_id, u.first_name || ' ' || u.last_name AS sender_name, 
-                       m.content, m.timestamp, m.is_read, m.direction,
-                       EXISTS (
-                           SELECT 1 FROM messages m2
-                           WHERE m2.user_id = m.user_id 
-                           AND (m2.admin_id = ? OR m2.admin_id IS NULL)
-                           AND m2.direction = 'user_to_admin' AND m2.is_read = 0
-                       ) AS has_unread
-                FROM messages m
-                JOIN users u ON m.user_id = u.customer_id
-                LEFT JOIN user_admin_assignments ua ON m.user_id = ua.user_id
-                WHERE (m.admin_id = ? OR m.admin_id IS NULL) 
-                AND (ua.admin_id = ? OR ua.admin_id IS NULL)
-                AND m.message_id = (
-                    SELECT message_id 
-                    FROM messages m2 
-                    WHERE m2.user_id = m.user_id 
-                    AND (m2.admin_id = ? OR m2.admin_id IS NULL)
-                    ORDER BY m2.timestamp DESC 
-                    LIMIT 1
-                )
-                ORDER BY m.timestamp DESC
-            """, (admin_id, admin_id, admin_id, admin_id))
+            # One row per customer in conversations (migration 005), read newest first
+            # from idx_conversations_recent; unassigned threads are visible to every admin.
+            # CROSS JOIN keeps conversations as the outer loop so the index supplies the order,
+            # and the (last_timestamp, user_id) keyset continues from the previous page.
+            where = ["(c.assigned_admin_id = ? OR c.assigned_admin_id IS NULL)",
+                     "c.last_message_id IS NOT NULL"]
+            params = [admin_id]
+            if before:
+                where.append("(c.last_timestamp, c.user_id) < (?, ?)")
+                params += list(before)
+            cursor.execute(f"""
+                SELECT c.user_id, u.first_name || ' ' || u.last_name AS sender_name,
+                       c.preview, c.last_timestamp, c.last_direction,
+                       c.unread_count_for_admin, c.unread_count_for_user
+                FROM conversations c
+                CROSS JOIN users u ON c.user_id = u.customer_id
+                WHERE {' AND '.join(where)}
+                ORDER BY c.last_timestamp DESC, c.user_id DESC
+                LIMIT ?
+            """, params + [limit + 1])
             threads = []
-            for row in cursor:
-                dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-                local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-                time_str = local_dt.strftime('%I:%M %p')
+            rows = cursor.fetchall()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = message_cursor(rows[-1]['last_timestamp'], rows[-1]['user_id'])
+            times = format_column([row['last_timestamp'] for row in rows], format_clock)
+            for row, time_str in zip(rows, times):
+                # The last message is unread while its recipient still has unread messages
+                if row['last_direction'] == 'user_to_admin':
+                    is_read = int(row['unread_count_for_admin'] == 0)
+                else:
+                    is_read = int(row['unread_count_for_user'] == 0)
                 threads.append({
                     'user_id': row['user_id'],
                     'sender_name': row['sender_name'],
-                    'content': row['content'],
+                    'content': row['preview'],
                     'time': time_str,
-                    'is_read': row['is_read'],
-                    'direction': row['direction'],
-                    'has_unread': bool(row['has_unread'])
+                    'is_read': is_read,
+                    'direction': row['last_direction'],
+                    'has_unread': row['unread_count_for_admin'] > 0,
+                    'unread_count': row['unread_count_for_admin']
                 })
-            logger.debug(f"Retrieved {len(threads)} threads")
-            return threads
+            logger.debug("Retrieved %s threads", len(threads))
+            return {'threads': threads, 'next_cursor': next_cursor}
         except sqlite3.Error as e:
             logger.error(f"Database error in get_threads: {str(e)}")
             raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
@@ -61,8 +90,10 @@ class Inbox:
             conn.close()
 
     @staticmethod
-    def get_messages(user_id, admin_id):
-        logger.debug(f"Fetching messages for user_id={user_id}, admin_id={admin_id}")
+    def get_messages(user_id, admin_id, before=None, after=None, limit=MESSAGE_PAGE_SIZE):
+        # before/after are parsed cursors (see parse_message_cursor): the latest page by default,
+        # older history with before, only messages newer than after with after
+        logger.debug("Fetching messages for user_id=%s, admin_id=%s, before=%s, after=%s, limit=%s", user_id, admin_id, before, after, limit)
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
@@ -71,44 +102,33 @@ class Inbox:
             if assigned_admin and assigned_admin['admin_id'] != admin_id:
                 logger.debug(f"Conversation assigned to another admin: assigned_admin_id={assigned_admin['admin_id']}")
                 raise ValueError("Cuộc trò chuyện này đã được admin khác xử lý")
-            cursor.execute("""
-                SELECT m.message_id, m.user_id, m.admin_id, m.direction, 
-                       m.content, m.timestamp, m.is_read,
-                       CASE 
-                           WHEN m.direction = 'user_to_admin' THEN (u.first_name || ' ' || u.last_name)
-                           WHEN m.direction = 'admin_to_user' THEN (a.first_name || ' ' || a.last_name)
-                       END AS sender_name
-                FROM messages m
-                LEFT JOIN users u ON m.user_id = u.customer_id
-                LEFT JOIN admins a ON m.admin_id = a.admin_id
-                WHERE m.user_id = ? 
-                AND (m.admin_id = ? OR m.admin_id IS NULL)
-                ORDER BY m.timestamp ASC
-            """, (user_id, admin_id))
-            messages = []
-            for row in cursor:
-                dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-                local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-                time_str = local_dt.strftime('%I:%M %p')
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user_id': row['user_id'],
-                    'admin_id': row['admin_id'],
-                    'sender_name': row['sender_name'],
-                    'content': row['content'],
-                    'time': time_str,
-                    'is_read': row['is_read'],
-                    'direction': row['direction']
-                })
-            cursor.execute("""
-                UPDATE messages SET is_read = 1
-                WHERE user_id = ? AND (admin_id = ? OR admin_id IS NULL) 
-                AND direction = 'user_to_admin' AND is_read = 0
-            """, (user_id, admin_id))
-            conn.commit()
-            logger.debug(f"Retrieved {len(messages)} messages")
-            return messages
+            page = Inbox.fetch_message_page(cursor, user_id, admin_id, before, after, limit)
+            # Only write when the summary says something is unread, and only for the delivered range
+            cursor.execute("SELECT unread_count_for_admin FROM conversations WHERE user_id = ?", (user_id,))
+            conversation = cursor.fetchone()
+            marked_read = 0
+            if page['messages'] and conversation and conversation['unread_count_for_admin'] > 0:
+                cursor.execute("""
+                    UPDATE messages SET is_read = 1
+                    WHERE user_id = ? AND (admin_id = ? OR admin_id IS NULL) 
+                    AND direction = 'user_to_admin' AND is_read = 0
+                    AND (timestamp, message_id) >= (?, ?) AND (timestamp, message_id) <= (?, ?)
+                """, (user_id, admin_id) + page['first'] + page['last'])
+                marked_read = cursor.rowcount
+                conn.commit()
+            if marked_read:
+                # Read receipt for the customer, and clears the unread mark in the admin's other tabs
+                inbox_events.publish(conversation_channels(user_id, admin_id), 'read',
+                                     {'user_id': user_id, 'admin_id': admin_id, 'direction': 'user_to_admin'})
+            logger.debug("Retrieved %s messages", len(page['messages']))
+            return {
+                'messages': page['messages'],
+                'older_cursor': page['older_cursor'],
+                'newer_cursor': page['newer_cursor'],
+                'has_newer': page['has_newer']
+            }
         except sqlite3.Error as e:
+            conn.rollback()
             logger.error(f"Database error in get_messages: {str(e)}")
             raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
         except ValueError as e:
@@ -116,6 +136,75 @@ class Inbox:
         finally:
             conn.close()
 
+    @staticmethod
+    def fetch_message_page(cursor, user_id, admin_id, before=None, after=None, limit=MESSAGE_PAGE_SIZE,
+                           all_admins=False):
+        # Keyset page over idx_messages_user_id_timestamp, limit + 1 rows to detect more.
+        # Messages come back oldest first whichever direction the page was read in.
+        where = ["m.user_id = ?"]
+        params = [user_id]
+        if not all_admins:
+            where.append("(m.admin_id = ? OR m.admin_id IS NULL)")
+            params.append(admin_id)
+        if after:
+            where.append("(m.timestamp, m.message_id) > (?, ?)")
+            params += list(after)
+            order = "ASC"
+        else:
+            if before:
+                where.append("(m.timestamp, m.message_id) < (?, ?)")
+                params += list(before)
+            order = "DESC"
+        cursor.execute(f"""
+            SELECT m.message_id, m.user_id, m.admin_id, m.direction, 
+                   m.content, m.timestamp, m.is_read,
+                   CASE 
+                       WHEN m.direction = 'user_to_admin' THEN (u.first_name || ' ' || u.last_name)
+                       WHEN m.direction = 'admin_to_user' THEN (a.first_name || ' ' || a.last_name)
+                   END AS sender_name
+            FROM messages m
+            LEFT JOIN users u ON m.user_id = u.customer_id
+            LEFT JOIN admins a ON m.admin_id = a.admin_id
+            WHERE {' AND '.join(where)}
+            ORDER BY m.timestamp {order}, m.message_id {order}
+            LIMIT ?
+        """, params + [limit + 1])
+        rows = cursor.fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if not after:
+            rows.reverse()
+        times = format_column([row['timestamp'] for row in rows], format_clock)
+        messages = []
+        for row, time_str in zip(rows, times):
+            messages.append({
+                'message_id': row['message_id'],
+                'user_id': row['user_id'],
+                'admin_id': row['admin_id'],
+                'sender_name': row['sender_name'],
+                'content': row['content'],
+                'time': time_str,
+                'is_read': row['is_read'],
+                'direction': row['direction']
+            })
+        first = (rows[0]['timestamp'], rows[0]['message_id']) if rows else None
+        last = (rows[-1]['timestamp'], rows[-1]['message_id']) if rows else None
+        if last:
+            newer_cursor = message_cursor(*last)
+        elif after:
+            newer_cursor = message_cursor(*after)
+        else:
+            newer_cursor = None
+        return {
+            'messages': messages,
+            'first': first,
+            'last': last,
+            # older history exists only if this page stopped short of it
+            'older_cursor': message_cursor(*first) if more and not after else None,
+            'newer_cursor': newer_cursor,
+            'has_newer': more if after else False
+        }
+
     @staticmethod
     def send_message(user_id, admin_id, direction, content):
         logger.debug(f"Sending message: user_id={user_id}, admin_id={admin_id}, direction={direction}")
@@ -125,8 +214,9 @@ class Inbox:
             if direction not in ['user_to_admin', 'admin_to_user']:
                 logger.error(f"Invalid direction: {direction}")
                 raise ValueError("Hướng tin nhắn không hợp lệ")
-            cursor.execute('SELECT customer_id FROM users WHERE customer_id = ?', (user_id,))
-            if not cursor.fetchone():
+            cursor.execute('SELECT customer_id, first_name, last_name FROM users WHERE customer_id = ?', (user_id,))
+            sender = cursor.fetchone()
+            if not sender:
                 logger.error(f"Invalid user_id: {user_id}")
                 raise ValueError("ID khách hàng không hợp lệ")
             if direction == 'user_to_admin':
@@ -134,8 +224,9 @@ class Inbox:
                 assigned_admin = cursor.fetchone()
                 admin_id = assigned_admin['admin_id'] if assigned_admin else None
             else:
-                cursor.execute('SELECT admin_id FROM admins WHERE admin_id = ?', (admin_id,))
-                if not cursor.fetchone():
+                cursor.execute('SELECT admin_id, first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
+                sender = cursor.fetchone()
+                if not sender:
                     logger.error(f"Invalid admin_id: {admin_id}")
                     raise ValueError("ID admin không hợp lệ")
                 cursor.execute("SELECT admin_id FROM user_admin_assignments WHERE user_id = ?", (user_id,))
@@ -143,15 +234,17 @@ class Inbox:
                 if assigned_admin and assigned_admin['admin_id'] != admin_id:
                     logger.debug(f"User assigned to another admin: assigned_admin_id={assigned_admin['admin_id']}")
                     raise ValueError("User đã được gán cho admin khác")
+            message_id = next_id('messages')
+            timestamp = datetime.now().isoformat()
             cursor.execute("""
                 INSERT INTO messages (message_id, user_id, admin_id, direction, content, timestamp, is_read)
-                VALUES (NULL, ?, ?, ?, ?, ?, ?)
-            """, (user_id, admin_id, direction, content, datetime.now().isoformat(), 0))
-            cursor.execute('SELECT message_id FROM messages WHERE rowid = last_insert_rowid()')
-            message = cursor.fetchone()
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (message_id, user_id, admin_id, direction, content, timestamp, 0))
             conn.commit()
-            logger.info(f"Message sent: message_id={message['message_id']}")
-            return message['message_id']
+            logger.info("Message sent: message_id=%s", message_id)
+            Inbox.publish_message(message_id, user_id, admin_id, direction, content, timestamp,
+                                  f"{sender['first_name']} {sender['last_name']}")
+            return message_id
         except sqlite3.Error as e:
             conn.rollback()
             logger.error(f"Database error in send_message: {str(e)}")
@@ -190,6 +283,9 @@ class Inbox:
             """, (admin_id, user_id))
             conn.commit()
             logger.info(f"Admin assigned: user_id={user_id}, admin_id={admin_id}")
+            # Other admins drop the thread from their unassigned list
+            inbox_events.publish([user_channel(user_id), admin_channel(admin_id), ADMINS_CHANNEL], 'assigned',
+                                 {'user_id': user_id, 'admin_id': admin_id})
         except sqlite3.Error as e:
             conn.rollback()
             logger.error(f"Database error in assign_admin: {str(e)}")
@@ -197,4 +293,18 @@ class Inbox:
         except ValueError as e:
             raise e
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @staticmethod
+    def publish_message(message_id, user_id, admin_id, direction, content, timestamp, sender_name):
+        # Same shape as the rows returned by get_messages, so clients render it directly
+        inbox_events.publish(conversation_channels(user_id, admin_id), 'message', {
+            'message_id': message_id,
+            'user_id': user_id,
+            'admin_id': admin_id,
+            'sender_name': sender_name,
+            'content': content,
+            'time': format_clock(timestamp),
+            'is_read': 0,
+            'direction': direction
+        })
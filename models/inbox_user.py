@@ -1,7 +1,9 @@
 import sqlite3
 from datetime import datetime
-import pytz
 import logging
+from utils.ids import next_id
+from utils.events import inbox_events, conversation_channels
+from models.inbox import Inbox, MESSAGE_PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +34,8 @@ class InboxUser:
             conn.close()
 
     @staticmethod
-    def get_user_messages_data(user_id):
-        logger.debug(f"Fetching messages for user_id={user_id}")
+    def get_user_messages_data(user_id, before=None, after=None, limit=MESSAGE_PAGE_SIZE):
+        logger.debug("Fetching messages for user_id=%s, before=%s, after=%s, limit=%s", user_id, before, after, limit)
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
@@ -41,36 +43,30 @@ class InboxUser:
             assigned_admin = cursor.fetchone()
             admin_id = assigned_admin['admin_id'] if assigned_admin else None
 
-            cursor.execute("""
-                SELECT m.message_id, m.user_id, m.admin_id, m.direction, 
-                       m.content, m.timestamp, m.is_read,
-                       CASE 
-                           WHEN m.direction = 'user_to_admin' THEN (u.first_name || ' ' || u.last_name)
-                           WHEN m.direction = 'admin_to_user' THEN (a.first_name || ' ' || a.last_name)
-                       END AS sender_name
-                FROM messages m
-                LEFT JOIN users u ON m.user_id = u.customer_id
-                LEFT JOIN admins a ON m.admin_id = a.admin_id
-                WHERE m.user_id = ?
-                ORDER BY m.timestamp ASC
-            """, (user_id,))
-            messages = []
-            for row in cursor:
-                dt = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
-                local_dt = dt.astimezone(pytz.timezone('Asia/Ho_Chi_Minh'))
-                time_str = local_dt.strftime('%I:%M %p')
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user_id': row['user_id'],
-                    'admin_id': row['admin_id'],
-                    'sender_name': row['sender_name'],
-                    'content': row['content'],
-                    'time': time_str,
-                    'is_read': row['is_read'],
-                    'direction': row['direction']
-                })
-            return messages
+            # The customer sees the whole conversation, whichever admin wrote it
+            page = Inbox.fetch_message_page(cursor, user_id, admin_id, before, after, limit, all_admins=True)
+            # Admin replies count as read once delivered to the customer, only in the delivered range
+            cursor.execute("SELECT unread_count_for_user FROM conversations WHERE user_id = ?", (user_id,))
+            conversation = cursor.fetchone()
+            if page['messages'] and conversation and conversation['unread_count_for_user'] > 0:
+                cursor.execute("""
+                    UPDATE messages SET is_read = 1
+                    WHERE user_id = ? AND direction = 'admin_to_user' AND is_read = 0
+                    AND (timestamp, message_id) >= (?, ?) AND (timestamp, message_id) <= (?, ?)
+                """, (user_id,) + page['first'] + page['last'])
+                marked_read = cursor.rowcount
+                conn.commit()
+                if marked_read:
+                    inbox_events.publish(conversation_channels(user_id, admin_id), 'read',
+                                         {'user_id': user_id, 'admin_id': admin_id, 'direction': 'admin_to_user'})
+            return {
+                'messages': page['messages'],
+                'older_cursor': page['older_cursor'],
+                'newer_cursor': page['newer_cursor'],
+                'has_newer': page['has_newer']
+            }
         except sqlite3.Error as e:
+            conn.rollback()
             logger.error(f"SQLite error in get_user_messages_data: {str(e)}")
             raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
         finally:
@@ -87,8 +83,9 @@ class InboxUser:
             if direction == 'admin_to_user' and session.get('admin_id') != admin_id:
                 raise ValueError('Bạn phải đăng nhập với tư cách admin để gửi tin nhắn')
 
-            cursor.execute('SELECT customer_id FROM users WHERE customer_id = ?', (user_id,))
-            if not cursor.fetchone():
+            cursor.execute('SELECT customer_id, first_name, last_name FROM users WHERE customer_id = ?', (user_id,))
+            sender = cursor.fetchone()
+            if not sender:
                 raise ValueError('ID khách hàng không hợp lệ')
 
             if direction == 'user_to_admin':
@@ -96,22 +93,25 @@ class InboxUser:
                 assigned_admin = cursor.fetchone()
                 admin_id = assigned_admin['admin_id'] if assigned_admin else None
             else:
-                cursor.execute('SELECT admin_id FROM admins WHERE admin_id = ?', (admin_id,))
-                if not cursor.fetchone():
+                cursor.execute('SELECT admin_id, first_name, last_name FROM admins WHERE admin_id = ?', (admin_id,))
+                sender = cursor.fetchone()
+                if not sender:
                     raise ValueError('ID admin không hợp lệ')
                 cursor.execute("SELECT admin_id FROM user_admin_assignments WHERE user_id = ?", (user_id,))
                 assigned_admin = cursor.fetchone()
                 if assigned_admin and assigned_admin['admin_id'] != admin_id:
                     raise ValueError('User đã được gán cho admin khác')
 
+            message_id = next_id('messages')
+            timestamp = datetime.now().isoformat()
             cursor.execute("""
                 INSERT INTO messages (message_id, user_id, admin_id, direction, content, timestamp, is_read)
-                VALUES (NULL, ?, ?, ?, ?, ?, ?)
-            """, (user_id, admin_id, direction, content, datetime.now().isoformat(), 0))
-            cursor.execute('SELECT message_id FROM messages WHERE rowid = last_insert_rowid()')
-            message = cursor.fetchone()
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (message_id, user_id, admin_id, direction, content, timestamp, 0))
             conn.commit()
-            return message['message_id']
+            Inbox.publish_message(message_id, user_id, admin_id, direction, content, timestamp,
+                                  f"{sender['first_name']} {sender['last_name']}")
+            return message_id
         except sqlite3.Error as e:
             conn.rollback()
             logger.error(f"SQLite error in send_message_data: {str(e)}")
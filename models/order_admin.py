@@ -1,8 +1,10 @@
 import sqlite3
 import json
 from datetime import datetime
-import uuid
 from utils.db import get_db_connection
+from utils.timefmt import format_datetime
+from utils.ids import next_id
+from models.stock_reservation import StockReservation
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,7 +24,9 @@ class OrderAdmin:
                                'price', ps.price,
                                'size_id', ps.size_id
                            )
-                       ) FROM product_size ps WHERE ps.product_id = p.product_id) AS sizes
+                       ) FROM (SELECT size, price, size_id FROM product_size
+                               WHERE product_id = p.product_id
+                               ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END) ps) AS sizes
                 FROM products p
             """)
             products = [
@@ -86,8 +90,10 @@ class OrderAdmin:
                 raise ValueError('ID cửa hàng không hợp lệ')
 
             order_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            order_id = str(uuid.uuid4())[:8]
-            order_detail_id = str(uuid.uuid4())[:8]
+            order_id = next_id('orders')
+            order_detail_id = next_id('order_details')
+            if status != 'Cancelled':
+                StockReservation.reserve(cursor, order_id, [(product_id, quantity)], hold=status != 'Delivered')
             cursor.execute("""
                 INSERT INTO orders (order_id, customer_id, order_date, status, store_id)
                 VALUES (?, ?, ?, ?, ?)
@@ -123,7 +129,7 @@ class OrderAdmin:
             if not order:
                 raise Exception('Không lấy được đơn hàng vừa tạo')
 
-            formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
+            formatted_date = format_datetime(order['order_date'])
             return {
                 'order_id': order['order_id'],
                 'first_name': order['first_name'],
@@ -187,6 +193,7 @@ class OrderAdmin:
             if not cursor.fetchone():
                 raise ValueError('ID cửa hàng không hợp lệ')
 
+            StockReservation.rebook(cursor, order_id, [(product_id, quantity)], status)
             cursor.execute("""
                 UPDATE orders
                 SET customer_id = ?, status = ?, store_id = ?
@@ -195,7 +202,7 @@ class OrderAdmin:
 
             cursor.execute('DELETE FROM order_details WHERE order_id = ?', (order_id,))
 
-            order_detail_id = str(uuid.uuid4())[:8]
+            order_detail_id = next_id('order_details', conn)
             cursor.execute("""
                 INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -226,7 +233,7 @@ class OrderAdmin:
             if not order:
                 raise Exception('Không lấy được đơn hàng vừa cập nhật')
 
-            formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
+            formatted_date = format_datetime(order['order_date'])
             return {
                 'order_id': order['order_id'],
                 'first_name': order['first_name'],
@@ -316,7 +323,7 @@ class OrderAdmin:
             if not order:
                 raise Exception('Failed to retrieve updated order')
 
-            formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
+            formatted_date = format_datetime(order['order_date'])
             return {
                 'order_id': order['order_id'],
                 'first_name': order['first_name'],
@@ -383,7 +390,7 @@ class OrderAdmin:
             if not order:
                 raise Exception('Failed to retrieve updated order')
 
-            formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
+            formatted_date = format_datetime(order['order_date'])
             return {
                 'order_id': order['order_id'],
                 'first_name': order['first_name'],
@@ -2,59 +2,123 @@
 import sqlite3
 from utils.db import get_db_connection
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from utils.timefmt import format_datetime
 
 logger = logging.getLogger(__name__)
 
+ORDER_PAGE_SIZE = 50
+ORDER_MAX_PAGE_SIZE = 200
+
+STATUS_COLORS = {
+    'Delivered': 'success',
+    'Pending': 'warning',
+    'Cancelled': 'danger',
+    'Processing': 'info'
+}
+
 class OrderLists:
     @staticmethod
-    def get_orders():
-        logger.debug("Fetching orders")
+    def get_orders(status=None, store_id=None, customer_id=None, date_from=None, date_to=None,
+                   cursor=None, limit=ORDER_PAGE_SIZE):
+        logger.debug("Fetching orders: status=%s, store_id=%s, customer_id=%s, date_from=%s, date_to=%s, cursor=%s, limit=%s",
+                     status, store_id, customer_id, date_from, date_to, cursor, limit)
+        where = []
+        params = []
+        if status:
+            where.append("o.status = ?")
+            params.append(status)
+        if store_id:
+            where.append("o.store_id = ?")
+            params.append(store_id)
+        if customer_id:
+            where.append("o.customer_id = ?")
+            params.append(customer_id)
+        # Inclusive days as half-open order_date ranges, so the order_date indexes apply
+        if date_from:
+            where.append("o.order_date >= ?")
+            params.append(OrderLists._parse_day(date_from).strftime('%Y-%m-%d %H:%M:%S'))
+        if date_to:
+            where.append("o.order_date < ?")
+            params.append((OrderLists._parse_day(date_to) + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))
+        if cursor:
+            # Keyset: continue strictly after the last (order_date, order_id) of the previous page
+            try:
+                cursor_date, cursor_id = cursor.split('|', 1)
+            except ValueError:
+                raise ValueError('Cursor không hợp lệ')
+            where.append("(o.order_date, o.order_id) < (?, ?)")
+            params += [cursor_date, cursor_id]
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ''
+
         conn = get_db_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT 
-                    o.order_id, 
-                    u.first_name, 
-                    u.last_name, 
-                    o.order_date, 
-                    o.status,
-                    o.order_date AS raw_date
-                FROM orders o
-                JOIN users u ON o.customer_id = u.customer_id
-            """)
+            # One statement per page: pick the page of orders, then join only its lines
+            db_cursor.execute(f"""
+                WITH page AS (
+                    SELECT
+                        o.order_id,
+                        u.first_name,
+                        u.last_name,
+                        o.order_date,
+                        o.status
+                    FROM orders o
+                    JOIN users u ON o.customer_id = u.customer_id
+                    {where_sql}
+                    ORDER BY o.order_date DESC, o.order_id DESC
+                    LIMIT ?
+                )
+                SELECT
+                    page.order_id, page.first_name, page.last_name, page.order_date, page.status,
+                    p.product_name,
+                    od.quantity,
+                    ps.size,
+                    od.total_price
+                FROM page
+                LEFT JOIN order_details od ON od.order_id = page.order_id
+                LEFT JOIN products p ON od.product_id = p.product_id
+                LEFT JOIN product_size ps ON od.size_id = ps.size_id
+                ORDER BY page.order_date DESC, page.order_id DESC
+            """, params + [limit + 1])
             orders = []
-            for row in cursor.fetchall():
-                order = dict(row)
-                cursor.execute("""
-                    SELECT 
-                        p.product_name, 
-                        od.quantity, 
-                        ps.size, 
-                        od.total_price
-                    FROM order_details od
-                    JOIN products p ON od.product_id = p.product_id
-                    JOIN product_size ps ON od.size_id = ps.size_id
-                    WHERE od.order_id = ?
-                """, (order['order_id'],))
-                order_details = cursor.fetchall()
-                order['product_list'] = [f"{detail['product_name']} x{detail['quantity']}" for detail in order_details]
-                order['size_list'] = [detail['size'] for detail in order_details]
-                order['price_list'] = [detail['total_price'] for detail in order_details]
-                formatted_date = datetime.strptime(order['order_date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y - %I:%M %p')
-                order['order_date'] = formatted_date
-                order['status_color'] = {
-                    'Delivered': 'success',
-                    'Pending': 'warning',
-                    'Cancelled': 'danger',
-                    'Processing': 'info'
-                }.get(order['status'], 'secondary')
-                orders.append(order)
+            by_id = {}
+            for row in db_cursor.fetchall():
+                order = by_id.get(row['order_id'])
+                if order is None:
+                    order = {
+                        'order_id': row['order_id'],
+                        'first_name': row['first_name'],
+                        'last_name': row['last_name'],
+                        'order_date': format_datetime(row['order_date']),
+                        'raw_date': row['order_date'],
+                        'status': row['status'],
+                        'status_color': STATUS_COLORS.get(row['status'], 'secondary'),
+                        'product_list': [],
+                        'size_list': [],
+                        'price_list': []
+                    }
+                    orders.append(order)
+                    by_id[row['order_id']] = order
+                if row['product_name'] is not None:
+                    order['product_list'].append(f"{row['product_name']} x{row['quantity']}")
+                    order['size_list'].append(row['size'])
+                    order['price_list'].append(row['total_price'])
+            next_cursor = None
+            if len(orders) > limit:
+                orders = orders[:limit]
+                next_cursor = f"{orders[-1]['raw_date']}|{orders[-1]['order_id']}"
             logger.debug(f"Retrieved {len(orders)} orders")
-            return orders
+            return {'orders': orders, 'next_cursor': next_cursor}
         except sqlite3.Error as e:
             logger.error(f"Database error in get_orders: {str(e)}")
             raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @staticmethod
+    def _parse_day(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f'Ngày không hợp lệ: {value}')
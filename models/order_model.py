@@ -1,8 +1,10 @@
 import sqlite3
-import uuid
 from datetime import datetime
 import pytz
 from utils.db import get_db_connection
+from utils.ids import next_id, next_ids
+from models.store_router import StoreRouter
+from models.stock_reservation import StockReservation
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,72 +12,72 @@ logger = logging.getLogger(__name__)
 class OrderModel:
     @staticmethod
     def create_order(customer_id, items, note, card_info, calendar_info):
+        # One BEGIN IMMEDIATE transaction with the same statements whatever the
+        # cart size: all cart lines and their prices come from one joined query,
+        # the details go in with executemany and the cart rows leave in one DELETE.
+        # Stock is taken in the same transaction, so a shortage rolls it all back
+        order_date = datetime.now(pytz.timezone('Asia/Ho_Chi_Minh')).strftime('%Y-%m-%d %H:%M:%S')
+        cart_ids = sorted({item.get('cart_id') for item in items})
+        placeholders = ', '.join('?' * len(cart_ids))
+        # IDs are reserved before the transaction opens so no re-read is needed
+        order_id = next_id('orders')
+        order_detail_ids = next_ids('order_details', len(items))
+        payment_id = next_id('payments')
         conn = get_db_connection()
         cursor = conn.cursor()
-        order_date = datetime.now(pytz.timezone('Asia/Ho_Chi_Minh')).strftime('%Y-%m-%d %H:%M:%S')
-        default_store_id = 'ST1'
-        cursor.execute('SELECT store_id FROM stores WHERE store_id = ?', (default_store_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise ValueError(f"Cửa hàng mặc định {default_store_id} không tồn tại")
-        cursor.execute('''
-            INSERT INTO orders (order_id, customer_id, order_date, status, store_id) 
-            VALUES (NULL, ?, ?, ?, ?)
-        ''', (customer_id, order_date, 'Pending', default_store_id))
-        cursor.execute("SELECT order_id FROM orders WHERE rowid = last_insert_rowid()")
-        order_id = cursor.fetchone()['order_id']
-        total_amount = 0
-        for item in items:
-            order_detail_id = str(uuid.uuid4())
-            cart_id = item.get('cart_id')
-            quantity = item.get('quantity', 1)
-            price = item.get('price')
-            cursor.execute('''
-                SELECT product_id, size_id 
-                FROM cart 
-                WHERE cart_id = ? AND customer_id = ?
-            ''', (cart_id, customer_id))
-            cart_item = cursor.fetchone()
-            if not cart_item:
-                conn.rollback()
-                conn.close()
-                raise ValueError(f"Mục giỏ hàng không tồn tại: cart_id={cart_id}")
-            product_id, size_id = cart_item
-            cursor.execute('''
-                SELECT price, discount 
-                FROM products p 
-                JOIN product_size ps ON p.product_id = ps.product_id 
-                WHERE p.product_id = ? AND ps.size_id = ?
-            ''', (product_id, size_id))
-            product = cursor.fetchone()
-            if not product:
-                conn.rollback()
-                conn.close()
-                raise ValueError(f"Sản phẩm hoặc kích cỡ không tồn tại")
-            original_price = float(product['price'])
-            discount = float(product['discount'] or 0)
-            unit_price = price if price else original_price * (1 - discount / 100)
-            total_price = unit_price * quantity
-            total_amount += total_price
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            store_id = StoreRouter.choose_store(cursor, customer_id)
+            if not store_id:
+                raise ValueError("Không có cửa hàng nào nhận đơn hàng")
+            cursor.execute(f'''
+                SELECT c.cart_id, c.product_id, c.size_id, ps.price, p.discount, p.product_id IS NOT NULL AS has_product
+                FROM cart c
+                LEFT JOIN product_size ps ON ps.size_id = c.size_id AND ps.product_id = c.product_id
+                LEFT JOIN products p ON p.product_id = c.product_id
+                WHERE c.customer_id = ? AND c.cart_id IN ({placeholders})
+            ''', [customer_id] + cart_ids)
+            lines = {row['cart_id']: row for row in cursor.fetchall()}
+            details = []
+            total_amount = 0
+            for item, order_detail_id in zip(items, order_detail_ids):
+                cart_id = item.get('cart_id')
+                quantity = item.get('quantity', 1)
+                price = item.get('price')
+                line = lines.get(cart_id)
+                if not line:
+                    raise ValueError(f"Mục giỏ hàng không tồn tại: cart_id={cart_id}")
+                if line['price'] is None or not line['has_product']:
+                    raise ValueError(f"Sản phẩm hoặc kích cỡ không tồn tại")
+                original_price = float(line['price'])
+                discount = float(line['discount'] or 0)
+                unit_price = price if price else original_price * (1 - discount / 100)
+                total_price = unit_price * quantity
+                total_amount += total_price
+                details.append((order_detail_id, order_id, line['product_id'], line['size_id'],
+                                quantity, unit_price, total_price))
+            StockReservation.reserve(cursor, order_id, [(detail[2], detail[4]) for detail in details])
             cursor.execute('''
+                INSERT INTO orders (order_id, customer_id, order_date, status, store_id) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', (order_id, customer_id, order_date, 'Pending', store_id))
+            cursor.executemany('''
                 INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price) 
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price))
-        payment_id = str(uuid.uuid4())
-        payment_method = card_info.get('payment_method', 'cod')
-        cursor.execute('''
-            INSERT INTO payments (payment_id, payment_date, payment_method, order_id, amount) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (payment_id, order_date, payment_method, order_id, total_amount))
-        for item in items:
-            cursor.execute('DELETE FROM cart WHERE cart_id = ? AND customer_id = ?', (item['cart_id'], customer_id))
-        conn.commit()
-        cursor.execute('SELECT order_id FROM orders WHERE order_id = ?', (order_id,))
-        if not cursor.fetchone():
+            ''', details)
+            payment_method = card_info.get('payment_method', 'cod')
+            cursor.execute('''
+                INSERT INTO payments (payment_id, payment_date, payment_method, order_id, amount) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', (payment_id, order_date, payment_method, order_id, total_amount))
+            cursor.execute(f'DELETE FROM cart WHERE customer_id = ? AND cart_id IN ({placeholders})',
+                           [customer_id] + cart_ids)
+            conn.commit()
+        except Exception:
             conn.rollback()
+            raise
+        finally:
             conn.close()
-            raise ValueError(f"Order {order_id} not found after creation")
-        conn.close()
         return order_id, total_amount
     
     @staticmethod
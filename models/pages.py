@@ -1,14 +1,19 @@
 # models/pages.py
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 import os
 import uuid
 import random
 from werkzeug.utils import secure_filename
+from utils.ids import next_id
+from models.search import match_query
 
 logger = logging.getLogger(__name__)
 
+INVOICE_PAGE_SIZE = 50
+INVOICE_MAX_PAGE_SIZE = 500
+
 try:
     from utils.db import get_db_connection
     logger.info("Imported get_db_connection successfully")
@@ -36,91 +41,143 @@ class Pages:
             conn.close()
 
     @staticmethod
-    def get_invoice_data(filter_date=None, filter_customer=None):
-        logger.debug(f"Fetching invoice data with filter_date={filter_date}, filter_customer={filter_customer}")
+    def get_invoice_data(filter_date=None, filter_customer=None, date_from=None, date_to=None,
+                         cursor=None, limit=INVOICE_PAGE_SIZE):
+        logger.debug("Fetching invoice data with filter_date=%s, filter_customer=%s, date_from=%s, date_to=%s, cursor=%s, limit=%s",
+                     filter_date, filter_customer, date_from, date_to, cursor, limit)
+        # filter_date is a single day; date_from/date_to are inclusive days.
+        # Both become half-open order_date ranges so idx_orders_status_order_date applies.
+        start, end = None, None
+        if filter_date:
+            start = Pages._parse_day(filter_date)
+            end = start + timedelta(days=1) if start else None
+        else:
+            start = Pages._parse_day(date_from)
+            end = Pages._parse_day(date_to)
+            end = end + timedelta(days=1) if end else None
+
+        where = ["o.status = 'Delivered'"]
+        params = []
+        if start:
+            where.append("o.order_date >= ?")
+            params.append(start.strftime('%Y-%m-%d %H:%M:%S'))
+        if end:
+            where.append("o.order_date < ?")
+            params.append(end.strftime('%Y-%m-%d %H:%M:%S'))
+        if filter_customer:
+            # users_fts narrows to customers with every word of the name; the
+            # exact comparison then keeps the filter's meaning without a users scan
+            name_query = match_query(filter_customer, prefix=False)
+            if name_query:
+                where.append("u.rowid IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)")
+                params.append(f"{{first_name last_name}} : ({name_query})")
+            where.append("LOWER(u.first_name || ' ' || u.last_name) = LOWER(?)")
+            params.append(filter_customer)
+        filters = ' AND '.join(where)
+
+        page_where, page_params = filters, list(params)
+        if cursor:
+            # Keyset: continue strictly after the last (order_date, order_id) of the previous page
+            try:
+                cursor_date, cursor_code = cursor.split('|', 1)
+            except ValueError:
+                raise ValueError('Cursor không hợp lệ')
+            page_where += " AND (o.order_date, o.order_id) < (?, ?)"
+            page_params += [cursor_date, cursor_code]
+
         conn = get_db_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         try:
-            query = """
-                SELECT o.order_id AS code, u.first_name || ' ' || u.last_name AS customer_name, 
-                       o.order_date AS date, o.status
-                FROM orders o
-                JOIN users u ON o.customer_id = u.customer_id
-                WHERE o.status = 'Delivered'
-            """
-            params = []
-            if filter_date:
-                try:
-                    date_obj = datetime.strptime(filter_date, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%Y-%m-%d %H:%M:%S')
-                    query += " AND o.order_date LIKE ?"
-                    params.append(f"{formatted_date}%")
-                except ValueError:
-                    logger.warning(f"Invalid date format: {filter_date}")
-            if filter_customer:
-                query += " AND LOWER(u.first_name || ' ' || u.last_name) = LOWER(?)"
-                params.append(filter_customer)
-
-            cursor.execute(query, params)
-            invoices = cursor.fetchall()
+            # Headers and lines in one statement: the page of orders is picked
+            # first, then only its lines are joined in through idx_order_details_order_id
+            db_cursor.execute(f"""
+                WITH page AS (
+                    SELECT o.order_id AS code, u.first_name || ' ' || u.last_name AS customer_name, 
+                           o.order_date AS date, o.status
+                    FROM orders o
+                    JOIN users u ON o.customer_id = u.customer_id
+                    WHERE {page_where}
+                    ORDER BY o.order_date DESC, o.order_id DESC
+                    LIMIT ?
+                )
+                SELECT page.code, page.customer_name, page.date, page.status,
+                       p.product_name, od.quantity, ps.size, od.total_price
+                FROM page
+                LEFT JOIN order_details od ON od.order_id = page.code
+                LEFT JOIN products p ON od.product_id = p.product_id
+                LEFT JOIN product_size ps ON od.size_id = ps.size_id
+                ORDER BY page.date DESC, page.code DESC
+            """, page_params + [limit + 1])
 
             invoices_list = []
-            total_amount = 0
-            for row in invoices:
-                cursor.execute("""
-                    SELECT p.product_name, od.quantity, ps.size
-                    FROM order_details od
-                    JOIN products p ON od.product_id = p.product_id
-                    JOIN product_size ps ON od.size_id = ps.size_id
-                    WHERE od.order_id = ?
-                """, (row['code'],))
-                products = cursor.fetchall()
-
-                cursor.execute("""
-                    SELECT SUM(total_price) as order_total
-                    FROM order_details
-                    WHERE order_id = ?
-                """, (row['code'],))
-                order_total = cursor.fetchone()['order_total'] or 0
-
-                product_list = []
-                for product in products:
-                    product_list.append({
-                        'product_name': product['product_name'],
-                        'quantity': product['quantity'],
-                        'size': product['size']
+            by_code = {}
+            for row in db_cursor.fetchall():
+                invoice = by_code.get(row['code'])
+                if invoice is None:
+                    invoice = {
+                        'code': row['code'],
+                        'customer_name': row['customer_name'],
+                        'date': row['date'],
+                        'total_price': 0,
+                        'status': row['status'],
+                        'description': f"Payment for order {row['code']}",
+                        'products': []
+                    }
+                    invoices_list.append(invoice)
+                    by_code[row['code']] = invoice
+                if row['product_name'] is not None:
+                    invoice['products'].append({
+                        'product_name': row['product_name'],
+                        'quantity': row['quantity'],
+                        'size': row['size']
                     })
+                invoice['total_price'] += row['total_price'] or 0
+            has_more = len(invoices_list) > limit
+            invoices_list = invoices_list[:limit]
 
-                total_amount += order_total
-                invoices_list.append({
-                    'code': row['code'],
-                    'customer_name': row['customer_name'],
-                    'date': row['date'],
-                    'total_price': order_total,
-                    'status': row['status'],
-                    'description': f"Payment for order {row['code']}",
-                    'products': product_list
-                })
+            next_cursor = None
+            if has_more:
+                last = invoices_list[-1]
+                next_cursor = f"{last['date']}|{last['code']}"
 
-            cursor.execute("""
-                SELECT DISTINCT u.first_name || ' ' || u.last_name AS customer_name 
-                FROM orders o
-                JOIN users u ON o.customer_id = u.customer_id
-                WHERE o.status = 'Delivered'
-            """)
-            customers = [row['customer_name'] for row in cursor.fetchall()]
-
-            return {
+            result = {
                 'invoices': invoices_list,
-                'customers': customers,
-                'total_amount': total_amount
+                'next_cursor': next_cursor
             }
+            # Filter-wide totals only change with the filters, so only the first page computes them
+            if not cursor:
+                db_cursor.execute(f"""
+                    SELECT COALESCE(SUM(od.total_price), 0) AS total_amount
+                    FROM orders o
+                    JOIN users u ON o.customer_id = u.customer_id
+                    JOIN order_details od ON od.order_id = o.order_id
+                    WHERE {filters}
+                """, params)
+                result['total_amount'] = db_cursor.fetchone()['total_amount']
+                db_cursor.execute("""
+                    SELECT DISTINCT u.first_name || ' ' || u.last_name AS customer_name 
+                    FROM orders o
+                    JOIN users u ON o.customer_id = u.customer_id
+                    WHERE o.status = 'Delivered'
+                """)
+                result['customers'] = [row['customer_name'] for row in db_cursor.fetchall()]
+            return result
         except sqlite3.Error as e:
             logger.error(f"SQLite error in get_invoice_data: {str(e)}")
             raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
         finally:
             conn.close()
 
+    @staticmethod
+    def _parse_day(value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            logger.warning("Invalid date format: %s", value)
+            return None
+
     @staticmethod
     def get_admins_data():
         logger.debug("Fetching admins data")
@@ -231,27 +288,21 @@ class Pages:
             if not cursor.fetchone():
                 raise ValueError('ID admin không hợp lệ')
 
+            event_id = next_id('events')
             cursor.execute("""
-                INSERT INTO events (event_name, date, time, admin_id, adminname, color)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (event_name, date, time, admin_id, adminname, color))
-
-            cursor.execute("""
-                SELECT event_id, event_name, date, time, admin_id, adminname, color
-                FROM events
-                WHERE rowid = last_insert_rowid()
-            """)
-            event = cursor.fetchone()
+                INSERT INTO events (event_id, event_name, date, time, admin_id, adminname, color)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (event_id, event_name, date, time, admin_id, adminname, color))
 
             conn.commit()
             return {
-                'event_id': event['event_id'],
-                'event_name': event['event_name'],
-                'date': event['date'],
-                'time': event['time'],
-                'admin_id': event['admin_id'],
-                'adminname': event['adminname'],
-                'color': event['color']
+                'event_id': event_id,
+                'event_name': event_name,
+                'date': date,
+                'time': time,
+                'admin_id': admin_id,
+                'adminname': adminname,
+                'color': color
             }
         except sqlite3.Error as e:
             conn.rollback()
@@ -1,5 +1,9 @@
 import sqlite3
+from datetime import datetime, timedelta
 from utils.db import get_db_connection
+from utils.cache import catalog_cache
+from utils.http import json_body, content_etag
+from utils.images import attach_variants
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,23 +16,117 @@ class ProductModel:
             SELECT p.*, ps.size, ps.price, ps.size_id
             FROM products p
             LEFT JOIN product_size ps ON p.product_id = ps.product_id
+            ORDER BY p.rowid, CASE ps.size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
         ''').fetchall()
         conn.close()
         return products
 
+    @staticmethod
+    def get_catalog():
+        # Grouped product list plus its JSON and ETags, rebuilt only after a
+        # product admin write (catalog_cache.bump()) or when the TTL runs out.
+        # Stock is left out: every checkout and cancel moves it, so it is read
+        # per request through get_stock_levels() / get_stock() instead
+        return catalog_cache.get('catalog', ProductModel._build_catalog)
+
+    @staticmethod
+    def get_stock_levels():
+        conn = get_db_connection()
+        try:
+            return {row['product_id']: row['stock'] for row in conn.execute('SELECT product_id, stock FROM products ORDER BY rowid')}
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_stock(product_id):
+        conn = get_db_connection()
+        try:
+            row = conn.execute('SELECT stock FROM products WHERE product_id = ?', (product_id,)).fetchone()
+            return row['stock'] if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _build_catalog():
+        product_dict = {}
+        for row in ProductModel.get_all_products():
+            product_id = row['product_id']
+            if product_id not in product_dict:
+                product_dict[product_id] = {
+                    "product_id": row['product_id'],
+                    "product_name": row['product_name'],
+                    "category": row['category'],
+                    "description": row['description'],
+                    "image_url": row['image_url'],
+                    "image_url_2": row['image_url_2'],
+                    "discount": row['discount'] or 0,
+                    "sizes": []
+                }
+            if row['size']:
+                product_dict[product_id]['sizes'].append({
+                    "size": row['size'],
+                    "price": row['price'],
+                    "size_id": row['size_id']
+                })
+        products_list = list(product_dict.values())
+        attach_variants(products_list)
+        attach_variants(products_list, 'image_url_2', 'image_variants_2')
+        product_payloads = {}
+        for product in products_list:
+            # Serialized per request, once the current stock is filled in
+            product_payloads[product['product_id']] = {
+                'success': True,
+                'product': {
+                    'product_id': product['product_id'],
+                    'product_name': product['product_name'],
+                    'category': product['category'],
+                    'description': product['description'] or '',
+                    'image_url': product['image_url'] or '/static/Upload/default.jpg',
+                    'image_url_2': product['image_url_2'] or '/static/Upload/default.jpg',
+                    'discount': product['discount']
+                },
+                'sizes': product['sizes']
+            }
+        products_json = json_body(products_list)
+        return {
+            'products': products_list,
+            'products_json': products_json,
+            'products_etag': content_etag(products_json),
+            'product_payloads': product_payloads
+        }
+
     @staticmethod
     def get_product_by_id(product_id):
         conn = get_db_connection()
         product = conn.execute("SELECT * FROM products WHERE product_id = ?", (product_id,)).fetchone()
-        sizes = conn.execute("SELECT size, price, size_id FROM product_size WHERE product_id = ?", (product_id,)).fetchall()
+        sizes = conn.execute('''
+            SELECT size, price, size_id FROM product_size WHERE product_id = ?
+            ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
+        ''', (product_id,)).fetchall()
         conn.close()
         return product, sizes
 
     @staticmethod
-    def get_top10_products():
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+    def get_top10_products(days=None, category=None, limit=10):
+        # Reads the trigger-maintained sales tables (migration 003) instead of
+        # aggregating every delivered order; days=None ranks all-time sales.
+        # CROSS JOIN keeps the sales table outermost so the all-time ranking
+        # walks idx_product_sales_rollup_total and stops after `limit` rows.
+        params = []
+        if days:
+            since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            # Without the hint SQLite walks the whole (product_id, sale_date)
+            # key to skip the GROUP BY sort; the window only needs its own days
+            sales = '''
+                (SELECT product_id, SUM(quantity) AS total_sold
+                 FROM product_sales_daily INDEXED BY idx_product_sales_daily_date
+                 WHERE sale_date >= ?
+                 GROUP BY product_id)
+            '''
+            params.append(since)
+        else:
+            sales = 'product_sales_rollup'
+        query = f'''
             SELECT 
                 p.product_id, 
                 p.product_name, 
@@ -38,28 +136,39 @@ class ProductModel:
                 p.image_url_2, 
                 p.discount, 
                 p.category,
-                SUM(od.quantity) as total_sold
-            FROM products p
-            JOIN order_details od ON p.product_id = od.product_id
-            JOIN orders o ON od.order_id = o.order_id
-            WHERE o.status = 'Delivered'
-            GROUP BY p.product_id
-            ORDER BY total_sold DESC
-            LIMIT 10
-        ''')
-        top_products = [dict(row) for row in cursor.fetchall()]
-        products_list = []
-        for product in top_products:
-            cursor.execute('''
-                SELECT size_id, size, price
-                FROM product_size
-                WHERE product_id = ?
-            ''', (product['product_id'],))
-            sizes = [{'size_id': row['size_id'], 'size': row['size'], 'price': row['price']} for row in cursor.fetchall()]
-            product['sizes'] = sizes
-            products_list.append(product)
-        conn.close()
-        return products_list
+                s.total_sold
+            FROM {sales} s
+            CROSS JOIN products p ON p.product_id = s.product_id
+            WHERE s.total_sold > 0
+        '''
+        if category:
+            query += ' AND p.category = ?'
+            params.append(category)
+        query += ' ORDER BY s.total_sold DESC, s.product_id LIMIT ?'
+        params.append(limit)
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            products_list = [dict(row) for row in cursor.fetchall()]
+            if products_list:
+                by_id = {product['product_id']: product for product in products_list}
+                for product in products_list:
+                    product['sizes'] = []
+                placeholders = ', '.join('?' * len(by_id))
+                cursor.execute(f'''
+                    SELECT product_id, size_id, size, price
+                    FROM product_size
+                    WHERE product_id IN ({placeholders})
+                    ORDER BY product_id, CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
+                ''', list(by_id))
+                for row in cursor.fetchall():
+                    by_id[row['product_id']]['sizes'].append({'size_id': row['size_id'], 'size': row['size'], 'price': row['price']})
+                attach_variants(products_list)
+                attach_variants(products_list, 'image_url_2', 'image_variants_2')
+            return products_list
+        finally:
+            conn.close()
 
     @staticmethod
     def get_admin_products(admin_id):
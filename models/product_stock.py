@@ -1,8 +1,10 @@
 # models/product_stock.py
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
+from utils.cache import store_cache
 import logging
-from datetime import datetime
+from utils.timefmt import format_datetime, format_column
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +22,9 @@ class ProductStock:
                 ORDER BY si.last_updated DESC
             """)
             stock_items = []
-            for row in cursor:
-                last_updated = datetime.strptime(row['last_updated'], '%Y-%m-%d %H:%M:%S')
-                formatted_last_updated = last_updated.strftime('%b %d, %Y - %I:%M %p')
+            rows = cursor.fetchall()
+            formatted = format_column([row['last_updated'] for row in rows])
+            for row, formatted_last_updated in zip(rows, formatted):
                 stock_items.append({
                     'stock_item_id': row['stock_item_id'],
                     'item_name': row['item_name'],
@@ -61,20 +63,14 @@ class ProductStock:
             logger.debug(f"Found store: store_id={store_id}, store_name={store_name}")
 
         # Thêm stock item
+            stock_item_id = next_id('stock_items')
             cursor.execute("""
-                INSERT INTO stock_items (item_name, category, stock_quantity, store_id, last_updated)
-                VALUES (?, ?, ?, ?, datetime('now'))
-            """, (item_name, category, stock_quantity, store_id))
+                INSERT INTO stock_items (stock_item_id, item_name, category, stock_quantity, store_id, last_updated)
+                VALUES (?, ?, ?, ?, ?, datetime('now'))
+            """, (stock_item_id, item_name, category, stock_quantity, store_id))
             conn.commit()  # Commit ngay sau khi thêm
-            logger.debug("Stock item inserted and committed")
-
-        # Lấy stock_item_id vừa thêm
-            cursor.execute("SELECT MAX(stock_item_id) AS stock_item_id FROM stock_items WHERE item_name = ? AND store_id = ?", (item_name, store_id))
-            row_id = cursor.fetchone()
-            if not row_id:
-                logger.error("Failed to retrieve stock_item_id after insertion")
-                raise Exception("Không thể lấy stock_item_id vừa thêm")
-            stock_item_id = row_id['stock_item_id']
+            # Store routing reads supplies on hand
+            store_cache.bump()
             logger.debug(f"Inserted stock item with ID: {stock_item_id}")
 
         # Kiểm tra bản ghi vừa thêm
@@ -87,8 +83,7 @@ class ProductStock:
                 logger.debug(f"Debug: Found item with item_name={item_name}, store_id={store_id}: {debug_row}")
                 raise Exception("Không thể lấy thông tin sản phẩm vừa thêm từ bảng stock_items")
 
-            last_updated = datetime.strptime(row['last_updated'], '%Y-%m-%d %H:%M:%S')
-            formatted_last_updated = last_updated.strftime('%b %d, %Y - %I:%M %p')
+            formatted_last_updated = format_datetime(row['last_updated'])
             stock_item = {
                 'stock_item_id': row['stock_item_id'],
                 'item_name': row['item_name'],
@@ -128,6 +123,7 @@ class ProductStock:
                 return None
             
             conn.commit()
+            store_cache.bump()
             cursor.execute("""
                 SELECT si.stock_item_id, si.item_name, si.category, si.stock_quantity, si.store_id, si.last_updated, s.store_name
                 FROM stock_items si
@@ -138,8 +134,7 @@ class ProductStock:
             if not row:
                 raise Exception("Không thể lấy thông tin sản phẩm vừa sửa")
             
-            last_updated = datetime.strptime(row['last_updated'], '%Y-%m-%d %H:%M:%S')
-            formatted_last_updated = last_updated.strftime('%b %d, %Y - %I:%M %p')
+            formatted_last_updated = format_datetime(row['last_updated'])
             stock_item = {
                 'stock_item_id': row['stock_item_id'],
                 'item_name': row['item_name'],
@@ -172,6 +167,7 @@ class ProductStock:
             
             cursor.execute("DELETE FROM stock_items WHERE stock_item_id = ?", (stock_item_id,))
             conn.commit()
+            store_cache.bump()
             logger.info(f"Stock item {stock_item_id} deleted successfully")
             return True
         except sqlite3.Error as e:
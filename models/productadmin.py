@@ -1,5 +1,7 @@
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id, next_ids
+from utils.cache import catalog_cache
 
 class ProductAdmin:
     @staticmethod
@@ -36,6 +38,7 @@ class ProductAdmin:
             SELECT size_id, size, price
             FROM product_size
             WHERE product_id = ?
+            ORDER BY CASE size WHEN 'S' THEN 0 WHEN 'M' THEN 1 ELSE 2 END
         """, (product_id,))
         sizes = [dict(row) for row in cursor.fetchall()]
         conn.close()
@@ -55,21 +58,22 @@ class ProductAdmin:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
+            product_id = next_id('products')
+            size_ids = next_ids('product_size', len(sizes))
             cursor.execute("""
                 INSERT INTO products (product_id, product_name, stock, description, image_url, image_url_2, discount, category)
-                VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)
-            """, (product_name, stock, description, image_url, image_url_2, discount, category))
-            cursor.execute("SELECT product_id FROM products WHERE rowid = last_insert_rowid()")
-            product_id = cursor.fetchone()['product_id']
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (product_id, product_name, stock, description, image_url, image_url_2, discount, category))
             price_m_value = None
-            for size, price in sizes:
+            for (size, price), size_id in zip(sizes, size_ids):
                 cursor.execute("""
                     INSERT INTO product_size (size_id, product_id, size, price)
-                    VALUES (NULL, ?, ?, ?)
-                """, (product_id, size, price))
+                    VALUES (?, ?, ?, ?)
+                """, (size_id, product_id, size, price))
                 if size == 'M':
                     price_m_value = price
             conn.commit()
+            catalog_cache.bump()
             return product_id, price_m_value
         except sqlite3.Error as e:
             conn.rollback()
@@ -114,8 +118,8 @@ class ProductAdmin:
                 else:
                     cursor.execute("""
                         INSERT INTO product_size (size_id, product_id, size, price)
-                        VALUES (NULL, ?, ?, ?)
-                    """, (product_id, size, price))
+                        VALUES (?, ?, ?, ?)
+                    """, (next_id('product_size', conn), product_id, size, price))
                 if size == 'M':
                     price_m_value = price
             cursor.execute("""
@@ -132,6 +136,7 @@ class ProductAdmin:
             """, (product_id,))
             product = cursor.fetchone()
             conn.commit()
+            catalog_cache.bump()
             product_dict = dict(product)
             product_dict['avg_rating'] = avg_rating
             return product_dict, price_m_value
@@ -155,6 +160,7 @@ class ProductAdmin:
             cursor.execute('DELETE FROM product_size WHERE product_id = ?', (product_id,))
             cursor.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
             conn.commit()
+            catalog_cache.bump()
             return True
         except sqlite3.Error as e:
             conn.rollback()
@@ -174,9 +180,9 @@ class ProductAdmin:
             if cursor.fetchone():
                 return False
             cursor.execute("""
-                INSERT INTO favorites (admin_id, product_id)
-                VALUES (?, ?)
-            """, (admin_id, product_id))
+                INSERT INTO favorites (favorite_id, admin_id, product_id)
+                VALUES (?, ?, ?)
+            """, (next_id('favorites', conn), admin_id, product_id))
             conn.commit()
             return True
         except sqlite3.Error as e:
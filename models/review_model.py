@@ -1,5 +1,6 @@
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,13 +46,12 @@ class ReviewModel:
             order_status = cursor.fetchone()
             if order_status['status'].lower() != 'delivered':
                 return None, "Chỉ có thể đánh giá đơn hàng đã được giao"
+            review_id = next_id('reviews')
             cursor.execute('''
-                INSERT INTO reviews (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img))
+                INSERT INTO reviews (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (review_id, customer_id, product_id, size_id, order_id, rating, comment, review_date, review_img))
             conn.commit()
-            cursor.execute("SELECT review_id FROM reviews WHERE rowid = last_insert_rowid()")
-            review_id = cursor.fetchone()['review_id']
             return review_id, None
         except sqlite3.Error as e:
             conn.rollback()
@@ -0,0 +1,113 @@
+# models/search.py
+import re
+import sqlite3
+from utils.db import get_db_connection
+from utils.timefmt import format_clock, format_column
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_TERMS = 8
+
+# Words only: FTS5 operators and quotes in user input never reach MATCH
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(text):
+    # The tokenizer strips diacritics itself; 'đ' is a separate letter, so it is
+    # folded the same way here and in the migration 006 triggers
+    return text.replace('đ', 'd').replace('Đ', 'D')
+
+
+def match_query(text, prefix=True):
+    # 'cà phê đá' -> '"ca"* "phe"* "da"*': every term must match, as a prefix
+    # so results follow the typing; prefix=False for whole-word matches
+    terms = WORD.findall(fold(text or ''))[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    suffix = '*' if prefix else ''
+    return ' '.join(f'"{term}"{suffix}' for term in terms)
+
+
+class Search:
+    @staticmethod
+    def search_products(text, limit=SEARCH_PAGE_SIZE, offset=0):
+        query = match_query(text)
+        if not query:
+            return {'results': [], 'next_offset': None}
+        # bm25 column weights: name, description, category
+        rows = Search._run("""
+            SELECT p.product_id, p.product_name, p.category, p.description, p.image_url, p.discount
+            FROM products_fts
+            JOIN products p ON p.rowid = products_fts.rowid
+            WHERE products_fts MATCH ?
+            ORDER BY bm25(products_fts, 10.0, 1.0, 4.0)
+            LIMIT ? OFFSET ?
+        """, (query, limit + 1, offset))
+        return Search._page([dict(row) for row in rows], limit, offset)
+
+    @staticmethod
+    def search_users(text, limit=SEARCH_PAGE_SIZE, offset=0):
+        query = match_query(text)
+        if not query:
+            return {'results': [], 'next_offset': None}
+        rows = Search._run("""
+            SELECT u.customer_id, u.first_name, u.last_name, u.email, u.phone
+            FROM users_fts
+            JOIN users u ON u.rowid = users_fts.rowid
+            WHERE users_fts MATCH ?
+            ORDER BY bm25(users_fts, 5.0, 5.0, 2.0, 1.0)
+            LIMIT ? OFFSET ?
+        """, (query, limit + 1, offset))
+        return Search._page([dict(row) for row in rows], limit, offset)
+
+    @staticmethod
+    def search_messages(text, admin_id, limit=SEARCH_PAGE_SIZE, offset=0):
+        query = match_query(text)
+        if not query:
+            return {'results': [], 'next_offset': None}
+        # Only conversations this admin may open: assigned to them or still unassigned
+        rows = Search._run("""
+            SELECT m.message_id, m.user_id, m.direction, m.content, m.timestamp,
+                   u.first_name || ' ' || u.last_name AS customer_name
+            FROM messages_fts
+            JOIN messages m ON m.rowid = messages_fts.rowid
+            JOIN users u ON u.customer_id = m.user_id
+            LEFT JOIN conversations c ON c.user_id = m.user_id
+            WHERE messages_fts MATCH ?
+            AND (c.assigned_admin_id = ? OR c.assigned_admin_id IS NULL)
+            ORDER BY bm25(messages_fts)
+            LIMIT ? OFFSET ?
+        """, (query, admin_id, limit + 1, offset))
+        times = format_column([row['timestamp'] for row in rows], format_clock)
+        results = [{
+            'message_id': row['message_id'],
+            'user_id': row['user_id'],
+            'customer_name': row['customer_name'],
+            'direction': row['direction'],
+            'content': row['content'],
+            'time': time_str
+        } for row, time_str in zip(rows, times)]
+        return Search._page(results, limit, offset)
+
+    @staticmethod
+    def _run(sql, params):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error("Database error in search: %s", e)
+            raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _page(results, limit, offset):
+        # limit + 1 rows were read: the extra one only says another page exists
+        next_offset = offset + limit if len(results) > limit else None
+        logger.debug("Search returned %s results, next_offset=%s", min(len(results), limit), next_offset)
+        return {'results': results[:limit], 'next_offset': next_offset}
@@ -1,5 +1,6 @@
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
 
 class SignupModel:
     @staticmethod
@@ -16,8 +17,8 @@ class SignupModel:
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO users (first_name, last_name, email, password, phone, birthdate) VALUES (?, ?, ?, ?, ?, ?)",
-            (first_name, last_name, email, password, None, None)
+            "INSERT INTO users (customer_id, first_name, last_name, email, password, phone, birthdate) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (next_id('users'), first_name, last_name, email, password, None, None)
         )
         conn.commit()
         conn.close()
\ No newline at end of file
@@ -0,0 +1,88 @@
+# models/stock_reservation.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStockError(ValueError):
+    def __init__(self, product_id, requested, available, product_name=None):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        if available is None:
+            super().__init__(f"Sản phẩm không tồn tại: product_id={product_id}")
+        else:
+            super().__init__(f"Sản phẩm {product_name or product_id} chỉ còn {available}, không đủ số lượng {requested}")
+
+
+class StockReservation:
+    # Every method runs on the caller's cursor, inside the transaction that
+    # writes the order, and the caller rolls back on any exception. Cancel and
+    # delete give back what is held, and delivery marks it sold, through the
+    # triggers of migration 010.
+    @staticmethod
+    def reserve(cursor, order_id, lines, hold=True):
+        # lines: (product_id, quantity) pairs, several lines of a product are
+        # summed. Each product is decremented only if it still has enough, so
+        # two checkouts can never both take the last units. hold=False sells the
+        # stock outright (an order created as delivered): recorded as sold, so
+        # cancel and delete never give it back.
+        quantities = {}
+        for product_id, quantity in lines:
+            quantity = int(quantity)
+            if quantity <= 0:
+                raise ValueError(f"Số lượng không hợp lệ: {quantity}")
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        rows = sorted(quantities.items())
+        cursor.executemany('UPDATE products SET stock = stock - ? WHERE product_id = ? AND stock >= ?',
+                           [(quantity, product_id, quantity) for product_id, quantity in rows])
+        if cursor.rowcount != len(rows):
+            StockReservation._raise_shortage(cursor, rows)
+        cursor.executemany('INSERT INTO stock_reservations (order_id, product_id, quantity, sold) VALUES (?, ?, ?, ?)',
+                           [(order_id, product_id, quantity, 0 if hold else 1) for product_id, quantity in rows])
+
+    @staticmethod
+    def release(cursor, order_id):
+        # Gives back all order_id took, held or sold; True if it took anything
+        cursor.execute('''
+            UPDATE products
+            SET stock = stock + (SELECT r.quantity FROM stock_reservations r
+                                 WHERE r.order_id = ? AND r.product_id = products.product_id)
+            WHERE product_id IN (SELECT product_id FROM stock_reservations WHERE order_id = ?)
+        ''', (order_id, order_id))
+        cursor.execute('DELETE FROM stock_reservations WHERE order_id = ?', (order_id,))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def rebook(cursor, order_id, lines, status):
+        # An admin edit replaces the order's lines; call it before the orders
+        # row gets the new status. A cancel is left to the trigger, which gives
+        # back only what is held, as mark_cancelled does. Otherwise all the
+        # order took goes back, sold included, and the new lines are taken
+        # again: held, or sold if the order is delivered. A delivered order that
+        # took nothing (placed before reservations existed) stays that way,
+        # but a cancelled order gave its stock back and takes it again.
+        if status == 'Cancelled':
+            return
+        cursor.execute('SELECT status FROM orders WHERE order_id = ?', (order_id,))
+        order = cursor.fetchone()
+        reopened = order is not None and order['status'] == 'Cancelled'
+        taken = StockReservation.release(cursor, order_id)
+        if taken or reopened or status != 'Delivered':
+            StockReservation.reserve(cursor, order_id, lines, hold=status != 'Delivered')
+
+    @staticmethod
+    def _raise_shortage(cursor, rows):
+        placeholders = ', '.join('?' * len(rows))
+        cursor.execute(f'SELECT product_id, product_name, stock FROM products WHERE product_id IN ({placeholders})',
+                       [product_id for product_id, _ in rows])
+        products = {row['product_id']: row for row in cursor.fetchall()}
+        # Earlier products of this order are already decremented, but a short
+        # product's own UPDATE matched nothing, so its stock is still current
+        product_id, quantity = next(((product_id, quantity) for product_id, quantity in rows
+                                     if product_id not in products or products[product_id]['stock'] < quantity),
+                                    rows[0])
+        product = products.get(product_id)
+        available = product['stock'] if product else None
+        logger.info("Out of stock: product_id=%s, requested=%s, available=%s", product_id, quantity, available)
+        raise OutOfStockError(product_id, quantity, available, product['product_name'] if product else None)
@@ -0,0 +1,95 @@
+# models/store_router.py
+import re
+import unicodedata
+from utils.cache import store_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A store whose address matches the customer's exactly is preferred until it
+# has this many more pending orders than the alternatives
+LOCALITY_WEIGHT = 10
+# A store with supplies below LOW_STOCK_THRESHOLD (or none recorded) is
+# treated as having LOW_STOCK_PENALTY more pending orders
+LOW_STOCK_THRESHOLD = 50
+LOW_STOCK_PENALTY = 5
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def address_tokens(address):
+    # '12 Đường Láng, Hà Nội' -> {'12', 'duong', 'lang', 'ha', 'noi'}
+    text = unicodedata.normalize('NFKD', (address or '').replace('đ', 'd').replace('Đ', 'D').lower())
+    return frozenset(WORD.findall(''.join(ch for ch in text if not unicodedata.combining(ch))))
+
+
+def similarity(a, b):
+    # Share of address words in common, 0..1
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class StoreRouter:
+    @staticmethod
+    def stores(cursor):
+        # Store metadata and supplies on hand; rebuilt after store_cache.bump()
+        # (stock edits) or when the TTL runs out. A miss is loaded on the
+        # caller's cursor: checkout holds its pooled connection in BEGIN
+        # IMMEDIATE, and waiting for a second one could exhaust the pool.
+        return store_cache.get('stores', lambda: StoreRouter._load_stores(cursor))
+
+    @staticmethod
+    def _load_stores(cursor):
+        cursor.execute("""
+            SELECT s.store_id, s.store_name, s.address,
+                   COUNT(si.stock_item_id) AS items,
+                   COALESCE(SUM(si.stock_quantity > 0), 0) AS items_in_stock,
+                   MIN(si.stock_quantity) AS lowest_stock
+            FROM stores s
+            LEFT JOIN stock_items si ON si.store_id = s.store_id
+            GROUP BY s.store_id
+            ORDER BY s.store_id
+        """)
+        stores = [{
+            'store_id': row['store_id'],
+            'store_name': row['store_name'],
+            'tokens': address_tokens(row['address']),
+            # Every tracked supply at zero: the store cannot make anything
+            'out_of_stock': row['items'] > 0 and row['items_in_stock'] == 0,
+            'low_stock': row['items'] == 0 or row['lowest_stock'] < LOW_STOCK_THRESHOLD
+        } for row in cursor.fetchall()]
+        logger.debug("Loaded %s stores for routing", len(stores))
+        return stores
+
+    @staticmethod
+    def choose_store(cursor, customer_id):
+        # Runs on the checkout's cursor, inside its write transaction, so the
+        # pending counts include every order committed before this one. Lowest
+        # cost wins: pending orders + low-stock penalty - address match bonus.
+        stores = StoreRouter.stores(cursor)
+        if not stores:
+            return None
+        cursor.execute("""
+            SELECT COALESCE(
+                (SELECT address FROM addresses WHERE customer_id = ? ORDER BY is_default DESC LIMIT 1),
+                (SELECT user_add FROM users WHERE customer_id = ?)
+            ) AS address
+        """, (customer_id, customer_id))
+        row = cursor.fetchone()
+        tokens = address_tokens(row['address'] if row else None)
+        cursor.execute("""
+            SELECT store_id, COUNT(*) AS pending
+            FROM orders
+            WHERE status = 'Pending'
+            GROUP BY store_id
+        """)
+        pending = {row['store_id']: row['pending'] for row in cursor.fetchall()}
+
+        def cost(store):
+            penalty = LOW_STOCK_PENALTY if store['low_stock'] else 0
+            return pending.get(store['store_id'], 0) + penalty - LOCALITY_WEIGHT * similarity(tokens, store['tokens'])
+
+        candidates = [store for store in stores if not store['out_of_stock']] or stores
+        best = min(candidates, key=lambda store: (cost(store), store['store_id']))
+        logger.debug("Routed order for customer_id=%s to %s (pending=%s)",
+                     customer_id, best['store_id'], pending.get(best['store_id'], 0))
+        return best['store_id']
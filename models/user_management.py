@@ -1,6 +1,7 @@
 # models/user_management.py
 import sqlite3
 from utils.db import get_db_connection
+from utils.ids import next_id
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,21 +47,15 @@ class UserManagement:
                 logger.warning(f"Email already exists in admins: {email}")
                 return None
 
-            # Tạo user_id theo định dạng KHxx hoặc ADxx
+            # Tạo user_id theo định dạng KHxx hoặc ADxx (cấp từ id_sequences)
             if role == 'User':
-                cursor.execute("SELECT MAX(CAST(SUBSTR(customer_id, 3) AS INTEGER)) FROM users WHERE customer_id LIKE 'KH%'")
-                max_id = cursor.fetchone()[0]
-                next_id = (max_id or 10) + 1  # Bắt đầu từ KH11 nếu không có
-                user_id = f"KH{next_id:02d}"
+                user_id = next_id('users')
                 cursor.execute("""
                     INSERT INTO users (customer_id, first_name, last_name, email, password)
                     VALUES (?, ?, ?, ?, ?)
                 """, (user_id, first_name, last_name, email, password))
             else:  # role == 'Admin'
-                cursor.execute("SELECT MAX(CAST(SUBSTR(admin_id, 3) AS INTEGER)) FROM admins WHERE admin_id LIKE 'AD%'")
-                max_id = cursor.fetchone()[0]
-                next_id = (max_id or 10) + 1  # Bắt đầu từ AD11 nếu không có
-                user_id = f"AD{next_id:02d}"
+                user_id = next_id('admins')
                 cursor.execute("""
                     INSERT INTO admins (admin_id, first_name, last_name, email, password)
                     VALUES (?, ?, ?, ?, ?)
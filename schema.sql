@@ -34,6 +34,19 @@ DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS review_sequence;
 DROP TABLE IF EXISTS addresses;
 DROP TABLE IF EXISTS address_sequence;
+DROP TABLE IF EXISTS id_sequences;
+DROP TABLE IF EXISTS product_sales_daily;
+DROP TABLE IF EXISTS product_sales_rollup;
+DROP TABLE IF EXISTS order_stats_daily;
+DROP TABLE IF EXISTS order_stats_monthly;
+DROP TABLE IF EXISTS conversations;
+DROP TABLE IF EXISTS products_fts;
+DROP TABLE IF EXISTS messages_fts;
+DROP TABLE IF EXISTS users_fts;
+DROP TABLE IF EXISTS image_variants;
+DROP TABLE IF EXISTS idempotency_keys;
+DROP TABLE IF EXISTS stock_reservations;
+DROP TABLE IF EXISTS schema_version;
 
 -- Bảng khách hàng (users)
 CREATE TABLE users (
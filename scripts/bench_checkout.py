@@ -0,0 +1,87 @@
+"""Checkout latency for carts of 1, 10 and 50 lines.
+
+Times OrderModel.create_order on a migrated copy of the database, so the
+rollup and stock triggers fire as they do in production. The cart is filled
+outside the timed part; each row is the median and p95 of --runs checkouts
+and the number of statements one checkout runs (each executemany row counts,
+trigger bodies do not).
+
+    python scripts/bench_checkout.py [--database database.db] [--runs 200]
+"""
+import argparse
+import time
+import uuid
+
+from benchdb import migrated_copy, remove_copy, median_and_p95
+from utils.db import get_db_connection
+from models.order_model import OrderModel
+
+LINES = (1, 10, 50)
+
+
+def add_bench_products(count):
+    # One size per product, so a cart of N lines has N distinct sizes; the
+    # stock is large enough that no run is refused
+    conn = get_db_connection()
+    conn.executemany("""
+        INSERT INTO products (product_id, product_name, stock, description, discount, category)
+        VALUES (?, ?, 1000000000, 'Benchmark', 10, 'Bench')
+    """, [(f'BENCH{n}', f'Bench {n}') for n in range(count)])
+    conn.executemany("INSERT INTO product_size (size_id, product_id, size, price) VALUES (?, ?, 'M', 50000)",
+                     [(f'BENCHSZ{n}', f'BENCH{n}') for n in range(count)])
+    customer_id = conn.execute('SELECT customer_id FROM users ORDER BY customer_id LIMIT 1').fetchone()['customer_id']
+    conn.commit()
+    conn.close()
+    return customer_id
+
+
+def fill_cart(customer_id, lines):
+    items = [{'cart_id': str(uuid.uuid4()), 'quantity': 1} for _ in range(lines)]
+    conn = get_db_connection()
+    conn.executemany("INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity) VALUES (?, ?, ?, ?, 1)",
+                     [(item['cart_id'], customer_id, f'BENCH{n}', f'BENCHSZ{n}') for n, item in enumerate(items)])
+    conn.commit()
+    conn.close()
+    return items
+
+
+def trace_statements(statements):
+    # The benchmark is single-threaded, so every checkout gets the pool's
+    # most recently released connection back: trace that one
+    conn = get_db_connection()
+    conn.set_trace_callback(statements.append)
+    conn.close()
+
+
+def count_statements(statements):
+    # The trace repeats a statement once for each statement of a trigger it fires
+    return sum(1 for n, sql in enumerate(statements) if n == 0 or sql != statements[n - 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='database.db')
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    path = migrated_copy(args.database)
+    try:
+        customer_id = add_bench_products(max(LINES))
+        statements = []
+        trace_statements(statements)
+        print(f"{'lines':>5} {'median':>10} {'p95':>10} {'statements':>11}")
+        for lines in LINES:
+            timings = []
+            for _ in range(args.runs):
+                items = fill_cart(customer_id, lines)
+                del statements[:]
+                started = time.perf_counter()
+                OrderModel.create_order(customer_id, items, '', {'payment_method': 'cod'}, {})
+                timings.append(time.perf_counter() - started)
+            median, p95 = median_and_p95(timings)
+            print(f'{lines:>5} {median * 1000:>7.2f} ms {p95 * 1000:>7.2f} ms {count_statements(statements):>11}')
+    finally:
+        remove_copy(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Message insert throughput: trigger-assigned IDs against utils.ids.
+
+Each insert is its own transaction, as in Inbox.send_message, on a migrated
+copy of the database. The trigger row puts back the schema.sql trigger that
+migration 002 removed: the insert passes a NULL message_id, the trigger bumps
+message_sequence and updates the row, and the caller reads the ID back
+through last_insert_rowid(). The other rows take the ID from the allocator
+first, one at a time and in blocks of 32. --threads writers share the total.
+
+    python scripts/bench_ids.py [--database database.db] [--inserts 2000] [--threads 4]
+"""
+import argparse
+import threading
+import time
+
+from benchdb import migrated_copy, remove_copy
+from utils.db import get_db_connection
+from utils.ids import configure_id_allocator, next_id
+
+INSERT_MESSAGE = """
+    INSERT INTO messages (message_id, user_id, admin_id, direction, content, is_read)
+    VALUES (?, ?, ?, 'user_to_admin', 'Benchmark', 0)
+"""
+
+# As in schema.sql, continuing from the allocator's counter (so after the allocator runs)
+SEQUENCE_TRIGGER = """
+    CREATE TABLE message_sequence (seq INTEGER);
+    INSERT INTO message_sequence (seq) SELECT value FROM id_sequences WHERE name = 'messages';
+    CREATE TRIGGER message_id_trigger
+    AFTER INSERT ON messages
+    FOR EACH ROW
+    WHEN NEW.message_id IS NULL
+    BEGIN
+        UPDATE message_sequence SET seq = seq + 1;
+        UPDATE messages SET message_id = 'MS' || (SELECT seq FROM message_sequence LIMIT 1) WHERE rowid = NEW.rowid;
+    END;
+"""
+
+
+def insert_with_trigger(user_id, admin_id):
+    conn = get_db_connection()
+    try:
+        conn.execute(INSERT_MESSAGE, (None, user_id, admin_id))
+        message_id = conn.execute('SELECT message_id FROM messages WHERE rowid = last_insert_rowid()').fetchone()[0]
+        conn.commit()
+        return message_id
+    finally:
+        conn.close()
+
+
+def insert_with_allocator(user_id, admin_id):
+    message_id = next_id('messages')
+    conn = get_db_connection()
+    try:
+        conn.execute(INSERT_MESSAGE, (message_id, user_id, admin_id))
+        conn.commit()
+        return message_id
+    finally:
+        conn.close()
+
+
+def run(insert, inserts, threads, user_id, admin_id):
+    start = threading.Barrier(threads + 1)
+    ids = []
+
+    def work(count):
+        start.wait()
+        ids.extend(insert(user_id, admin_id) for _ in range(count))
+
+    workers = [threading.Thread(target=work, args=(inserts // threads + (n < inserts % threads),))
+               for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if len(set(ids)) != inserts:
+        raise RuntimeError('duplicate message IDs')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='database.db')
+    parser.add_argument('--inserts', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    path = migrated_copy(args.database)
+    try:
+        conn = get_db_connection()
+        user_id, admin_id = conn.execute('SELECT user_id, admin_id FROM user_admin_assignments LIMIT 1').fetchone()
+        conn.close()
+        # The trigger runs last: its sequence starts where the allocator stopped
+        cases = (
+            ('next_id, block 1', insert_with_allocator, {'messages': 1}),
+            ('next_id, block 32', insert_with_allocator, {'messages': 32}),
+            ('trigger + re-read', insert_with_trigger, None),
+        )
+        print(f"{'ids':<18} {'inserts/s':>10} {'per insert':>12}")
+        for name, insert, block_sizes in cases:
+            if block_sizes is None:
+                configure_id_allocator(path)
+                conn = get_db_connection()
+                conn.executescript(SEQUENCE_TRIGGER)
+                conn.close()
+            else:
+                configure_id_allocator(path, block_sizes)
+            elapsed = run(insert, args.inserts, args.threads, user_id, admin_id)
+            print(f'{name:<18} {args.inserts / elapsed:>10.0f} {elapsed / args.inserts * 1e6:>9.0f} us')
+    finally:
+        remove_copy(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Shared setup for the benchmark scripts in this directory
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.db import configure_pool
+from utils.ids import configure_id_allocator
+from utils.migrations import apply_migrations
+
+
+def migrated_copy(database):
+    # Benchmarks write, so they run on a migrated copy in a temp directory;
+    # the pool and the ID allocator are pointed at it
+    directory = tempfile.mkdtemp(prefix='bench-')
+    path = os.path.join(directory, 'bench.db')
+    shutil.copyfile(database, path)
+    apply_migrations(path)
+    configure_pool(path)
+    configure_id_allocator(path)
+    return path
+
+
+def remove_copy(path):
+    configure_pool()
+    configure_id_allocator()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def median_and_p95(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.95))]
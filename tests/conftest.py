@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.cache import catalog_cache, store_cache
+from utils.db import configure_pool
+from utils.ids import configure_id_allocator
+from utils.migrations import apply_migrations
+
+# schema.sql brings its sample data (KH1.., AD1.., ST1.., PR1..PR14 with sizes
+# inserted S, M, L). PR15 gets its sizes as M, L, S: listings must order by
+# size, not by insertion. Loaded before the migrations, so the ID sequences of
+# migration 002 start after it.
+SEED = """
+INSERT INTO products (product_id, product_name, stock, description, discount, category) VALUES
+    ('PR15', 'PeachTea', 5, 'Peach tea', NULL, 'Drinks');
+INSERT INTO product_size (size_id, product_id, size, price) VALUES
+    ('SZ43', 'PR15', 'M', 40000), ('SZ44', 'PR15', 'L', 45000), ('SZ45', 'PR15', 'S', 35000);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    # A fresh database built from schema.sql and every migration; the pool,
+    # the ID allocator and the caches point at it for the test's duration
+    path = str(tmp_path / 'test.db')
+    with open(os.path.join(ROOT, 'schema.sql'), encoding='utf-8') as f:
+        schema = f.read()
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    conn.executescript(SEED)
+    conn.close()
+    apply_migrations(path)
+    configure_pool(path)
+    configure_id_allocator(path)
+    catalog_cache.bump()
+    store_cache.bump()
+    yield path
+    configure_pool()
+    configure_id_allocator()
+    catalog_cache.bump()
+    store_cache.bump()
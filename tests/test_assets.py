@@ -0,0 +1,96 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, url_for
+
+from utils.assets import ASSET_MAX_AGE, AssetManifest, asset_response, file_hash, init_assets
+from utils.http import send_media
+
+SCRIPT = b'function hello() { return "xin chao"; }\n' * 50
+
+
+@pytest.fixture
+def assets(tmp_path):
+    root = tmp_path / 'templates'
+    (root / 'js').mkdir(parents=True)
+    (root / 'js' / 'app.js').write_bytes(SCRIPT)
+    (root / 'logo.png').write_bytes(b'\x89PNG' + bytes(200))
+    (root / 'page.html').write_text('<html></html>')
+    return root
+
+
+def make_app(root, manifest=None):
+    app = Flask(__name__)
+    init_assets(app, root=str(root))
+    if manifest is not None:
+        app.extensions['assets'] = manifest
+
+    @app.route('/assets/<path:filename>')
+    def serve_assets(filename):
+        return asset_response(filename) or send_media(str(root), filename)
+
+    return app
+
+
+def asset_url(app, filename):
+    with app.test_request_context():
+        return url_for('serve_assets', filename=filename)
+
+
+def test_hashed_urls_are_immutable(assets):
+    app = make_app(assets)
+    url = asset_url(app, 'js/app.js')
+    assert url == f"/assets/js/app.{file_hash(assets / 'js' / 'app.js')}.js"
+    # Pages and unknown files keep their names
+    assert asset_url(app, 'page.html') == '/assets/page.html'
+    client = app.test_client()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == SCRIPT
+    assert response.cache_control.max_age == ASSET_MAX_AGE
+    assert response.cache_control.immutable
+    # The plain name still works, but has to be revalidated
+    plain = client.get('/assets/js/app.js')
+    assert plain.data == SCRIPT
+    assert plain.cache_control.no_cache and not plain.cache_control.immutable
+
+
+def test_changed_content_gets_a_new_url(assets):
+    old = asset_url(make_app(assets), 'js/app.js')
+    (assets / 'js' / 'app.js').write_bytes(SCRIPT + b'hello();\n')
+    app = make_app(assets)
+    assert asset_url(app, 'js/app.js') != old
+    assert app.test_client().get(old).status_code == 404
+
+
+def test_built_variants_follow_accept_encoding(assets, tmp_path):
+    manifest = AssetManifest(str(assets), build_dir=str(tmp_path / 'build'))
+    entries = manifest.build()
+    assert 'gzip' in entries['js/app.js']['encodings']
+    assert entries['logo.png']['encodings'] == []
+    app = make_app(assets, manifest)
+    client = app.test_client()
+    url = asset_url(app, 'js/app.js')
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.data) == SCRIPT
+    identity = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in identity.headers
+    assert identity.data == SCRIPT
+
+
+def test_stale_manifest_entries_are_rehashed(assets, tmp_path):
+    build_dir = str(tmp_path / 'build')
+    AssetManifest(str(assets), build_dir=build_dir).build()
+    # A copy with new mtimes but the same bytes keeps its precompressed variants
+    script = assets / 'js' / 'app.js'
+    os.utime(script, ns=(0, 10 ** 9))
+    manifest = AssetManifest(str(assets), build_dir=build_dir).load()
+    assert 'gzip' in manifest.entries['js/app.js']['encodings']
+    # Edited content gets a new hash and no variants until the next build
+    script.write_bytes(SCRIPT + b'hello();\n')
+    manifest = AssetManifest(str(assets), build_dir=build_dir).load()
+    assert manifest.entries['js/app.js']['hash'] == file_hash(script)
+    assert manifest.entries['js/app.js']['encodings'] == []
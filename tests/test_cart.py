@@ -0,0 +1,134 @@
+import os
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from conftest import ROOT, SEED, connect
+from controllers.cart_controller import CartController
+from models.cart_model import MAX_BATCH_OPERATIONS, CartModel
+from utils.migrations import apply_migrations
+
+# PR15 sizes: SZ43 M, SZ44 L, SZ45 S; PR1 sizes: SZ1 S, SZ2 M, SZ3 L
+
+
+@pytest.fixture
+def client(db_path):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    controller = CartController()
+    app.add_url_rule('/api/cart', view_func=controller.get_cart)
+    app.add_url_rule('/api/cart/batch', view_func=controller.batch_update_cart, methods=['POST'])
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['customer_id'] = 'KH1'
+    return client
+
+
+def lines(customer_id='KH1'):
+    return sorted((item['size_id'], item['quantity']) for item in CartModel.get_cart(customer_id))
+
+
+def add(product_id, size_id, quantity=1):
+    return {'op': 'add', 'product_id': product_id, 'size_id': size_id, 'quantity': quantity}
+
+
+def batch(client, *operations):
+    return client.post('/api/cart/batch', json={'operations': list(operations)})
+
+
+def test_adding_same_size_raises_quantity(db_path):
+    cart_id, price, discount = CartModel.add_to_cart('KH1', 'PR15', 1, 'SZ43')
+    assert (price, discount) == (40000, 0)
+    assert CartModel.add_to_cart('KH1', 'PR15', 2, 'SZ43')[0] == cart_id
+    CartModel.add_to_cart('KH1', 'PR15', 1, 'SZ44')
+    CartModel.add_to_cart('KH2', 'PR15', 1, 'SZ43')
+    assert lines() == [('SZ43', 3), ('SZ44', 1)]
+    assert lines('KH2') == [('SZ43', 1)]
+    with pytest.raises(ValueError):
+        CartModel.add_to_cart('KH1', 'PR1', 1, 'SZ43')
+    with pytest.raises(ValueError):
+        CartModel.add_to_cart('KH1', 'PR15', 0, 'SZ43')
+
+
+def test_migration_merges_existing_duplicates(tmp_path):
+    path = str(tmp_path / 'old.db')
+    with open(os.path.join(ROOT, 'schema.sql'), encoding='utf-8') as f:
+        schema = f.read()
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    conn.executescript(SEED)
+    conn.execute('DELETE FROM cart')
+    conn.executemany("INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity) VALUES (?, ?, ?, ?, ?)", [
+        ('CA100', 'KH1', 'PR15', 'SZ43', 1), ('CA101', 'KH1', 'PR15', 'SZ43', 2),
+        ('CA102', 'KH1', 'PR15', 'SZ44', 1), ('CA103', 'KH1', 'PR15', 'SZ43', 4),
+        ('CA104', 'KH2', 'PR15', 'SZ43', 1),
+    ])
+    conn.commit()
+    conn.close()
+    apply_migrations(path)
+    conn = connect(path)
+    try:
+        rows = conn.execute('SELECT cart_id, customer_id, size_id, quantity FROM cart ORDER BY cart_id').fetchall()
+        assert [tuple(row) for row in rows] == [
+            ('CA100', 'KH1', 'SZ43', 7), ('CA102', 'KH1', 'SZ44', 1), ('CA104', 'KH2', 'SZ43', 1)]
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity) "
+                         "VALUES ('CA105', 'KH1', 'PR15', 'SZ44', 1)")
+    finally:
+        conn.close()
+
+
+def test_batch_applies_operations_in_order(client):
+    first = batch(client, add('PR15', 'SZ43'), add('PR15', 'SZ44', 2), add('PR1', 'SZ2'))
+    assert first.status_code == 200
+    cart_ids = {item['size_id']: item['cart_id'] for item in first.json['cart']}
+    response = batch(client,
+                     add('PR15', 'SZ43', 2),
+                     {'op': 'update', 'cart_id': cart_ids['SZ44'], 'quantity': 5},
+                     {'op': 'remove', 'cart_id': cart_ids['SZ2']},
+                     {'op': 'remove', 'cart_id': cart_ids['SZ2']},
+                     add('PR15', 'SZ45'))
+    assert response.status_code == 200
+    # The new cart comes back in the same response, merged per size
+    assert response.json['cart'] == client.get('/api/cart').json
+    assert lines() == [('SZ43', 3), ('SZ44', 5), ('SZ45', 1)]
+    assert {item['size_id']: item['cart_id'] for item in response.json['cart']}['SZ43'] == cart_ids['SZ43']
+    line = next(item for item in response.json['cart'] if item['size_id'] == 'SZ44')
+    assert (line['product_name'], line['size'], line['price']) == ('PeachTea', 'L', 45000)
+
+
+@pytest.mark.parametrize('operation, message', [
+    (add('PR1', 'SZ43'), 'Thao tác 3: Kích thước không hợp lệ'),
+    (add('PR15', 'SZ99'), 'Thao tác 3: Kích thước không hợp lệ'),
+    (add('PR15', 'SZ43', 0), 'Thao tác 3: Số lượng phải là số nguyên dương'),
+    (add('PR15', 'SZ43', True), 'Thao tác 3: Số lượng phải là số nguyên dương'),
+    ({'op': 'update', 'cart_id': 'CA999', 'quantity': 1}, 'Thao tác 3: Không tìm thấy mục trong giỏ hàng'),
+    ({'op': 'clear'}, 'Thao tác 3: Loại thao tác không hợp lệ: clear'),
+])
+def test_batch_is_all_or_nothing(client, operation, message):
+    batch(client, add('PR15', 'SZ43'))
+    response = batch(client, add('PR15', 'SZ43'), add('PR15', 'SZ44'), operation)
+    assert (response.status_code, response.json['error']) == (400, message)
+    assert lines() == [('SZ43', 1)]
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'operations': []},
+    {'operations': 'add'},
+    {'operations': ['add']},
+    {'operations': [add('PR15', 'SZ43')] * (MAX_BATCH_OPERATIONS + 1)},
+])
+def test_batch_rejects_malformed_requests(client, body):
+    assert client.post('/api/cart/batch', json=body).status_code == 400
+    assert lines() == []
+
+
+def test_batch_only_touches_own_cart(client, db_path):
+    other_id, _, _ = CartModel.add_to_cart('KH2', 'PR15', 1, 'SZ43')
+    assert batch(client, {'op': 'update', 'cart_id': other_id, 'quantity': 9}).status_code == 400
+    assert batch(client, {'op': 'remove', 'cart_id': other_id}).status_code == 200
+    assert lines('KH2') == [('SZ43', 1)]
+    anonymous = client.application.test_client()
+    assert anonymous.post('/api/cart/batch', json={'operations': [add('PR15', 'SZ43')]}).status_code == 401
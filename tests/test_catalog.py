@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask
+
+from controllers.product_controller import ProductController
+from controllers.review_controller import ReviewController
+from models.order_admin import OrderAdmin
+from models.product_model import ProductModel
+from models.productadmin import ProductAdmin
+
+PR15_SIZES = [('S', 35000), ('M', 40000), ('L', 45000)]
+
+
+@pytest.fixture
+def client(db_path):
+    app = Flask(__name__)
+    controller = ProductController()
+    app.add_url_rule('/api/products', view_func=controller.get_products)
+    app.add_url_rule('/api/products/stock', view_func=controller.get_product_stock)
+    app.add_url_rule('/api/products/<product_id>', view_func=controller.get_product_by_id)
+    app.add_url_rule('/api/reviews/product/<product_id>', view_func=ReviewController().get_reviews_by_product)
+    return app.test_client()
+
+
+def catalog_names():
+    return {product['product_id']: product['product_name'] for product in ProductModel.get_catalog()['products']}
+
+
+def test_catalog_reused_until_product_edit(db_path):
+    catalog = ProductModel.get_catalog()
+    assert ProductModel.get_catalog() is catalog
+    # Orders leave it alone; product writes rebuild it
+    OrderAdmin.create_order('KH1', 'PR1', 1, 'ST1')
+    assert ProductModel.get_catalog() is catalog
+    ProductAdmin.edit_product('PR15', 'Peach Tea Lớn', 5, 'Peach tea', 0, 'Drinks', PR15_SIZES, None, None)
+    assert ProductModel.get_catalog() is not catalog
+    assert catalog_names()['PR15'] == 'Peach Tea Lớn'
+    product_id, _ = ProductAdmin.add_product('Matcha', 3, 'Matcha latte', 0, 'Drinks', [('M', 30000)], None, None)
+    assert catalog_names()[product_id] == 'Matcha'
+    assert ProductAdmin.delete_product(product_id)
+    assert product_id not in catalog_names()
+
+
+def test_api_serves_catalog_and_current_stock(db_path, client):
+    products = client.get('/api/products').get_json()
+    assert [product['product_id'] for product in products][:2] == ['PR1', 'PR2']
+    assert all('stock' not in product for product in products)
+    OrderAdmin.create_order('KH1', 'PR1', 4, 'ST1')
+    assert client.get('/api/products/stock').get_json()['PR1'] == 86
+    product = client.get('/api/products/PR1').get_json()['product']
+    assert (product['product_name'], product['stock']) == ('Americano', 86)
+    assert client.get('/api/products/PR999').status_code == 404
+
+
+def revalidate(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    assert 'no-cache' in first.headers['Cache-Control']
+    replay = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    return first, replay
+
+
+@pytest.mark.parametrize('url', ['/api/products', '/api/products/PR15', '/api/products/stock',
+                                 '/api/reviews/product/PR1'])
+def test_unchanged_json_revalidates_as_304(db_path, client, url):
+    first, replay = revalidate(client, url)
+    assert replay.status_code == 304
+    assert replay.data == b''
+    assert replay.headers['ETag'] == first.headers['ETag']
+
+
+def test_product_edit_changes_etag(db_path, client):
+    first = client.get('/api/products')
+    ProductAdmin.edit_product('PR15', 'Peach Tea Lớn', 5, 'Peach tea', 0, 'Drinks', PR15_SIZES, None, None)
+    edited = client.get('/api/products', headers={'If-None-Match': first.headers['ETag']})
+    assert edited.status_code == 200
+    assert edited.headers['ETag'] != first.headers['ETag']
+    assert 'Peach Tea Lớn' in edited.get_data(as_text=True)
+
+
+def test_order_changes_stock_etag_only(db_path, client):
+    catalog = client.get('/api/products')
+    stock = client.get('/api/products/stock')
+    product = client.get('/api/products/PR1')
+    OrderAdmin.create_order('KH1', 'PR1', 2, 'ST1')
+    assert client.get('/api/products', headers={'If-None-Match': catalog.headers['ETag']}).status_code == 304
+    assert client.get('/api/products/stock', headers={'If-None-Match': stock.headers['ETag']}).status_code == 200
+    assert client.get('/api/products/PR1', headers={'If-None-Match': product.headers['ETag']}).status_code == 200
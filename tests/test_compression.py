@@ -0,0 +1,108 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, stream_with_context
+
+from utils.compression import ENCODINGS, init_compression, negotiate
+from utils.http import cached_json_response, json_body, send_media
+
+ROWS = [{'product_id': f'PR{n}', 'product_name': f'Sản phẩm {n}', 'description': 'Cà phê sữa đá'} for n in range(100)]
+STREAM_SIZE = 16 * 1024
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'page.txt').write_text('x' * 5000)
+    app = Flask(__name__)
+    app.config['COMPRESS_STREAM_SIZE'] = STREAM_SIZE
+
+    @app.route('/products')
+    def products():
+        return cached_json_response(json_body(ROWS))
+
+    @app.route('/small')
+    def small():
+        return cached_json_response(json_body({'success': True}))
+
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' + bytes(5000), mimetype='image/png')
+
+    @app.route('/report')
+    def report():
+        def lines():
+            for n in range(2000):
+                yield f'{n},Cà phê sữa đá,29000\n'
+        return Response(stream_with_context(lines()), mimetype='text/csv')
+
+    @app.route('/media/<path:filename>')
+    def media(filename):
+        return send_media(str(tmp_path), filename)
+
+    init_compression(app)
+    return app
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, identity', 'gzip'),
+    ('gzip;q=0, identity', None),
+    ('', None),
+    ('deflate', None),
+    ('*', ENCODINGS[0]),
+    ('*;q=0.1, gzip;q=0.9', 'gzip'),
+])
+def test_negotiate_picks_highest_weight(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_json_compressed_per_accept_encoding(app):
+    client = app.test_client()
+    plain = client.get('/products', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    compressed = client.get('/products', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.content_length == len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == ROWS
+    # Each encoding is its own representation, and revalidates as such
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    replay = client.get('/products', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert (replay.status_code, replay.headers['ETag']) == (304, compressed.headers['ETag'])
+
+
+def test_tagged_bodies_are_compressed_once(app):
+    client = app.test_client()
+    first = client.get('/products', headers={'Accept-Encoding': 'gzip'})
+    middleware = app.extensions['compression']
+    assert middleware.cache.get((first.headers['ETag'][:-len('-gzip"')] + '"', 'gzip')) == first.data
+    assert client.get('/products', headers={'Accept-Encoding': 'gzip'}).data == first.data
+
+
+def test_small_and_binary_responses_pass_through(app):
+    client = app.test_client()
+    for url in ('/small', '/image'):
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers, url
+
+
+def test_long_streams_are_compressed_as_they_go(app):
+    response = app.test_client().get('/report', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    text = gzip.decompress(response.data).decode()
+    assert len(text.encode()) > STREAM_SIZE
+    assert text.splitlines()[-1] == '1999,Cà phê sữa đá,29000'
+
+
+def test_ranges_are_never_compressed(app):
+    client = app.test_client()
+    partial = client.get('/media/page.txt', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-99'})
+    assert partial.status_code == 206
+    assert 'Content-Encoding' not in partial.headers
+    assert partial.data == b'x' * 100
+    whole = client.get('/media/page.txt', headers={'Accept-Encoding': 'gzip'})
+    # Compressed whole files stop advertising ranges of the identity bytes
+    assert whole.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Ranges' not in whole.headers
@@ -0,0 +1,76 @@
+import threading
+
+from utils.db import get_db_connection
+
+READERS = 8
+WRITERS = 4
+MOVES = 20
+READS = 100
+
+
+def test_pooled_connections_use_wal(db_path):
+    conn = get_db_connection()
+    try:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_readers_and_writers_in_parallel(db_path):
+    # Writers move stock between PR1 and PR2 one unit at a time while readers
+    # read both; there are more threads than pooled connections, so they also
+    # wait on the pool. WAL readers never block writers and always see a
+    # committed snapshot, so the total never changes.
+    conn = get_db_connection()
+    total = conn.execute("SELECT SUM(stock) FROM products WHERE product_id IN ('PR1', 'PR2')").fetchone()[0]
+    conn.close()
+    errors = []
+    start = threading.Barrier(READERS + WRITERS)
+
+    def write(n):
+        source, target = ('PR1', 'PR2') if n % 2 else ('PR2', 'PR1')
+        start.wait()
+        try:
+            for _ in range(MOVES):
+                conn = get_db_connection()
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute('UPDATE products SET stock = stock - 1 WHERE product_id = ?', (source,))
+                    conn.execute('UPDATE products SET stock = stock + 1 WHERE product_id = ?', (target,))
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        start.wait()
+        try:
+            for _ in range(READS):
+                conn = get_db_connection()
+                try:
+                    seen = conn.execute("SELECT SUM(stock) FROM products WHERE product_id IN ('PR1', 'PR2')").fetchone()[0]
+                finally:
+                    conn.close()
+                if seen != total:
+                    errors.append(AssertionError(f'read {seen}, expected {total}'))
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(WRITERS)]
+    readers = [threading.Thread(target=read) for _ in range(READERS)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers + readers:
+        thread.join()
+
+    assert errors == []
+    conn = get_db_connection()
+    try:
+        rows = dict(conn.execute("SELECT product_id, stock FROM products WHERE product_id IN ('PR1', 'PR2')").fetchall())
+    finally:
+        conn.close()
+    # Half the writers go each way, so every unit is back where it started
+    assert rows == {'PR1': 90, 'PR2': 50}
@@ -0,0 +1,156 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify
+
+from controllers.cart_controller import CartController
+from models.cart_model import CartModel
+from utils.idempotency import idempotency_store, idempotent, init_idempotency
+
+ADD_PR15_M = {'operations': [{'op': 'add', 'product_id': 'PR15', 'size_id': 'SZ43', 'quantity': 1}]}
+
+
+@pytest.fixture
+def app(db_path, monkeypatch):
+    # init_idempotency() configures the shared store; monkeypatch puts it back
+    monkeypatch.setattr(idempotency_store, 'ttl', idempotency_store.ttl)
+    monkeypatch.setattr(idempotency_store, 'wait', idempotency_store.wait)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config['IDEMPOTENCY_WAIT'] = 5
+    app.add_url_rule('/api/cart/batch', view_func=idempotent(CartController().batch_update_cart),
+                     methods=['POST'])
+    init_idempotency(app)
+    return app
+
+
+def login(app, customer_id='KH1'):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['customer_id'] = customer_id
+    return client
+
+
+def quantities(customer_id='KH1'):
+    return {item['size_id']: item['quantity'] for item in CartModel.get_cart(customer_id)}
+
+
+def test_retry_replays_first_response(app):
+    client = login(app)
+    headers = {'Idempotency-Key': 'batch-1'}
+    first = client.post('/api/cart/batch', json=ADD_PR15_M, headers=headers)
+    retry = client.post('/api/cart/batch', json=ADD_PR15_M, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert (retry.data, retry.content_type) == (first.data, first.content_type)
+    assert quantities() == {'SZ43': 1}
+    # A new key is a new request
+    client.post('/api/cart/batch', json=ADD_PR15_M, headers={'Idempotency-Key': 'batch-2'})
+    assert quantities() == {'SZ43': 2}
+
+
+def test_requests_without_key_run_every_time(app):
+    client = login(app)
+    client.post('/api/cart/batch', json=ADD_PR15_M)
+    client.post('/api/cart/batch', json=ADD_PR15_M)
+    assert quantities() == {'SZ43': 2}
+
+
+def test_keys_are_scoped_per_user(app):
+    headers = {'Idempotency-Key': 'batch-1'}
+    login(app, 'KH1').post('/api/cart/batch', json=ADD_PR15_M, headers=headers)
+    other = login(app, 'KH2').post('/api/cart/batch', json=ADD_PR15_M, headers=headers)
+    assert 'Idempotent-Replayed' not in other.headers
+    assert quantities('KH1') == quantities('KH2') == {'SZ43': 1}
+
+
+def test_key_reused_for_another_body_is_rejected(app):
+    client = login(app)
+    headers = {'Idempotency-Key': 'batch-1'}
+    client.post('/api/cart/batch', json=ADD_PR15_M, headers=headers)
+    other = {'operations': [{'op': 'add', 'product_id': 'PR15', 'size_id': 'SZ44', 'quantity': 1}]}
+    assert client.post('/api/cart/batch', json=other, headers=headers).status_code == 422
+    assert quantities() == {'SZ43': 1}
+
+
+@pytest.mark.parametrize('key', ['', ' ', 'k' * 256])
+def test_invalid_keys_are_rejected(app, key):
+    response = login(app).post('/api/cart/batch', json=ADD_PR15_M, headers={'Idempotency-Key': key})
+    assert response.status_code == 400
+    assert quantities() == {}
+
+
+def test_client_errors_replay_and_server_errors_release(app):
+    calls = []
+
+    @idempotent
+    def flaky():
+        calls.append(1)
+        return jsonify({'calls': len(calls)}), 500 if len(calls) == 1 else 400
+
+    app.add_url_rule('/flaky', view_func=flaky, methods=['POST'])
+    client = login(app)
+    headers = {'Idempotency-Key': 'flaky-1'}
+    assert client.post('/flaky', headers=headers).status_code == 500
+    # The 5xx freed the key: the retry runs, and its 4xx is what later retries get
+    assert client.post('/flaky', headers=headers).status_code == 400
+    replay = client.post('/flaky', headers=headers)
+    assert (replay.status_code, replay.json, replay.headers['Idempotent-Replayed']) == (400, {'calls': 2}, 'true')
+    assert len(calls) == 2
+
+
+def test_concurrent_duplicate_waits_for_first(app):
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+
+    @idempotent
+    def slow():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return jsonify({'calls': len(calls)})
+
+    app.add_url_rule('/slow', view_func=slow, methods=['POST'])
+    headers = {'Idempotency-Key': 'slow-1'}
+    responses = {}
+
+    def post(name):
+        responses[name] = login(app).post('/slow', headers=headers)
+
+    first = threading.Thread(target=post, args=('first',))
+    first.start()
+    assert started.wait(5)
+    duplicate = threading.Thread(target=post, args=('duplicate',))
+    duplicate.start()
+    duplicate.join(0.2)
+    assert duplicate.is_alive()
+    finish.set()
+    first.join(5)
+    duplicate.join(5)
+    assert len(calls) == 1
+    assert responses['first'].json == responses['duplicate'].json == {'calls': 1}
+    assert responses['duplicate'].headers['Idempotent-Replayed'] == 'true'
+
+
+def test_duplicate_gives_up_while_first_still_runs(app, monkeypatch):
+    monkeypatch.setattr(idempotency_store, 'wait', 0.1)
+    started, finish = threading.Event(), threading.Event()
+
+    @idempotent
+    def stuck():
+        started.set()
+        finish.wait(5)
+        return jsonify({'success': True})
+
+    app.add_url_rule('/stuck', view_func=stuck, methods=['POST'])
+    headers = {'Idempotency-Key': 'stuck-1'}
+    first = threading.Thread(target=lambda: login(app).post('/stuck', headers=headers))
+    first.start()
+    try:
+        assert started.wait(5)
+        busy = login(app).post('/stuck', headers=headers)
+        assert (busy.status_code, busy.headers['Retry-After']) == (409, '1')
+    finally:
+        finish.set()
+        first.join(5)
@@ -0,0 +1,74 @@
+import threading
+
+from conftest import connect
+from utils.db import get_db_connection
+from utils.ids import BLOCK_SIZES, next_id, next_ids
+
+THREADS = 8
+IDS_PER_THREAD = 50
+
+
+def test_every_sequence_reserves_blocks(db_path):
+    conn = connect(db_path)
+    try:
+        names = {row['name'] for row in conn.execute('SELECT name FROM id_sequences')}
+        triggers = [row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_id_trigger'")]
+    finally:
+        conn.close()
+    assert {name for name in names if BLOCK_SIZES.get(name, 1) <= 1} == set()
+    # No insert path leaves an ID to a trigger any more
+    assert triggers == []
+
+
+def test_block_needs_one_reservation(db_path):
+    first = next_id('reviews')
+    conn = connect(db_path)
+    try:
+        reserved = conn.execute("SELECT value FROM id_sequences WHERE name = 'reviews'").fetchone()['value']
+    finally:
+        conn.close()
+    rest = next_ids('reviews', BLOCK_SIZES['reviews'] - 1)
+    ids = [first] + rest
+    assert len(set(ids)) == BLOCK_SIZES['reviews']
+    assert ids[-1] == f'RV{reserved}'
+    conn = connect(db_path)
+    try:
+        assert conn.execute("SELECT value FROM id_sequences WHERE name = 'reviews'").fetchone()['value'] == reserved
+    finally:
+        conn.close()
+
+
+def test_ids_unique_across_threads(db_path):
+    ids = []
+    start = threading.Barrier(THREADS)
+
+    def take():
+        start.wait()
+        ids.extend(next_id('users') for _ in range(IDS_PER_THREAD))
+
+    threads = [threading.Thread(target=take) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == THREADS * IDS_PER_THREAD
+
+
+def test_reserve_inside_callers_transaction(db_path):
+    # With the write lock held, the allocator's own connection could not
+    # reserve; the caller's connection does, and a rollback returns the IDs
+    conn = get_db_connection()
+    try:
+        conn.execute("UPDATE products SET stock = stock WHERE product_id = 'PR1'")
+        assert conn.in_transaction
+        order_id = next_id('orders', conn)
+        conn.rollback()
+    finally:
+        conn.close()
+    conn = connect(db_path)
+    try:
+        value = conn.execute("SELECT value FROM id_sequences WHERE name = 'orders'").fetchone()['value']
+    finally:
+        conn.close()
+    assert order_id == f'OR{value + 1}'
+
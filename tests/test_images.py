@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+
+from conftest import connect
+from models.product_model import ProductModel
+from utils.images import VARIANTS, encodable_formats, image_pipeline, process_image, variant_url
+
+Image = pytest.importorskip('PIL.Image')
+
+SOURCE_URL = '/static/Upload/photo.jpg'
+
+
+def set_image(db_path, product_id, url):
+    conn = connect(db_path)
+    conn.execute('UPDATE products SET image_url = ? WHERE product_id = ?', (url, product_id))
+    conn.commit()
+    conn.close()
+
+
+def test_variants_fit_their_slots_upright_without_metadata(db_path, tmp_path):
+    # A 2000x1000 camera photo tagged "rotate 90", with EXIF to strip
+    path = tmp_path / 'photo.jpg'
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Camera'
+    Image.new('RGB', (2000, 1000), 'brown').save(path, exif=exif)
+
+    rows = process_image(str(path), SOURCE_URL)
+    formats = encodable_formats()
+    assert 'webp' in formats
+    assert {(row[1], row[2]) for row in rows} == {(variant, fmt) for variant in VARIANTS for fmt in formats}
+    for source_url, variant, fmt, url, width, height, size in rows:
+        assert url == variant_url(SOURCE_URL, variant, fmt)
+        # Portrait once the orientation is applied, longest side at the slot size
+        assert (width, height) == (VARIANTS[variant] // 2, VARIANTS[variant])
+        with Image.open(tmp_path / f'photo.{variant}.{fmt}') as variant_image:
+            assert variant_image.size == (width, height)
+            assert not variant_image.getexif()
+        assert size == (tmp_path / f'photo.{variant}.{fmt}').stat().st_size
+
+
+def test_small_images_keep_size_and_alpha(db_path, tmp_path):
+    path = tmp_path / 'logo.png'
+    Image.new('RGBA', (100, 40), (255, 0, 0, 0)).save(path)
+    rows = process_image(str(path), '/static/Upload/logo.png')
+    assert {(row[4], row[5]) for row in rows} == {(100, 40)}
+    with Image.open(tmp_path / 'logo.thumb.webp') as variant_image:
+        assert variant_image.mode == 'RGBA'
+
+
+def test_catalog_lists_variants_once_processed(db_path, tmp_path):
+    set_image(db_path, 'PR1', SOURCE_URL)
+    product = ProductModel.get_catalog()['products'][0]
+    assert (product['product_id'], product['image_variants']) == ('PR1', None)
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (600, 600), 'white').save(path)
+    image_pipeline.submit(str(path), SOURCE_URL).result()
+    # Recording the variants rebuilds the cached catalog
+    variants = ProductModel.get_catalog()['products'][0]['image_variants']
+    assert variants['card']['webp'] == '/static/Upload/photo.card.webp'
+
+
+def test_failed_image_keeps_original(db_path, tmp_path, caplog):
+    path = tmp_path / 'broken.jpg'
+    path.write_bytes(b'not an image')
+    with caplog.at_level(logging.ERROR, logger='utils.images'):
+        assert image_pipeline.submit(str(path), '/static/Upload/broken.jpg').result() is None
+    assert 'Image processing failed for /static/Upload/broken.jpg' in caplog.text
+    conn = connect(db_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM image_variants').fetchone()[0] == 0
+    finally:
+        conn.close()
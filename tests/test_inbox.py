@@ -0,0 +1,105 @@
+from conftest import connect
+from models.inbox import Inbox, parse_message_cursor
+from models.inbox_user import InboxUser
+
+# Last message per customer; KH2, KH3 and KH4 share a timestamp, so the
+# thread cursor has to break the tie on user_id
+LAST_MESSAGES = [
+    ('KH1', '2026-10-01 08:00:00'),
+    ('KH2', '2026-10-02 08:00:00'),
+    ('KH3', '2026-10-02 08:00:00'),
+    ('KH4', '2026-10-02 08:00:00'),
+    ('KH5', '2026-10-03 08:00:00'),
+    ('KH6', '2026-10-04 08:00:00'),
+    ('KH7', '2026-10-05 08:00:00'),
+]
+
+
+# KH1's conversation with AD1, three messages to a timestamp
+CONVERSATION = [(f'MS{100 + n}', 'KH1', 'AD1' if n % 2 else None, 'admin_to_user' if n % 2 else 'user_to_admin',
+                 f'Message {n}', f'2026-10-0{1 + n // 3} 08:00:00') for n in range(8)]
+
+
+def add_messages(db_path, rows):
+    conn = connect(db_path)
+    conn.executemany("""INSERT INTO messages (message_id, user_id, direction, content, timestamp, is_read)
+                        VALUES (?, ?, 'user_to_admin', ?, ?, 0)""", rows)
+    conn.commit()
+    conn.close()
+
+
+def add_conversation(db_path, rows):
+    conn = connect(db_path)
+    conn.executemany("""INSERT INTO messages (message_id, user_id, admin_id, direction, content, timestamp, is_read)
+                        VALUES (?, ?, ?, ?, ?, ?, 0)""", rows)
+    conn.commit()
+    conn.close()
+
+
+def unread(db_path, user_id):
+    conn = connect(db_path)
+    try:
+        return tuple(conn.execute('SELECT unread_count_for_admin, unread_count_for_user FROM conversations WHERE user_id = ?',
+                                  (user_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def history(fetch, limit):
+    # The latest page, then older pages through older_cursor, oldest message first
+    page = fetch(limit=limit)
+    newer_cursor = page['newer_cursor']
+    messages = page['messages']
+    while page['older_cursor']:
+        page = fetch(before=parse_message_cursor(page['older_cursor']), limit=limit)
+        assert len(page['messages']) <= limit
+        messages = page['messages'] + messages
+    return [message['message_id'] for message in messages], newer_cursor
+
+
+def test_thread_pages_cover_every_thread_once(db_path):
+    add_messages(db_path, [(f'MS{900 + n}', user_id, f'Hello from {user_id}', timestamp)
+                           for n, (user_id, timestamp) in enumerate(LAST_MESSAGES)])
+    # KH7's thread belongs to another admin and is not listed for AD1
+    conn = connect(db_path)
+    conn.execute("INSERT INTO user_admin_assignments (user_id, admin_id) VALUES ('KH7', 'AD2')")
+    conn.commit()
+    conn.close()
+
+    seen, cursor = [], None
+    while True:
+        page = Inbox.get_threads('AD1', parse_message_cursor(cursor), limit=2)
+        assert len(page['threads']) <= 2
+        seen += [thread['user_id'] for thread in page['threads']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == ['KH6', 'KH5', 'KH4', 'KH3', 'KH2', 'KH1']
+    assert Inbox.get_threads('AD2')['threads'][0]['user_id'] == 'KH7'
+
+
+def test_message_pages_walk_back_through_history(db_path):
+    add_conversation(db_path, CONVERSATION)
+    everything = [row[0] for row in sorted(CONVERSATION, key=lambda row: (row[5], row[0]))]
+    for limit in (1, 2, 3):
+        ids, _ = history(lambda **page: Inbox.get_messages('KH1', 'AD1', **page), limit)
+        assert ids == everything
+        ids, _ = history(lambda **page: InboxUser.get_user_messages_data('KH1', **page), limit)
+        assert ids == everything
+
+
+def test_newer_cursor_returns_only_new_messages(db_path):
+    add_conversation(db_path, CONVERSATION)
+    page = Inbox.get_messages('KH1', 'AD1', limit=3)
+    # Only the delivered page is marked read: one of the four customer messages
+    assert unread(db_path, 'KH1') == (3, 4)
+    newer = parse_message_cursor(page['newer_cursor'])
+    assert Inbox.get_messages('KH1', 'AD1', after=newer)['messages'] == []
+    add_conversation(db_path, [('MS200', 'KH1', None, 'user_to_admin', 'Còn đó không?', '2026-10-09 08:00:00'),
+                               ('MS201', 'KH1', None, 'user_to_admin', 'Alo', '2026-10-09 08:00:00')])
+    page = Inbox.get_messages('KH1', 'AD1', after=newer, limit=1)
+    assert ([message['message_id'] for message in page['messages']], page['has_newer']) == (['MS200'], True)
+    page = Inbox.get_messages('KH1', 'AD1', after=parse_message_cursor(page['newer_cursor']), limit=1)
+    assert ([message['message_id'] for message in page['messages']], page['has_newer']) == (['MS201'], False)
+    # With nothing new the cursor stays where it was
+    assert Inbox.get_messages('KH1', 'AD1', after=parse_message_cursor(page['newer_cursor']))['newer_cursor'] == page['newer_cursor']
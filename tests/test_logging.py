@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+from flask import Flask
+
+import utils.log
+from controllers.user_controller import register_user_routes
+from models.dashboard import Dashboard
+from utils.log import configure_logging, stop_logging
+
+# Longer than any one-line event message; shorter than a row or query dump
+PAYLOAD_SIZE = 300
+
+
+@pytest.fixture
+def client(db_path):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    register_user_routes(app)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['customer_id'] = 'KH1'
+    return client
+
+
+def exercise_hot_paths(client):
+    assert client.get('/api/orders').status_code == 200
+    assert client.get('/api/user').status_code == 200
+    Dashboard.get_dashboard_data('AD1', year=2025)
+
+
+def test_no_payload_logged_at_info(client, caplog):
+    caplog.set_level(logging.INFO)
+    exercise_hot_paths(client)
+    assert [record.getMessage() for record in caplog.records if len(record.getMessage()) > PAYLOAD_SIZE] == []
+
+
+def test_payloads_still_logged_at_debug(client, caplog):
+    # The same calls do dump rows and queries at DEBUG, so the INFO test
+    # would notice one of them moving up a level
+    caplog.set_level(logging.DEBUG)
+    exercise_hot_paths(client)
+    assert any(len(record.getMessage()) > PAYLOAD_SIZE for record in caplog.records)
+
+
+class Payload:
+    formatted = 0
+
+    def __str__(self):
+        Payload.formatted += 1
+        return 'payload'
+
+
+def test_debug_arguments_not_formatted_at_info(tmp_path):
+    # %-style arguments of a suppressed record are never rendered, and an
+    # emitted one is rendered once, in the thread that logged it
+    root = logging.getLogger()
+    level = root.level
+    log_file = tmp_path / 'app.log'
+    configure_logging('INFO', 'json', filename=str(log_file))
+    try:
+        logger = logging.getLogger('tests.payload')
+        Payload.formatted = 0
+        logger.debug('Rows: %s', Payload())
+        assert Payload.formatted == 0
+        logger.info('Rows: %s', Payload())
+        assert Payload.formatted == 1
+    finally:
+        stop_logging()
+        root.removeHandler(utils.log._handler)
+        root.setLevel(level)
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1 and '"Rows: payload"' in lines[0]
+    assert Payload.formatted == 1
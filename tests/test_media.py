@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from flask import Flask
+
+from utils.http import file_body, send_media
+
+MEDIA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def media(tmp_path):
+    (tmp_path / 'media').mkdir()
+    (tmp_path / 'media' / 'clip.mp4').write_bytes(MEDIA)
+    (tmp_path / 'secret.txt').write_text('secret')
+    return tmp_path / 'media'
+
+
+@pytest.fixture
+def app(media):
+    app = Flask(__name__)
+
+    @app.route('/media/<path:filename>')
+    def serve_media(filename):
+        return send_media(str(media), filename)
+
+    return app
+
+
+def test_full_response_advertises_ranges(app):
+    response = app.test_client().get('/media/clip.mp4')
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.content_type == 'video/mp4'
+    assert response.content_length == len(MEDIA)
+    assert response.data == MEDIA
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=100-199', 100, 200),
+    ('bytes=10000-', 10000, len(MEDIA)),
+    ('bytes=-50', len(MEDIA) - 50, len(MEDIA)),
+])
+def test_single_range_is_206(app, header, start, stop):
+    response = app.test_client().get('/media/clip.mp4', headers={'Range': header})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{len(MEDIA)}'
+    assert response.content_length == stop - start
+    assert response.data == MEDIA[start:stop]
+
+
+def test_unsatisfiable_range_is_416(app):
+    response = app.test_client().get('/media/clip.mp4', headers={'Range': f'bytes={len(MEDIA)}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(MEDIA)}'
+
+
+def test_validators(app):
+    client = app.test_client()
+    etag = client.get('/media/clip.mp4').headers['ETag']
+    assert client.get('/media/clip.mp4', headers={'If-None-Match': etag}).status_code == 304
+    # A range against a copy that has since changed gets the whole new file
+    stale = client.get('/media/clip.mp4', headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+    assert (stale.status_code, stale.data) == (200, MEDIA)
+    current = client.get('/media/clip.mp4', headers={'Range': 'bytes=0-9', 'If-Range': etag})
+    assert (current.status_code, current.data) == (206, MEDIA[:10])
+
+
+def test_x_sendfile_leaves_the_body_to_the_server(app, media):
+    app.config['USE_X_SENDFILE'] = True
+    response = app.test_client().get('/media/clip.mp4')
+    assert response.headers['X-Sendfile'] == os.path.abspath(media / 'clip.mp4')
+    assert response.data == b''
+
+
+def test_paths_outside_the_directory_are_404(app):
+    client = app.test_client()
+    assert client.get('/media/..%2Fsecret.txt').status_code == 404
+    assert client.get('/media/missing.mp4').status_code == 404
+
+
+def test_body_reads_only_the_range_in_chunks(media):
+    chunks = list(file_body({}, str(media / 'clip.mp4'), 1000, 2500, chunk_size=1024))
+    assert [len(chunk) for chunk in chunks] == [1024, 1024, 452]
+    assert b''.join(chunks) == MEDIA[1000:3500]
@@ -0,0 +1,119 @@
+import pytest
+from flask import Flask
+
+from conftest import connect
+from controllers.order_lists_controller import OrderListsController
+from models.order_lists import OrderLists
+from models.pages import Pages
+
+# (order_id, customer, order_date, status, lines); OR101-OR103 share a
+# timestamp, so a page boundary falls between orders with equal dates
+ORDERS = [
+    ('OR100', 'KH1', '2026-09-01 09:00:00', 'Delivered', [('PR1', 'SZ1', 2, 60000)]),
+    ('OR101', 'KH2', '2026-09-02 09:00:00', 'Delivered', [('PR1', 'SZ1', 1, 30000), ('PR2', 'SZ4', 1, 35000)]),
+    ('OR102', 'KH2', '2026-09-02 09:00:00', 'Delivered', [('PR2', 'SZ4', 3, 105000)]),
+    ('OR103', 'KH3', '2026-09-02 09:00:00', 'Delivered',
+     [('PR1', 'SZ1', 1, 30000), ('PR2', 'SZ4', 1, 35000), ('PR15', 'SZ45', 1, 35000)]),
+    ('OR104', 'KH3', '2026-09-03 09:00:00', 'Pending', [('PR1', 'SZ1', 1, 30000)]),
+    ('OR105', 'KH1', '2026-09-04 09:00:00', 'Delivered', [('PR15', 'SZ43', 2, 80000)]),
+    ('OR106', 'KH4', '2026-09-05 09:00:00', 'Cancelled', [('PR2', 'SZ4', 1, 35000)]),
+]
+
+
+def add_orders(db_path):
+    conn = connect(db_path)
+    for order_id, customer_id, order_date, status, lines in ORDERS:
+        conn.execute("INSERT INTO orders (order_id, customer_id, order_date, status, store_id) VALUES (?, ?, ?, ?, 'ST1')",
+                     (order_id, customer_id, order_date, status))
+        conn.executemany("""INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                         [(f'OD{order_id[2:]}{n}', order_id, product_id, size_id, quantity, total // quantity, total)
+                          for n, (product_id, size_id, quantity, total) in enumerate(lines)])
+    conn.commit()
+    conn.close()
+
+
+def walk(fetch, key, limit):
+    # Follows next_cursor from the first page to the last
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor, limit)
+        assert len(page[key]) <= limit
+        pages.append(page)
+        cursor = page['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_invoice_pages_match_one_page(db_path):
+    add_orders(db_path)
+    everything = Pages.get_invoice_data(date_from='2026-09-01', date_to='2026-09-30', limit=100)
+    assert everything['next_cursor'] is None
+    assert [invoice['code'] for invoice in everything['invoices']] == ['OR105', 'OR103', 'OR102', 'OR101', 'OR100']
+    for limit in (1, 2, 3):
+        pages = walk(lambda cursor, limit: Pages.get_invoice_data(date_from='2026-09-01', date_to='2026-09-30',
+                                                                  cursor=cursor, limit=limit), 'invoices', limit)
+        assert [invoice for page in pages for invoice in page['invoices']] == everything['invoices']
+        # Totals and the customer list come with the first page only
+        assert pages[0]['total_amount'] == everything['total_amount'] == 410000
+        assert all('total_amount' not in page for page in pages[1:])
+    or103 = next(invoice for invoice in everything['invoices'] if invoice['code'] == 'OR103')
+    assert (len(or103['products']), or103['total_price']) == (3, 100000)
+
+
+def test_invoice_filters(db_path):
+    add_orders(db_path)
+    day = Pages.get_invoice_data(filter_date='2026-09-02')
+    assert [invoice['code'] for invoice in day['invoices']] == ['OR103', 'OR102', 'OR101']
+    customer = Pages.get_invoice_data(filter_customer=day['invoices'][1]['customer_name'],
+                                      date_from='2026-09-01', date_to='2026-09-30')
+    assert [invoice['code'] for invoice in customer['invoices']] == ['OR102', 'OR101']
+    with pytest.raises(ValueError):
+        Pages.get_invoice_data(cursor='OR102')
+
+
+@pytest.fixture
+def admin_client(db_path):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.add_url_rule('/api/order_lists', view_func=OrderListsController().get_orders)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_id'] = 'AD1'
+    return client
+
+
+def order_ids(pages):
+    return [order['order_id'] for page in pages for order in page['orders']]
+
+
+def test_order_list_pages_match_one_page(db_path):
+    add_orders(db_path)
+    everything = OrderLists.get_orders(limit=100)
+    assert everything['next_cursor'] is None
+    # The sample orders come after the September ones
+    assert order_ids([everything])[:7] == ['OR106', 'OR105', 'OR104', 'OR103', 'OR102', 'OR101', 'OR100']
+    for limit in (1, 2, 3):
+        pages = walk(lambda cursor, limit: OrderLists.get_orders(cursor=cursor, limit=limit), 'orders', limit)
+        assert [order for page in pages for order in page['orders']] == everything['orders']
+    or103 = next(order for order in everything['orders'] if order['order_id'] == 'OR103')
+    assert or103['price_list'] == [30000, 35000, 35000]
+
+
+def test_order_list_api_filters_and_pages(db_path, admin_client):
+    add_orders(db_path)
+
+    def fetch(cursor, limit, **filters):
+        query = dict(filters, limit=limit, **({'cursor': cursor} if cursor else {}))
+        response = admin_client.get('/api/order_lists', query_string=query)
+        assert response.status_code == 200
+        return response.get_json()
+
+    september = {'from': '2026-09-01', 'to': '2026-09-30'}
+    assert order_ids(walk(lambda cursor, limit: fetch(cursor, limit, **september), 'orders', 2)) == \
+        ['OR106', 'OR105', 'OR104', 'OR103', 'OR102', 'OR101', 'OR100']
+    delivered = dict(september, status='Delivered', customer='KH2')
+    assert order_ids(walk(lambda cursor, limit: fetch(cursor, limit, **delivered), 'orders', 1)) == ['OR102', 'OR101']
+    assert order_ids([fetch(None, 50, store='ST2', **september)]) == []
+    assert admin_client.get('/api/order_lists?cursor=OR101').status_code == 400
+    assert admin_client.get('/api/order_lists?from=yesterday').status_code == 400
@@ -0,0 +1,119 @@
+import pytest
+
+import utils.db
+from conftest import connect
+from models.address_model import AddressModel
+from models.cart_model import CartModel
+from models.favorites import Favorites
+from models.inbox import Inbox
+from models.order_admin import OrderAdmin
+from models.order_lists import OrderLists
+from models.product_model import ProductModel
+from models.productadmin import ProductAdmin
+from models.review_model import ReviewModel
+
+SIZE_ORDER = ['S', 'M', 'L']
+
+# (model call, indexes its queries must use, tables it may read in full)
+CASES = {
+    'product': (lambda: ProductModel.get_product_by_id('PR15'), {'idx_product_size_product_id'}, set()),
+    'catalog': (ProductModel.get_all_products, {'idx_product_size_product_id'}, {'p'}),
+    'top10': (lambda: ProductModel.get_top10_products(),
+              {'idx_product_sales_rollup_total', 'idx_product_size_product_id'}, set()),
+    'top10_window': (lambda: ProductModel.get_top10_products(days=7), {'idx_product_sales_daily_date'}, set()),
+    'cart': (lambda: CartModel.get_cart('KH1'), {'idx_cart_customer_size'}, set()),
+    'messages': (lambda: Inbox.get_messages('KH1', 'AD1'), {'idx_messages_user_id_timestamp'}, set()),
+    'threads': (lambda: Inbox.get_threads('AD1'), {'idx_conversations_recent'}, set()),
+    'threads_page': (lambda: Inbox.get_threads('AD1', ('2026-10-18 10:00:00', 'KH5')), {'idx_conversations_recent'}, set()),
+    'reviews': (lambda: ReviewModel.get_reviews_by_product('PR1'), {'idx_reviews_product_id'}, set()),
+    'addresses': (lambda: AddressModel.get_addresses('KH1'), {'idx_addresses_customer_id'}, set()),
+    'favorites': (lambda: Favorites.get_favorites('AD1'), {'idx_favorites_admin_id', 'idx_reviews_product_id'}, set()),
+    'orders_by_customer': (lambda: OrderLists.get_orders(customer_id='KH1'),
+                           {'idx_orders_customer_id', 'idx_order_details_order_id'}, set()),
+    'orders_by_status': (lambda: OrderLists.get_orders(status='Pending'),
+                         {'idx_orders_status_order_date', 'idx_order_details_order_id'}, set()),
+}
+
+
+@pytest.fixture
+def statements(db_path, monkeypatch):
+    # Every statement the pooled connections run, with parameters inlined
+    statements = []
+    pool = utils.db._pool
+    connect_pooled = pool._connect
+
+    def traced_connect():
+        conn = connect_pooled()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(pool, '_connect', traced_connect)
+    return statements
+
+
+def query_plans(db_path, statements):
+    conn = connect(db_path)
+    try:
+        return [[row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+                for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+    finally:
+        conn.close()
+
+
+def full_scans(plan):
+    # 'SCAN t' reads all of t; 'SCAN t USING INDEX' walks an index in order
+    # and a scan of a subquery or CTE reads rows already produced
+    subqueries = {detail.split()[-1] for detail in plan if detail.startswith(('CO-ROUTINE', 'MATERIALIZE'))}
+    return {detail.split()[1] for detail in plan
+            if detail.startswith('SCAN ') and 'USING' not in detail
+            and detail != 'SCAN CONSTANT ROW' and detail.split()[1] not in subqueries}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_model_queries_use_indexes(db_path, statements, name):
+    call, indexes, allowed_scans = CASES[name]
+    call()
+    plans = query_plans(db_path, statements)
+    assert plans
+    for plan in plans:
+        assert full_scans(plan) <= allowed_scans, plan
+    used = ' '.join(detail for plan in plans for detail in plan)
+    for index in indexes:
+        assert f'INDEX {index} ' in used, (index, plans)
+
+
+def test_no_planner_statistics(db_path):
+    # Statistics gathered while the tables hold only sample rows would keep
+    # the planner on full scans as the tables grow, so migrations never ANALYZE
+    conn = connect(db_path)
+    try:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is None
+    finally:
+        conn.close()
+
+
+def test_sizes_listed_small_to_large(db_path):
+    # PR15's sizes were inserted as M, L, S and the (product_id, size) index
+    # returns them as L, M, S; every listing must still show S, M, L
+    conn = connect(db_path)
+    conn.execute("""INSERT INTO orders (order_id, customer_id, order_date, status, store_id)
+                    VALUES ('OR90', 'KH1', '2026-10-18 10:00:00', 'Delivered', 'ST1')""")
+    conn.execute("""INSERT INTO order_details (order_detail_id, order_id, product_id, size_id, quantity, unit_price, total_price)
+                    VALUES ('OD90', 'OR90', 'PR15', 'SZ43', 9, 40000, 360000)""")
+    conn.commit()
+    conn.close()
+
+    _, sizes = ProductModel.get_product_by_id('PR15')
+    assert [row['size'] for row in sizes] == SIZE_ORDER
+    catalog = {product['product_id']: product for product in ProductModel.get_catalog()['products']}
+    assert list(catalog)[:2] == ['PR1', 'PR2']
+    for product in catalog.values():
+        assert [size['size'] for size in product['sizes']] == SIZE_ORDER, product['product_id']
+    top10 = ProductModel.get_top10_products()
+    assert top10[0]['product_id'] == 'PR15'
+    for product in top10:
+        assert [size['size'] for size in product['sizes']] == SIZE_ORDER, product['product_id']
+    options = {product['product_id']: product for product in OrderAdmin.get_order_options()['products']}
+    assert [size['size'] for size in options['PR15']['sizes']] == SIZE_ORDER
+    _, sizes = ProductAdmin.get_product_by_id('PR15')
+    assert [size['size'] for size in sizes] == SIZE_ORDER
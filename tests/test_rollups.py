@@ -0,0 +1,42 @@
+from conftest import connect
+from models.order_admin import OrderAdmin
+from utils.rollups import rebuild_rollups
+
+ROLLUPS = {
+    'product_sales_daily': 'product_id, sale_date, quantity',
+    'product_sales_rollup': 'product_id, total_sold',
+    'order_stats_daily': 'day, store_id, status, order_count, ROUND(sales, 2)',
+    'order_stats_monthly': 'month, store_id, status, order_count, ROUND(sales, 2)',
+}
+
+
+def rollup_rows(db_path):
+    conn = connect(db_path)
+    try:
+        return {table: sorted(tuple(row) for row in conn.execute(f'SELECT {columns} FROM {table}'))
+                for table, columns in ROLLUPS.items()}
+    finally:
+        conn.close()
+
+
+def test_triggers_match_rebuild(db_path):
+    # Orders are created, moved between statuses and stores, edited and
+    # deleted, so every rollup key gains rows and then loses them again
+    first = OrderAdmin.create_order('KH1', 'PR15', 2, 'ST9', status='Delivered')['order_id']
+    second = OrderAdmin.create_order('KH1', 'PR15', 1, 'ST9')['order_id']
+    OrderAdmin.update_order(first, 'KH1', 'PR15', 1, 'ST9', 'Delivered')
+    OrderAdmin.update_order(second, 'KH1', 'PR15', 1, 'ST8', 'Pending')
+    OrderAdmin.mark_cancelled(first)
+    OrderAdmin.delete_order(first)
+    OrderAdmin.mark_delivered(second)
+    OrderAdmin.update_order(second, 'KH1', 'PR14', 1, 'ST8', 'Delivered')
+    OrderAdmin.mark_cancelled(second)
+    OrderAdmin.delete_order(second)
+    OrderAdmin.mark_cancelled('OR3')
+
+    maintained = rollup_rows(db_path)
+    assert not [row for row in maintained['order_stats_daily'] if row[3] == 0]
+    assert not [row for row in maintained['product_sales_daily'] if row[2] == 0]
+    assert not [row for row in maintained['product_sales_rollup'] if row[0] in ('PR14', 'PR15')]
+    rebuild_rollups(db_path)
+    assert maintained == rollup_rows(db_path)
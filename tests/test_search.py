@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import connect
+from models.productadmin import ProductAdmin
+from models.search import Search, match_query
+
+
+def ids(page, key):
+    return [row[key] for row in page['results']]
+
+
+@pytest.mark.parametrize('text', ['cà phê đá', 'ca phe da', 'CA PHE DA', 'cà ph', 'Đá'])
+def test_products_match_with_or_without_diacritics(db_path, text):
+    product_id, _ = ProductAdmin.add_product('Cà Phê Đá', 10, 'Cà phê phin pha đá', 0, 'Coffees', [('M', 29000)], None, None)
+    assert product_id in ids(Search.search_products(text), 'product_id')
+
+
+def test_product_index_follows_edits(db_path):
+    product_id, _ = ProductAdmin.add_product('Trà Đào', 10, 'Trà đào cam sả', 0, 'Drinks', [('M', 35000)], None, None)
+    assert ids(Search.search_products('tra dao'), 'product_id') == [product_id]
+    ProductAdmin.edit_product(product_id, 'Trà Vải', 10, 'Trà vải thiều', 0, 'Drinks', [('M', 35000)], None, None)
+    assert ids(Search.search_products('tra dao'), 'product_id') == []
+    assert ids(Search.search_products('vai'), 'product_id') == [product_id]
+    ProductAdmin.delete_product(product_id)
+    assert ids(Search.search_products('vai'), 'product_id') == []
+
+
+def test_users_and_messages_fold_diacritics(db_path):
+    conn = connect(db_path)
+    conn.execute("""INSERT INTO users (customer_id, first_name, last_name, email, password)
+                    VALUES ('KH50', 'Đặng', 'Thị Hương', 'huong@example.com', 'x')""")
+    conn.execute("""INSERT INTO messages (message_id, user_id, direction, content, is_read)
+                    VALUES ('MS500', 'KH50', 'user_to_admin', 'Đơn hàng của tôi giao chưa ạ?', 0)""")
+    conn.commit()
+    conn.close()
+    assert ids(Search.search_users('dang huong'), 'customer_id') == ['KH50']
+    assert ids(Search.search_messages('don hang giao', 'AD1'), 'message_id') == ['MS500']
+    # Once the conversation belongs to another admin it drops out of AD1's results
+    conn = connect(db_path)
+    conn.execute("INSERT INTO user_admin_assignments (user_id, admin_id) VALUES ('KH50', 'AD2')")
+    conn.commit()
+    conn.close()
+    assert ids(Search.search_messages('don hang', 'AD1'), 'message_id') == []
+    assert ids(Search.search_messages('don hang', 'AD2'), 'message_id') == ['MS500']
+
+
+def test_operators_in_input_are_plain_words(db_path):
+    assert match_query('latte" OR NEAR(*') == '"latte"* "OR"* "NEAR"*'
+    assert match_query('"*') is None
+    assert ids(Search.search_products('latte" OR'), 'product_id') == []
+    assert Search.search_products('   ') == {'results': [], 'next_offset': None}
+
+
+def test_offset_pages(db_path):
+    every = ids(Search.search_products('latte', limit=50), 'product_id')
+    assert set(every) == {'PR8', 'PR11', 'PR12', 'PR14'}
+    first = Search.search_products('latte', limit=3)
+    second = Search.search_products('latte', limit=3, offset=first['next_offset'])
+    assert (first['next_offset'], second['next_offset']) == (3, None)
+    assert ids(first, 'product_id') + ids(second, 'product_id') == every
@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from conftest import connect
+from models.order_admin import OrderAdmin
+from models.order_model import OrderModel
+from models.product_model import ProductModel
+from models.stock_reservation import OutOfStockError
+from utils.cache import catalog_cache
+
+BUYERS = 60
+
+
+def stock(db_path, product_id):
+    conn = connect(db_path)
+    try:
+        return conn.execute('SELECT stock FROM products WHERE product_id = ?', (product_id,)).fetchone()['stock']
+    finally:
+        conn.close()
+
+
+def count(db_path, sql, params=()):
+    conn = connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def served_stock(product_id):
+    levels = ProductModel.get_stock_levels()
+    assert levels[product_id] == ProductModel.get_stock(product_id)
+    return levels[product_id]
+
+
+def test_last_units_sold_once(db_path):
+    # 60 customers check out PR15 (5 left) at the same moment
+    conn = connect(db_path)
+    for n in range(BUYERS):
+        conn.execute("INSERT INTO users (customer_id, first_name, last_name, email, password) VALUES (?, 'Khách', ?, ?, 'x')",
+                     (f'KH{100 + n}', str(n), f'buyer{n}@example.com'))
+        conn.execute("INSERT INTO cart (cart_id, customer_id, product_id, size_id, quantity) VALUES (?, ?, 'PR15', 'SZ43', 1)",
+                     (f'CA{100 + n}', f'KH{100 + n}'))
+    conn.commit()
+    conn.close()
+    start = threading.Barrier(BUYERS)
+    results = []
+
+    def buy(n):
+        start.wait()
+        try:
+            OrderModel.create_order(f'KH{100 + n}', [{'cart_id': f'CA{100 + n}', 'quantity': 1}], '', {}, {})
+            results.append('ok')
+        except OutOfStockError:
+            results.append('out')
+        except Exception as e:
+            results.append(repr(e))
+
+    threads = [threading.Thread(target=buy, args=(n,)) for n in range(BUYERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ['ok'] * 5 + ['out'] * (BUYERS - 5)
+    assert stock(db_path, 'PR15') == 0
+    assert count(db_path, "SELECT COUNT(*) FROM stock_reservations WHERE product_id = 'PR15'") == 5
+    assert count(db_path, "SELECT COUNT(*) FROM order_details WHERE product_id = 'PR15'") == 5
+    # The buyers who lost keep their cart line
+    assert count(db_path, "SELECT COUNT(*) FROM cart WHERE size_id = 'SZ43'") == BUYERS - 5
+
+
+def test_delivered_order_edits_move_stock_once(db_path):
+    assert stock(db_path, 'PR1') == 90
+    order_id = OrderAdmin.create_order('KH1', 'PR1', 2, 'ST1', status='Delivered')['order_id']
+    assert stock(db_path, 'PR1') == 88
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 2, 'ST1', 'Pending')
+    assert stock(db_path, 'PR1') == 88
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 2, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 88
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 5, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 85
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 1, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 89
+    # Moving a delivered order to another product takes from that product
+    OrderAdmin.update_order(order_id, 'KH1', 'PR2', 3, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 90
+    assert stock(db_path, 'PR2') == 47
+    # Sold goods do not come back on cancel or delete
+    OrderAdmin.mark_cancelled(order_id)
+    assert stock(db_path, 'PR2') == 47
+    OrderAdmin.delete_order(order_id)
+    assert stock(db_path, 'PR2') == 47
+
+
+def test_pending_order_edits_and_release(db_path):
+    order_id = OrderAdmin.create_order('KH1', 'PR1', 3, 'ST1')['order_id']
+    assert stock(db_path, 'PR1') == 87
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 1, 'ST1', 'Pending')
+    assert stock(db_path, 'PR1') == 89
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 1, 'ST1', 'Cancelled')
+    assert stock(db_path, 'PR1') == 90
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 4, 'ST1', 'Pending')
+    assert stock(db_path, 'PR1') == 86
+    OrderAdmin.mark_cancelled(order_id)
+    OrderAdmin.mark_cancelled(order_id)
+    assert stock(db_path, 'PR1') == 90
+    other_id = OrderAdmin.create_order('KH1', 'PR1', 2, 'ST1')['order_id']
+    OrderAdmin.delete_order(other_id)
+    assert stock(db_path, 'PR1') == 90
+    assert count(db_path, 'SELECT COUNT(*) FROM stock_reservations') == 0
+
+
+def test_cancelled_order_edited_to_delivered_takes_stock(db_path):
+    order_id = OrderAdmin.create_order('KH1', 'PR1', 3, 'ST1')['order_id']
+    OrderAdmin.mark_cancelled(order_id)
+    assert stock(db_path, 'PR1') == 90
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 3, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 87
+    # Now sold: a later edit moves the difference only, a cancel gives nothing back
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 4, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 86
+    OrderAdmin.mark_cancelled(order_id)
+    assert stock(db_path, 'PR1') == 86
+
+
+def test_orders_without_reservations_leave_stock(db_path):
+    # OR2 and OR3 come from schema.sql, placed before stock was tracked
+    OrderAdmin.update_order('OR2', 'KH1', 'PR1', 4, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR1') == 90
+    OrderAdmin.mark_cancelled('OR3')
+    assert stock(db_path, 'PR2') == 50
+
+
+def test_short_edit_rolls_back(db_path):
+    order_id = OrderAdmin.create_order('KH1', 'PR15', 2, 'ST1', status='Delivered')['order_id']
+    assert stock(db_path, 'PR15') == 3
+    with pytest.raises(OutOfStockError):
+        OrderAdmin.update_order(order_id, 'KH1', 'PR15', 6, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR15') == 3
+    OrderAdmin.update_order(order_id, 'KH1', 'PR15', 5, 'ST1', 'Delivered')
+    assert stock(db_path, 'PR15') == 0
+
+
+def test_orders_move_served_stock_not_catalog(db_path):
+    # Orders change stock only; the cached catalog (which has no stock) stays
+    catalog = ProductModel.get_catalog()
+    version = catalog_cache.version
+    assert 'stock' not in catalog['products'][0]
+    assert served_stock('PR1') == 90
+    order_id = OrderAdmin.create_order('KH1', 'PR1', 3, 'ST1')['order_id']
+    assert served_stock('PR1') == 87
+    OrderAdmin.update_order(order_id, 'KH1', 'PR1', 1, 'ST1', 'Pending')
+    assert served_stock('PR1') == 89
+    OrderAdmin.mark_cancelled(order_id)
+    assert served_stock('PR1') == 90
+    order_id = OrderAdmin.create_order('KH1', 'PR1', 2, 'ST1')['order_id']
+    assert served_stock('PR1') == 88
+    OrderAdmin.delete_order(order_id)
+    assert served_stock('PR1') == 90
+    assert catalog_cache.version == version
+    assert ProductModel.get_catalog() is catalog
@@ -0,0 +1,92 @@
+from conftest import connect
+from models.cart_model import CartModel
+from models.order_model import OrderModel
+from models.product_stock import ProductStock
+from models.store_router import StoreRouter, address_tokens, similarity
+
+# Sample data: ST1..ST9 all in Hanoi, KH1 lives at ST1's address and KH3 has
+# none. ST1 has one pending order; ST9's supplies (45) are below the threshold.
+
+
+def route(db_path, customer_id):
+    conn = connect(db_path)
+    try:
+        return StoreRouter.choose_store(conn.cursor(), customer_id)
+    finally:
+        conn.close()
+
+
+def execute(db_path, sql, params=()):
+    conn = connect(db_path)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def checkout(customer_id):
+    cart_id, _, _ = CartModel.add_to_cart(customer_id, 'PR1', 1, 'SZ2')
+    order_id, _ = OrderModel.create_order(customer_id, [{'cart_id': cart_id, 'quantity': 1}], '', {}, {})
+    return order_id
+
+
+def test_address_tokens_ignore_case_and_diacritics():
+    assert address_tokens('12 Đường Láng, Hà Nội') == {'12', 'duong', 'lang', 'ha', 'noi'}
+    assert address_tokens('12 duong lang HA NOI') == address_tokens('12 Đường Láng, Hà Nội')
+    assert address_tokens(None) == frozenset()
+    assert similarity(address_tokens('123 Main St, Hanoi'), address_tokens('222 Harbor St, Hanoi')) == 2 / 6
+    assert similarity(frozenset(), address_tokens('Hanoi')) == 0.0
+
+
+def test_nearest_store_wins_until_it_is_busy(db_path):
+    assert route(db_path, 'KH1') == 'ST1'
+    for n in range(10):
+        execute(db_path, "INSERT INTO orders (order_id, customer_id, order_date, status, store_id) "
+                         "VALUES (?, 'KH2', '2024-01-01 10:00:00', 'Pending', 'ST1')", (f'OR{100 + n}',))
+    # Eleven pending outweigh the exact match; ST8 shares 'St, Hanoi' with KH1
+    assert route(db_path, 'KH1') == 'ST8'
+    execute(db_path, "UPDATE orders SET status = 'Delivered' WHERE store_id = 'ST1'")
+    assert route(db_path, 'KH1') == 'ST1'
+
+
+def test_default_address_preferred_over_profile(db_path):
+    execute(db_path, "UPDATE users SET user_add = '987 Uptown Rd, Hanoi' WHERE customer_id = 'KH4'")
+    assert route(db_path, 'KH4') == 'ST6'
+    execute(db_path, "INSERT INTO addresses (address_id, customer_id, contact_name, phone, address, is_default) VALUES "
+                     "('AD100', 'KH4', 'Khách', '0900000000', '111 Suburb Dr, Hanoi', 0), "
+                     "('AD101', 'KH4', 'Khách', '0900000000', '222 Harbor St, Hanoi', 1)")
+    assert route(db_path, 'KH4') == 'ST8'
+
+
+def test_exact_match_outweighs_low_stock(db_path):
+    assert route(db_path, 'KH3') == 'ST2'
+    execute(db_path, "INSERT INTO addresses (address_id, customer_id, contact_name, phone, address, is_default) "
+                     "VALUES ('AD100', 'KH3', 'Khách', '0900000000', '333 Valley Rd, Hanoi', 1)")
+    assert route(db_path, 'KH3') == 'ST9'
+
+
+def test_stock_edits_reroute(db_path):
+    assert route(db_path, 'KH3') == 'ST2'
+    # Supplies are cached until a stock edit goes through ProductStock
+    execute(db_path, "UPDATE stock_items SET stock_quantity = 10 WHERE store_id = 'ST2'")
+    assert route(db_path, 'KH3') == 'ST2'
+    ProductStock.edit_stock_item('STK2', 'Skim Milk', 'Dairy', 10, 'ST2')
+    assert route(db_path, 'KH3') == 'ST3'
+    # A store with every supply at zero is skipped even at its own address
+    assert route(db_path, 'KH1') == 'ST1'
+    ProductStock.edit_stock_item('STK1', 'Whole Milk', 'Dairy', 0, 'ST1')
+    assert route(db_path, 'KH1') == 'ST1'
+    ProductStock.edit_stock_item('STK10', 'Oat Milk', 'Dairy Alternative', 0, 'ST1')
+    assert route(db_path, 'KH1') == 'ST8'
+    ProductStock.add_stock_item('Whole Milk', 'Dairy', 100, 'ST1')
+    assert route(db_path, 'KH1') == 'ST1'
+
+
+def test_checkouts_spread_over_stores(db_path):
+    # Each checkout counts the pending orders committed before it
+    conn = connect(db_path)
+    orders = [checkout('KH3') for _ in range(8)]
+    stores = dict(conn.execute('SELECT order_id, store_id FROM orders').fetchall())
+    conn.close()
+    assert [stores[order_id] for order_id in orders] == ['ST2', 'ST3', 'ST4', 'ST5', 'ST6', 'ST7', 'ST8', 'ST1']
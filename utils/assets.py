@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import gzip
+import hashlib
+import mimetypes
+import logging
+
+from flask import current_app, request
+
+from utils.http import file_response
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only gzip variants are built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_ROOT = 'views/templates'
+ASSET_BUILD_DIR = 'build/assets'
+ASSET_MAX_AGE = 31536000
+HASH_LENGTH = 12
+
+# Files under the asset root that get a content-hashed URL; pages (.html) keep theirs
+ASSET_EXTENSIONS = {
+    '.js', '.css', '.map', '.json', '.txt', '.svg', '.ico', '.png', '.jpg', '.jpeg',
+    '.gif', '.webp', '.avif', '.mp4', '.webm', '.woff', '.woff2', '.ttf', '.otf',
+}
+# Text formats worth precompressing; images and video are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.map', '.json', '.txt', '.svg', '.ico', '.ttf', '.otf'}
+# Content-Encoding -> suffix of the precompressed file, preferred first
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+MIN_SAVING = 0.1
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename, digest):
+    # 'js/navbar.js' -> 'js/navbar.3f2a9c1b7e04.js'
+    base, ext = os.path.splitext(filename)
+    return f'{base}.{digest}{ext}'
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class AssetManifest:
+    # Maps each asset under `root` to a name carrying a hash of its content, so
+    # a hashed URL always means the same bytes and can be cached for a year.
+    # Hashes come from the manifest written by `python -m utils.assets` when it
+    # is current, otherwise they are computed once here; a file whose size or
+    # mtime differs from its manifest entry is rehashed, and loses its
+    # precompressed variants until the next build if its content changed.
+    def __init__(self, root=ASSET_ROOT, build_dir=ASSET_BUILD_DIR):
+        self.root = root
+        self.build_dir = os.path.join(build_dir, root.replace('/', '_').replace('\\', '_'))
+        self.entries = {}
+        self._by_hashed = {}
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.build_dir, 'manifest.json')
+
+    def _scan(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in ASSET_EXTENSIONS:
+                    path = os.path.join(directory, name)
+                    yield os.path.relpath(path, self.root).replace(os.sep, '/'), os.stat(path)
+
+    def load(self):
+        built = {}
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                built = json.load(f)
+        entries = {}
+        rehashed = 0
+        for filename, stat in self._scan():
+            entry = built.get(filename)
+            if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+                digest = file_hash(os.path.join(self.root, filename))
+                # Same bytes under a new mtime (checkout, copy) keep their variants
+                encodings = entry['encodings'] if entry and entry['hash'] == digest else []
+                entry = {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'encodings': encodings}
+                rehashed += 1
+            entries[filename] = entry
+        self._set(entries)
+        logger.info("Asset manifest for %s: %s files, %s hashed at startup", self.root, len(entries), rehashed)
+        return self
+
+    def _set(self, entries):
+        self.entries = entries
+        self._by_hashed = {hashed_name(filename, entry['hash']): filename for filename, entry in entries.items()}
+
+    def url_name(self, filename):
+        entry = self.entries.get(filename)
+        return hashed_name(filename, entry['hash']) if entry else filename
+
+    def source_of(self, requested):
+        return self._by_hashed.get(requested)
+
+    def build(self):
+        # Full rehash plus gzip/brotli variants of the text assets, written
+        # under build_dir as <hashed name><suffix>
+        entries = {}
+        for filename, stat in self._scan():
+            path = os.path.join(self.root, filename)
+            digest = file_hash(path)
+            encodings = []
+            if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                for encoding, suffix in ENCODINGS.items():
+                    if encoding == 'br' and brotli is None:
+                        continue
+                    compressed = compress(data, encoding)
+                    if len(compressed) > len(data) * (1 - MIN_SAVING):
+                        continue
+                    target = os.path.join(self.build_dir, hashed_name(filename, digest) + suffix)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'wb') as f:
+                        f.write(compressed)
+                    encodings.append(encoding)
+            entries[filename] = {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'encodings': encodings}
+        os.makedirs(self.build_dir, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        self._set(entries)
+        return entries
+
+    def response(self, requested):
+        # Response for a hashed asset URL, or None when `requested` is not one
+        filename = self.source_of(requested)
+        if filename is None:
+            return None
+        entry = self.entries[filename]
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        path, encoding = os.path.join(self.root, filename), None
+        for candidate in entry['encodings']:
+            if request.accept_encodings[candidate]:
+                encoded = os.path.join(self.build_dir, requested + ENCODINGS[candidate])
+                if os.path.isfile(encoded):
+                    path, encoding = encoded, candidate
+                    break
+        response = file_response(path, mimetype, ASSET_MAX_AGE)
+        response.cache_control.immutable = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+def init_assets(app, root=ASSET_ROOT, endpoints=('serve_assets', 'serve_static')):
+    manifest = AssetManifest(root).load()
+    app.extensions['assets'] = manifest
+
+    # url_for(endpoint, filename=...) for these endpoints emits the hashed name
+    @app.url_defaults
+    def hashed_asset_url(endpoint, values):
+        if endpoint in endpoints and 'filename' in values:
+            values['filename'] = manifest.url_name(values['filename'])
+
+    return manifest
+
+
+def asset_response(filename):
+    return current_app.extensions['assets'].response(filename)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    for root in sys.argv[1:] or [ASSET_ROOT]:
+        entries = AssetManifest(root).build()
+        compressed = sum(1 for entry in entries.values() if entry['encodings'])
+        print(f"{root}: {len(entries)} assets, {compressed} precompressed")
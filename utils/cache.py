@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL = 300
+STORE_CACHE_TTL = 300
+
+
+class VersionedCache:
+    # Entries are tagged with the version they were built from; bump() makes
+    # every older entry stale. The TTL only matters for writes that never call
+    # bump(), such as edits from another process or straight in the database.
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._version = 0
+        self._entries = {}
+        self._version_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self):
+        with self._version_lock:
+            self._version += 1
+            return self._version
+
+    def _fresh(self, entry):
+        if entry is None or entry[0] != self._version:
+            return False
+        return not self.ttl or time.monotonic() - entry[1] < self.ttl
+
+    def get(self, key, loader):
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            return entry[2]
+        # One loader at a time, so a burst of misses runs the query only once
+        with self._load_lock:
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                return entry[2]
+            # Read the version before loading: a bump() that lands mid-load
+            # leaves this entry already stale
+            version = self._version
+            value = loader()
+            self._entries[key] = (version, time.monotonic(), value)
+            logger.debug("Cache entry %s rebuilt at version %s", key, version)
+            return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+catalog_cache = VersionedCache(ttl=CATALOG_CACHE_TTL)
+# Stores and their supplies, for order routing; bumped by stock edits
+store_cache = VersionedCache(ttl=STORE_CACHE_TTL)
+
+
+def init_cache(app):
+    app.config.setdefault('CATALOG_CACHE_TTL', int(os.environ.get('CATALOG_CACHE_TTL', CATALOG_CACHE_TTL)))
+    catalog_cache.ttl = app.config['CATALOG_CACHE_TTL']
+    app.config.setdefault('STORE_CACHE_TTL', int(os.environ.get('STORE_CACHE_TTL', STORE_CACHE_TTL)))
+    store_cache.ttl = app.config['STORE_CACHE_TTL']
@@ -0,0 +1,318 @@
+import os
+import re
+import zlib
+import threading
+import logging
+from collections import OrderedDict
+
+from werkzeug.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are offered as zstd or gzip only
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    # Optional: only recent browsers ask for zstd
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_STREAM_SIZE = 1024 * 1024
+COMPRESS_CACHE_BYTES = 32 * 1024 * 1024
+
+# Types worth compressing; images, video, fonts and event streams pass through
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml', 'text/csv',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+# Preferred first when the client gives several the same weight
+ENCODINGS = [name for name, available in (('br', brotli), ('zstd', zstandard), ('gzip', zlib)) if available]
+
+# (per-request level, level for ETag'd bodies that are compressed once and cached)
+LEVELS = {
+    'br': (4, 9),
+    'zstd': (3, 10),
+    'gzip': (6, 9),
+}
+
+ETAG_SUFFIX = re.compile(r'-(?:%s)"' % '|'.join(ENCODINGS))
+
+
+class Compressor:
+    # Incremental compress()/finish() over the three codecs
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            # wbits 31: gzip header and trailer
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self):
+        # Sends what is buffered so far, for streamed bodies
+        if self.encoding == 'br':
+            return self._obj.flush()
+        if self.encoding == 'zstd':
+            return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress(data, encoding, level):
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def negotiate(accept_encoding):
+    # Highest-q supported coding from Accept-Encoding, or None for identity
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedCache:
+    # LRU of compressed bodies keyed by (strong ETag, encoding), bounded by total size.
+    # A strong ETag names exact bytes, so a hit is the same body compressed earlier.
+    def __init__(self, max_bytes=COMPRESS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class CompressionMiddleware:
+    # Compresses text responses by Accept-Encoding. Bodies up to stream_size are
+    # buffered and sent with a Content-Length; longer ones are compressed chunk
+    # by chunk as the app yields them. Responses that are already encoded
+    # (precompressed assets), partial (206), not a compressible type, marked
+    # no-transform, or smaller than min_size are passed through untouched, so
+    # media keeps its wsgi.file_wrapper body.
+    def __init__(self, app, min_size=COMPRESS_MIN_SIZE, stream_size=COMPRESS_STREAM_SIZE,
+                 cache_bytes=COMPRESS_CACHE_BYTES):
+        self.app = app
+        self.min_size = min_size
+        self.stream_size = stream_size
+        self.cache = CompressedCache(cache_bytes)
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        # Compressed responses carry '"<etag>-<encoding>"'; the app only knows its own tags
+        revalidating = False
+        for key in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH', 'HTTP_IF_RANGE'):
+            if key in environ:
+                value = environ[key]
+                environ[key] = ETAG_SUFFIX.sub('"', value)
+                revalidating |= key == 'HTTP_IF_NONE_MATCH' and f'-{encoding}"' in value
+
+        captured = []
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return written.append
+
+        app_iter = self.app(environ, capture)
+        head, rest = written, None
+        if not captured:
+            # start_response deferred to the first chunk
+            rest = iter(app_iter)
+            head = [next(rest, b'')]
+        status, headers, exc_info = captured
+        headers = Headers(headers)
+
+        if status.startswith('304') and revalidating and headers.get('ETag'):
+            headers['ETag'] = _encoded_etag(headers['ETag'], encoding)
+        if not self._compressible(status, headers):
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            # The app's own iterable when nothing was read ahead, for wsgi.file_wrapper
+            return _Body(app_iter, head, rest or iter(app_iter)) if head else app_iter
+        body = _Body(app_iter, head, rest or iter(app_iter))
+        if not _varies(headers):
+            headers.add('Vary', 'Accept-Encoding')
+
+        etag = headers.get('ETag')
+        cache_key = (etag, encoding) if etag and not etag.startswith('W/') else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                body.close()
+                return self._send(start_response, status, headers, exc_info, encoding, [cached], len(cached))
+
+        length = headers.get('Content-Length', type=int)
+        if length is not None and length < self.min_size:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return body
+
+        # Buffer up to stream_size to learn whether the body is small enough to send whole
+        buffered, size, complete = [], 0, True
+        for chunk in body:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > self.stream_size:
+                complete = False
+                break
+
+        if complete:
+            data = b''.join(buffered)
+            body.close()
+            if len(data) < self.min_size:
+                headers['Content-Length'] = str(len(data))
+                start_response(status, headers.to_wsgi_list(), exc_info)
+                return [data]
+            compressed = compress(data, encoding, LEVELS[encoding][1 if cache_key else 0])
+            if len(compressed) >= len(data):
+                headers['Content-Length'] = str(len(data))
+                start_response(status, headers.to_wsgi_list(), exc_info)
+                return [data]
+            if cache_key:
+                self.cache.put(cache_key, compressed)
+            return self._send(start_response, status, headers, exc_info, encoding, [compressed], len(compressed))
+
+        logger.debug("Streaming %s response for %s", encoding, environ.get('PATH_INFO'))
+        stream = self._stream(body, buffered, Compressor(encoding, LEVELS[encoding][0]))
+        return self._send(start_response, status, headers, exc_info, encoding, stream, None)
+
+    def _compressible(self, status, headers):
+        if not status.startswith('2') or status.startswith('206') or status.startswith('204'):
+            return False
+        if 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return mimetype in COMPRESSIBLE_TYPES
+
+    def _send(self, start_response, status, headers, exc_info, encoding, body, length):
+        headers['Content-Encoding'] = encoding
+        if length is None:
+            headers.pop('Content-Length', None)
+        else:
+            headers['Content-Length'] = str(length)
+        if headers.get('ETag'):
+            headers['ETag'] = _encoded_etag(headers['ETag'], encoding)
+        # Ranges of the identity body no longer line up with what is sent
+        headers.pop('Accept-Ranges', None)
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        return body
+
+    def _stream(self, body, buffered, compressor):
+        try:
+            yield compressor.compress(b''.join(buffered))
+            for chunk in body:
+                # Flushed per chunk, so a slow generator's output still reaches the client
+                data = compressor.compress(chunk) + compressor.flush()
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            body.close()
+
+
+class _Body:
+    # The app iterable with chunks read ahead put back in front; close() reaches the app
+    def __init__(self, app_iter, head, rest):
+        self._app_iter = app_iter
+        self._head = list(head)
+        self._rest = rest
+
+    # A plain iterator rather than a generator: the buffering loop stops
+    # part-way, and an abandoned generator would close the app's iterable
+    # through 'yield from' before _stream() reads the rest of it.
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._head:
+            return self._head.pop(0)
+        return next(self._rest)
+
+    def close(self):
+        close = getattr(self._app_iter, 'close', None)
+        if close is not None:
+            close()
+
+
+def _varies(headers):
+    return any(value.strip().lower() in ('accept-encoding', '*')
+               for vary in headers.getlist('Vary') for value in vary.split(','))
+
+
+def _encoded_etag(etag, encoding):
+    # '"abc"' -> '"abc-gzip"': each encoding of the body is a different representation
+    if ETAG_SUFFIX.search(etag) or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def init_compression(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)))
+    app.config.setdefault('COMPRESS_STREAM_SIZE', int(os.environ.get('COMPRESS_STREAM_SIZE', COMPRESS_STREAM_SIZE)))
+    app.config.setdefault('COMPRESS_CACHE_BYTES', int(os.environ.get('COMPRESS_CACHE_BYTES', COMPRESS_CACHE_BYTES)))
+    middleware = CompressionMiddleware(app.wsgi_app, app.config['COMPRESS_MIN_SIZE'],
+                                       app.config['COMPRESS_STREAM_SIZE'], app.config['COMPRESS_CACHE_BYTES'])
+    app.wsgi_app = middleware
+    app.extensions['compression'] = middleware
+    logger.info("Response compression: %s", ', '.join(ENCODINGS))
+    return middleware
@@ -1,7 +1,228 @@
 import sqlite3
+import os
+import queue
+import random
+import threading
+import time
+import logging
+
+from flask import g, has_app_context
+
+from utils.ids import configure_id_allocator
+from utils.migrations import apply_migrations
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'database.db'
+POOL_SIZE = 8
+POOL_TIMEOUT = 30
+
+# Per-deployment tuning: each key can be overridden in app.config or the environment
+DEFAULT_SETTINGS = {
+    'DB_JOURNAL_MODE': 'WAL',
+    'DB_SYNCHRONOUS': 'NORMAL',
+    'DB_CACHE_SIZE_KB': 16384,
+    'DB_MMAP_SIZE': 134217728,
+    'DB_TEMP_STORE': 'MEMORY',
+    'DB_BUSY_TIMEOUT_MS': 5000,
+    'DB_BUSY_RETRIES': 5,
+    'DB_BUSY_BACKOFF_MS': 50,
+}
+
+
+def load_settings(config=None):
+    settings = {}
+    for key, default in DEFAULT_SETTINGS.items():
+        value = (config or {}).get(key, os.environ.get(key, default))
+        settings[key] = type(default)(value)
+    return settings
+
+
+def is_busy_error(error):
+    return isinstance(error, sqlite3.OperationalError) and (
+        'database is locked' in str(error) or 'database is busy' in str(error)
+    )
+
+
+def retry_on_busy(conn, operation, retries, backoff_ms):
+    # busy_timeout already waits for locks; this covers the cases SQLite reports
+    # immediately (e.g. a stale WAL snapshot upgrading to a write). Only a
+    # statement that opened the transaction itself is safe to replay.
+    attempt = 0
+    while True:
+        started_clean = not conn.in_transaction
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or not started_clean or attempt >= retries:
+                raise
+            if conn.in_transaction:
+                conn.rollback()
+            delay = backoff_ms * (2 ** attempt) / 1000
+            attempt += 1
+            logger.debug("SQLITE_BUSY, retry %s/%s in %.3fs", attempt, retries, delay)
+            time.sleep(delay + random.uniform(0, delay))
+
+
+class RetryingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        conn = self.connection
+        return retry_on_busy(conn, lambda: super(RetryingCursor, self).execute(sql, parameters),
+                             conn.busy_retries, conn.busy_backoff_ms)
+
+    def executemany(self, sql, seq_of_parameters):
+        conn = self.connection
+        seq_of_parameters = list(seq_of_parameters)
+        return retry_on_busy(conn, lambda: super(RetryingCursor, self).executemany(sql, seq_of_parameters),
+                             conn.busy_retries, conn.busy_backoff_ms)
+
+
+class RetryingConnection(sqlite3.Connection):
+    busy_retries = DEFAULT_SETTINGS['DB_BUSY_RETRIES']
+    busy_backoff_ms = DEFAULT_SETTINGS['DB_BUSY_BACKOFF_MS']
+
+    def cursor(self, factory=RetryingCursor):
+        return super().cursor(factory)
+
+    # Connection.execute() does not go through cursor(), so route it explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class PooledConnection:
+    # Handle returned to models: behaves like sqlite3.Connection, close() gives it back to the pool
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+    def close(self):
+        # Safe to call more than once; only the first call returns the connection
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    def __init__(self, database=DATABASE, size=POOL_SIZE, timeout=POOL_TIMEOUT, settings=None):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.settings = settings or load_settings()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        # Connections are reused, so setup and pragmas run once per connection
+        settings = self.settings
+        conn = sqlite3.connect(
+            self.database,
+            timeout=settings['DB_BUSY_TIMEOUT_MS'] / 1000,
+            check_same_thread=False,
+            factory=RetryingConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.busy_retries = settings['DB_BUSY_RETRIES']
+        conn.busy_backoff_ms = settings['DB_BUSY_BACKOFF_MS']
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute(f"PRAGMA busy_timeout = {int(settings['DB_BUSY_TIMEOUT_MS'])}")
+        conn.execute(f"PRAGMA journal_mode = {settings['DB_JOURNAL_MODE']}")
+        conn.execute(f"PRAGMA synchronous = {settings['DB_SYNCHRONOUS']}")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = -{int(settings['DB_CACHE_SIZE_KB'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(settings['DB_MMAP_SIZE'])}")
+        conn.execute(f"PRAGMA temp_store = {settings['DB_TEMP_STORE']}")
+        return conn
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f'Connection pool exhausted ({self.size} connections in use)')
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        return conn
+
+    def release(self, conn):
+        try:
+            # Same as sqlite3.Connection.close(): uncommitted changes are discarded
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error as e:
+            logger.warning("Discarding broken pooled connection: %s", e)
+            conn.close()
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+_pool = ConnectionPool()
+
+
+def configure_pool(database=DATABASE, size=POOL_SIZE, timeout=POOL_TIMEOUT, settings=None):
+    global _pool
+    old_pool, _pool = _pool, ConnectionPool(database, size, timeout, settings)
+    old_pool.close_all()
+    return _pool
+
 
 def get_db_connection():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA foreign_keys = ON')
-    return conn
\ No newline at end of file
+    handle = PooledConnection(_pool, _pool.acquire())
+    if has_app_context():
+        # Tracked so teardown can return handles the caller forgot to close()
+        g.setdefault('_db_handles', []).append(handle)
+    return handle
+
+
+def release_db_connections(exception=None):
+    for handle in g.pop('_db_handles', []):
+        if not handle.closed:
+            logger.debug("Releasing pooled connection left open at teardown")
+            handle.close()
+
+
+def init_db(app):
+    app.config.setdefault('DATABASE', DATABASE)
+    app.config.setdefault('DB_POOL_SIZE', POOL_SIZE)
+    app.config.setdefault('DB_POOL_TIMEOUT', POOL_TIMEOUT)
+    app.config.setdefault('DB_AUTO_MIGRATE', True)
+    if app.config['DB_AUTO_MIGRATE']:
+        apply_migrations(app.config['DATABASE'])
+    configure_pool(
+        app.config['DATABASE'],
+        app.config['DB_POOL_SIZE'],
+        app.config['DB_POOL_TIMEOUT'],
+        load_settings(app.config),
+    )
+    configure_id_allocator(app.config['DATABASE'], app.config.get('DB_ID_BLOCK_SIZES'))
+    app.teardown_appcontext(release_db_connections)
@@ -0,0 +1,101 @@
+import json
+import queue
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+REPLAY_BUFFER_SIZE = 500
+HEARTBEAT_SECONDS = 15
+
+# Inbox channels: every admin listens on ADMINS_CHANNEL (messages from users
+# not yet assigned to anyone) plus their own admin:<id>; a customer listens
+# on user:<id>.
+ADMINS_CHANNEL = 'admins'
+
+
+def admin_channel(admin_id):
+    return f'admin:{admin_id}'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def conversation_channels(user_id, admin_id):
+    # Who can see a conversation: the customer, and its admin or every admin while unassigned
+    return [user_channel(user_id), admin_channel(admin_id) if admin_id else ADMINS_CHANNEL]
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = frozenset(channels)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout=timeout)
+
+
+class EventHub:
+    # In-process pub/sub: publishers are the inbox models (after commit),
+    # subscribers are open SSE responses, each blocked on its own queue, so an
+    # idle client costs a thread and no database work. Recent events are kept
+    # in a bounded buffer so a client reconnecting with Last-Event-ID misses
+    # nothing. Only reaches clients served by the same process.
+    def __init__(self, replay_size=REPLAY_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay_size)
+        self._last_id = 0
+
+    def subscribe(self, channels, last_event_id=None):
+        subscription = Subscription(channels)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event[0] > last_event_id and event[1] & subscription.channels:
+                        subscription.queue.put_nowait(event)
+            self._subscribers.add(subscription)
+        logger.debug("Subscribed to %s, %s open", sorted(subscription.channels), len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        logger.debug("Unsubscribed from %s", sorted(subscription.channels))
+
+    def publish(self, channels, event_type, data):
+        channels = frozenset(channels)
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, channels, event_type, json.dumps(data, ensure_ascii=False))
+            self._recent.append(event)
+            for subscription in self._subscribers:
+                if subscription.channels & channels:
+                    try:
+                        subscription.queue.put_nowait(event)
+                    except queue.Full:
+                        # A stalled client: its stream ends and it reconnects with Last-Event-ID
+                        subscription.overflowed = True
+        logger.debug("Published %s #%s to %s", event_type, event[0], sorted(channels))
+        return event[0]
+
+    def stream(self, subscription, heartbeat=HEARTBEAT_SECONDS):
+        # Server-Sent Events framing; comment lines keep proxies from closing idle streams
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.overflowed:
+                try:
+                    event_id, _, event_type, payload = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+
+inbox_events = EventHub()
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import mimetypes
+
+from flask import Response, request, current_app
+from werkzeug.exceptions import NotFound, RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
+
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+
+def json_body(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def content_etag(body):
+    return hashlib.sha1(body).hexdigest()
+
+
+def cached_json_response(body, etag=None, max_age=0):
+    # Strong ETag over the exact bytes sent; make_conditional() answers a
+    # matching If-None-Match with an empty 304. max_age=0 means "no-cache":
+    # the browser keeps the copy but revalidates it on every use.
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag or content_etag(body))
+    response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+
+def event_stream_response(hub, channels):
+    # The subscription is opened here, before the first byte is sent, so no
+    # event published between the response starting and the generator running
+    # is lost. No app context is kept for the stream: it holds no DB connection.
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    subscription = hub.subscribe(channels, int(last_event_id) if last_event_id.isdigit() else None)
+    response = Response(hub.stream(subscription), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def file_response(path, mimetype=None, max_age=0):
+    # Large-file delivery (video, big images): validators from the file's stat,
+    # single byte ranges answered with 206 so video can seek, and a body that
+    # streams from disk rather than being read into memory
+    stat = os.stat(path)
+    response = Response(mimetype=mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                        direct_passthrough=True)
+    response.content_length = stat.st_size
+    response.last_modified = stat.st_mtime
+    response.set_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    if current_app.config.get('USE_X_SENDFILE'):
+        # USE_X_SENDFILE: the front server (Apache mod_xsendfile, lighttpd)
+        # sends the file and answers ranges itself
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        return response.make_conditional(request)
+    # Advertised on full responses too: browsers only seek video when they see it
+    response.accept_ranges = 'bytes'
+    try:
+        response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
+    if response.status_code == 206:
+        start = response.content_range.start
+        length = response.content_range.stop - start
+    elif response.status_code == 200:
+        start, length = 0, stat.st_size
+    else:
+        # 304 / 412: no body, the file is never opened
+        return response
+    response.response = file_body(request.environ, path, start, length)
+    return response
+
+
+def file_body(environ, path, start, length, chunk_size=MEDIA_CHUNK_SIZE):
+    f = open(path, 'rb')
+    f.seek(start)
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None:
+        # The server's wrapper (gunicorn, mod_wsgi) sends from the current
+        # offset with sendfile() and, per PEP 3333, stops at Content-Length
+        return file_wrapper(f, chunk_size)
+    return _read_chunks(f, length, chunk_size)
+
+
+def _read_chunks(f, length, chunk_size):
+    # At most one chunk per response in memory; closed on exhaustion or disconnect
+    with f:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def send_media(directory, filename, max_age=0):
+    # send_from_directory() with file_response() delivery
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    return file_response(path, max_age=max_age)
@@ -0,0 +1,209 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request, session
+
+from utils.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_TTL = 24 * 3600
+# How long a duplicate waits for the first request before answering 409
+IDEMPOTENCY_WAIT = 15
+# A claim still in flight after this long belonged to a worker that died mid-request
+IDEMPOTENCY_LOCK_TIMEOUT = 120
+PURGE_INTERVAL = 300
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+# Outcomes of IdempotencyStore.begin()
+OWNER, REPLAY, MISMATCH, BUSY = 'owner', 'replay', 'mismatch', 'busy'
+
+
+class IdempotencyStore:
+    # Rows of idempotency_keys (migration 008). The first request claims the
+    # key with a single upsert and stores its response when done; duplicates
+    # wait for that response instead of running the view again. Waiters in
+    # this process are woken by an Event, other processes poll the row.
+    def __init__(self, ttl=IDEMPOTENCY_TTL, wait=IDEMPOTENCY_WAIT, lock_timeout=IDEMPOTENCY_LOCK_TIMEOUT):
+        self.ttl = ttl
+        self.wait = wait
+        self.lock_timeout = lock_timeout
+        self._events = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0
+
+    def _claim(self, scope, key, request_hash):
+        # None when this request now owns the key, otherwise the row that holds it.
+        # An expired row, or an in-flight one past lock_timeout, is taken over.
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute("""
+                INSERT INTO idempotency_keys (scope, idempotency_key, request_hash, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (scope, idempotency_key) DO UPDATE SET
+                    request_hash = excluded.request_hash, status_code = NULL, content_type = NULL,
+                    response_body = NULL, created_at = excluded.created_at, expires_at = excluded.expires_at
+                WHERE idempotency_keys.expires_at < ?
+                   OR (idempotency_keys.status_code IS NULL AND idempotency_keys.created_at < ?)
+            """, (scope, key, request_hash, now, now + self.ttl, now, now - self.lock_timeout))
+            row = None
+            if cursor.rowcount != 1:
+                row = conn.execute("""
+                    SELECT request_hash, status_code, content_type, response_body
+                    FROM idempotency_keys
+                    WHERE scope = ? AND idempotency_key = ?
+                """, (scope, key)).fetchone()
+            conn.commit()
+            return row
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Database error claiming idempotency key: %s", e)
+            raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
+        finally:
+            conn.close()
+
+    def begin(self, scope, key, request_hash):
+        # (OWNER, None): run the request; (REPLAY, row): send the stored response;
+        # (MISMATCH, row): the key was used for a different body; (BUSY, None): still
+        # in flight after `wait` seconds
+        self._purge()
+        deadline = time.monotonic() + self.wait
+        interval = POLL_INTERVAL
+        while True:
+            row = self._claim(scope, key, request_hash)
+            with self._lock:
+                if row is None:
+                    self._events[(scope, key)] = threading.Event()
+                    return OWNER, None
+                event = self._events.get((scope, key))
+            if row['request_hash'] != request_hash:
+                return MISMATCH, row
+            if row['status_code'] is not None:
+                return REPLAY, row
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return BUSY, None
+            if event is not None:
+                event.wait(remaining)
+            else:
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    def complete(self, scope, key, response):
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                UPDATE idempotency_keys
+                SET status_code = ?, content_type = ?, response_body = ?
+                WHERE scope = ? AND idempotency_key = ?
+            """, (response.status_code, response.content_type, response.get_data(), scope, key))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Database error storing idempotent response: %s", e)
+        finally:
+            conn.close()
+            self._wake(scope, key)
+
+    def release(self, scope, key):
+        # The request failed without a result worth replaying: drop the claim so
+        # the next attempt (or a waiting duplicate) runs it afresh
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                DELETE FROM idempotency_keys
+                WHERE scope = ? AND idempotency_key = ? AND status_code IS NULL
+            """, (scope, key))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Database error releasing idempotency key: %s", e)
+        finally:
+            conn.close()
+            self._wake(scope, key)
+
+    def _wake(self, scope, key):
+        with self._lock:
+            event = self._events.pop((scope, key), None)
+        if event is not None:
+            event.set()
+
+    def _purge(self):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL
+        conn = get_db_connection()
+        try:
+            deleted = conn.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (now,)).rowcount
+            conn.commit()
+            if deleted:
+                logger.info("Purged %s expired idempotency keys", deleted)
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning("Could not purge idempotency keys: %s", e)
+        finally:
+            conn.close()
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(view):
+    # Requests without the header run as before. With it, the first response
+    # (2xx or 4xx) is stored for IDEMPOTENCY_TTL and replayed to any retry from
+    # the same user with the same body; 5xx and exceptions free the key again.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} không hợp lệ'}), 400
+        principal = session.get('customer_id') or session.get('admin_id') or ''
+        scope = f'{request.endpoint}:{principal}'
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+
+        outcome, row = idempotency_store.begin(scope, key, request_hash)
+        if outcome == REPLAY:
+            logger.info("Replaying stored response for %s on %s", IDEMPOTENCY_HEADER, scope)
+            response = Response(row['response_body'], status=row['status_code'], content_type=row['content_type'])
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if outcome == MISMATCH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} này đã được dùng cho một yêu cầu khác'}), 422
+        if outcome == BUSY:
+            response = jsonify({'error': 'Yêu cầu trước với cùng khóa vẫn đang được xử lý, vui lòng thử lại'})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            idempotency_store.release(scope, key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            idempotency_store.release(scope, key)
+        else:
+            idempotency_store.complete(scope, key, response)
+        return response
+
+    return wrapper
+
+
+def init_idempotency(app):
+    app.config.setdefault('IDEMPOTENCY_TTL', int(os.environ.get('IDEMPOTENCY_TTL', IDEMPOTENCY_TTL)))
+    app.config.setdefault('IDEMPOTENCY_WAIT', float(os.environ.get('IDEMPOTENCY_WAIT', IDEMPOTENCY_WAIT)))
+    idempotency_store.ttl = app.config['IDEMPOTENCY_TTL']
+    idempotency_store.wait = app.config['IDEMPOTENCY_WAIT']
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'database.db'
+
+# Every table reserves IDs in blocks, so most inserts need no extra statement:
+# a single ID would cost its own write transaction on the allocator connection.
+# Busy tables take larger blocks. A block left unused when the process stops is
+# skipped, so IDs have gaps of up to one block per restart.
+BLOCK_SIZES = {
+    'orders': 32,
+    'order_details': 64,
+    'payments': 32,
+    'messages': 32,
+    'cart': 32,
+    'users': 16,
+    'addresses': 16,
+    'reviews': 16,
+    'favorites': 16,
+    'events': 16,
+    'stock_items': 16,
+    'products': 8,
+    'product_size': 16,
+    'admins': 4,
+    'managers': 4,
+    'stores': 4,
+}
+
+
+class IdAllocator:
+    def __init__(self, database=DATABASE, block_sizes=None, timeout=30):
+        self.database = database
+        self.block_sizes = dict(BLOCK_SIZES if block_sizes is None else block_sizes)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._blocks = {}
+
+    def _reserve(self, conn, name, count):
+        row = conn.execute(
+            'UPDATE id_sequences SET value = value + ? WHERE name = ? RETURNING prefix, value',
+            (count, name)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown id sequence: {name}")
+        prefix, last = row[0], row[1]
+        return prefix, last - count + 1, last
+
+    def next_ids(self, name, count, conn=None):
+        if count <= 0:
+            return []
+        # Inside an open write transaction the reservation must share its fate,
+        # so reserve on the caller's connection instead of using the cache.
+        if conn is not None and conn.in_transaction:
+            prefix, first, last = self._reserve(conn, name, count)
+            return [f"{prefix}{n}" for n in range(first, last + 1)]
+        ids = []
+        with self._lock:
+            prefix, current, last = self._blocks.get(name, (None, 1, 0))
+            while len(ids) < count:
+                if current > last:
+                    if self._conn is None:
+                        # Autocommit: a reserved block is never rolled back and handed out twice
+                        self._conn = sqlite3.connect(self.database, timeout=self.timeout,
+                                                     isolation_level=None, check_same_thread=False)
+                    size = max(self.block_sizes.get(name, 1), count - len(ids))
+                    prefix, current, last = self._reserve(self._conn, name, size)
+                take = min(last - current + 1, count - len(ids))
+                ids.extend(f"{prefix}{n}" for n in range(current, current + take))
+                current += take
+            self._blocks[name] = (prefix, current, last)
+        return ids
+
+    def next_id(self, name, conn=None):
+        return self.next_ids(name, 1, conn)[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._blocks.clear()
+
+
+_allocator = IdAllocator()
+
+
+def configure_id_allocator(database=DATABASE, block_sizes=None):
+    global _allocator
+    old_allocator, _allocator = _allocator, IdAllocator(database, block_sizes)
+    old_allocator.close()
+    return _allocator
+
+
+# Call before the caller opens its write transaction, or pass that connection
+def next_id(name, conn=None):
+    return _allocator.next_id(name, conn)
+
+
+def next_ids(name, count, conn=None):
+    return _allocator.next_ids(name, count, conn)
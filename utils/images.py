@@ -0,0 +1,210 @@
+import os
+import sys
+import posixpath
+import sqlite3
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils.db import get_db_connection, configure_pool, DATABASE
+from utils.cache import catalog_cache
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Optional: without Pillow uploads are stored and served as they are
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WORKERS = 2
+
+# Longest side of each variant, about twice the largest slot it fills:
+# cart / checkout / review thumbnails, product grid cards, product detail view
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 1200,
+}
+
+# Quality targets; AVIF is only written when the installed Pillow can encode it.
+# WebP method 6 saves ~5% over 4 but is up to 50x slower on images with alpha.
+ENCODERS = {
+    'avif': {'format': 'AVIF', 'quality': 55, 'speed': 6},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+# Public URL prefix -> directory the app serves it from, for python -m utils.images
+URL_ROOTS = {
+    '/static/': 'views/static',
+    '/uploads/': 'views/static/Upload',
+    '/reviews_upload/': 'views/static/reviews_upload',
+}
+
+# Every column that holds an uploaded image URL
+SOURCE_QUERIES = [
+    'SELECT image_url FROM products',
+    'SELECT image_url_2 FROM products',
+    'SELECT user_img FROM users',
+    'SELECT review_img FROM reviews',
+]
+
+
+def encodable_formats():
+    Image.init()
+    return [fmt for fmt, options in ENCODERS.items() if options['format'] in Image.SAVE]
+
+
+def variant_url(source_url, variant, fmt):
+    # '/static/Upload/abc.png' -> '/static/Upload/abc.card.webp', next to the original
+    return f'{posixpath.splitext(source_url)[0]}.{variant}.{fmt}'
+
+
+def process_image(path, source_url):
+    base_path = os.path.splitext(path)[0]
+    formats = encodable_formats()
+    rows = []
+    with Image.open(path) as original:
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            # Shrinks to fit, never enlarges
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            # No EXIF, XMP or ICC profile in the output
+            resized.info.clear()
+            for fmt in formats:
+                target = f'{base_path}.{variant}.{fmt}'
+                resized.save(target, **ENCODERS[fmt])
+                rows.append((source_url, variant, fmt, variant_url(source_url, variant, fmt),
+                             resized.width, resized.height, os.path.getsize(target)))
+    record_variants(source_url, rows)
+    return rows
+
+
+def record_variants(source_url, rows):
+    conn = get_db_connection()
+    try:
+        conn.execute('DELETE FROM image_variants WHERE source_url = ?', (source_url,))
+        conn.executemany("""
+            INSERT INTO image_variants (source_url, variant, format, url, width, height, bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("Database error recording variants of %s: %s", source_url, e)
+        raise
+    finally:
+        conn.close()
+    # The catalog JSON carries the variant URLs
+    catalog_cache.bump()
+    logger.info("Processed %s: %s variants", source_url, len(rows))
+
+
+def variant_map(urls):
+    # {source_url: {'thumb': {'webp': url, 'avif': url}, ...}} for the URLs already processed
+    urls = sorted({url for url in urls if url})
+    if not urls:
+        return {}
+    placeholders = ', '.join('?' * len(urls))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT source_url, variant, format, url
+            FROM image_variants
+            WHERE source_url IN ({placeholders})
+        """, urls).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Database error in variant_map: %s", e)
+        raise Exception(f"Lỗi cơ sở dữ liệu: {str(e)}")
+    finally:
+        conn.close()
+    variants = {}
+    for row in rows:
+        variants.setdefault(row['source_url'], {}).setdefault(row['variant'], {})[row['format']] = row['url']
+    return variants
+
+
+def attach_variants(items, field='image_url', key='image_variants'):
+    # Sets item[key] to the variants of item[field], or None while only the original exists
+    variants = variant_map(item.get(field) for item in items)
+    for item in items:
+        item[key] = variants.get(item.get(field))
+    return items
+
+
+class ImagePipeline:
+    # Upload post-processing off the request thread: the controller saves the
+    # original, submits it here and returns. Jobs still queued when the process
+    # exits are lost; python -m utils.images picks up anything left unprocessed.
+    def __init__(self, workers=IMAGE_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, source_url):
+        if Image is None:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='images')
+        logger.debug("Queued %s for processing", source_url)
+        return self._executor.submit(self._run, path, source_url)
+
+    def _run(self, path, source_url):
+        try:
+            return process_image(path, source_url)
+        except Exception as e:
+            # The original stays in use; the worker moves on to the next job
+            logger.error("Image processing failed for %s: %s", source_url, e)
+            return None
+
+
+image_pipeline = ImagePipeline()
+
+
+def init_images(app):
+    app.config.setdefault('IMAGE_WORKERS', int(os.environ.get('IMAGE_WORKERS', IMAGE_WORKERS)))
+    image_pipeline.workers = app.config['IMAGE_WORKERS']
+    if Image is None:
+        logger.warning("Pillow is not installed: uploaded images are served without resized variants")
+
+
+def local_path(url):
+    for prefix in sorted(URL_ROOTS, key=len, reverse=True):
+        if url.startswith(prefix):
+            return os.path.join(URL_ROOTS[prefix], *url[len(prefix):].split('/'))
+    return None
+
+
+def process_existing(database=DATABASE, reprocess=False):
+    configure_pool(database)
+    conn = get_db_connection()
+    try:
+        urls = set()
+        for query in SOURCE_QUERIES:
+            urls.update(row[0] for row in conn.execute(query) if row[0])
+        done = {row[0] for row in conn.execute('SELECT DISTINCT source_url FROM image_variants')}
+    finally:
+        conn.close()
+    futures = []
+    for url in sorted(urls if reprocess else urls - done):
+        path = local_path(url)
+        if path is None or not os.path.isfile(path):
+            logger.warning("Skipping %s: no local file", url)
+            continue
+        futures.append(image_pipeline.submit(path, url))
+    wait(futures)
+    return sum(1 for future in futures if future.result())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if Image is None:
+        sys.exit("Pillow is required: pip install Pillow")
+    args = [arg for arg in sys.argv[1:] if arg != '--all']
+    processed = process_existing(args[0] if args else DATABASE, reprocess='--all' in sys.argv)
+    print(f"Processed {processed} images")
@@ -0,0 +1,145 @@
+import os
+import re
+import sys
+import copy
+import json
+import uuid
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+from flask import g, request, has_request_context
+
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'json'
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# An id set by the front proxy is kept when it looks like one
+REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# LogRecord attributes; anything else on a record came from extra={...}
+RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+_handler = None
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs in the thread that logs, where the request context is still there
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line: time, level, logger, message, request_id, extras, traceback
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', '-') != '-':
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    # The record is handed to the listener thread: merge msg % args and render
+    # the traceback here while they are still live, but leave the formatting
+    # (JSON encoding, timestamps) and the write to the listener. Only records
+    # that passed the level checks get this far.
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    # 'utils.db=DEBUG, werkzeug=WARNING' -> {'utils.db': 'DEBUG', 'werkzeug': 'WARNING'}
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, levels=None, filename=None):
+    # Root logger -> RecordQueueHandler -> QueueListener thread -> stderr (and filename).
+    # Request threads only pay for the level check and a queue put.
+    global _listener, _handler
+    stop_logging()
+    root = logging.getLogger()
+    # Handlers from an earlier basicConfig() would write synchronously
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    formatter = JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT)
+    outputs = [logging.StreamHandler(sys.stderr)]
+    if filename:
+        outputs.append(logging.handlers.WatchedFileHandler(filename, encoding='utf-8'))
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _handler = RecordQueueHandler(log_queue)
+    _handler.addFilter(RequestIdFilter())
+    root.addHandler(_handler)
+    root.setLevel(level)
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    # Drains the queue; registered with atexit so the last records are written
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for output in _listener.handlers:
+            output.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def init_logging(app):
+    app.config.setdefault('LOG_LEVEL', os.environ.get('LOG_LEVEL', LOG_LEVEL).upper())
+    app.config.setdefault('LOG_LEVELS', parse_levels(os.environ.get('LOG_LEVELS', '')))
+    app.config.setdefault('LOG_FORMAT', os.environ.get('LOG_FORMAT', LOG_FORMAT).lower())
+    app.config.setdefault('LOG_FILE', os.environ.get('LOG_FILE'))
+    configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'],
+                      app.config['LOG_LEVELS'], app.config['LOG_FILE'])
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def send_request_id(response):
+        if 'request_id' in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
@@ -0,0 +1,90 @@
+import os
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration version in {directory}")
+    return migrations
+
+
+def get_schema_version(conn):
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(database, directory=MIGRATIONS_DIR):
+    conn = sqlite3.connect(database, timeout=30, isolation_level=None)
+    try:
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        applied = []
+        for version, name, path in list_migrations(directory):
+            with open(path, encoding='utf-8') as f:
+                script = f.read()
+            # BEGIN IMMEDIATE serializes workers starting at the same time; the
+            # version is re-checked under the write lock
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                    conn.execute('ROLLBACK')
+                    continue
+                for statement in split_statements(script):
+                    conn.execute(statement)
+                conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK')
+                logger.error("Migration %s_%s failed: %s", version, name, e)
+                raise
+            applied.append(version)
+            logger.info("Applied migration %s_%s", version, name)
+        return applied
+    finally:
+        conn.close()
+
+
+def split_statements(script):
+    # sqlite3.complete_statement() keeps trigger bodies (BEGIN ... END;) together
+    statements = []
+    buffer = ''
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if strip_comments(buffer):
+                statements.append(buffer.strip())
+            buffer = ''
+    if strip_comments(buffer):
+        raise sqlite3.OperationalError(f"Incomplete SQL statement in migration: {buffer.strip()[:80]}")
+    return statements
+
+
+def strip_comments(sql):
+    return '\n'.join(line for line in sql.splitlines() if not line.strip().startswith('--')).strip()
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    applied = apply_migrations(sys.argv[1] if len(sys.argv) > 1 else 'database.db')
+    print(f"Applied {len(applied)} migration(s)")
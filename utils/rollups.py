@@ -0,0 +1,88 @@
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The rollup tables (migrations 003 and 004), the conversations summary
+# (migration 005) and the search indexes (migration 006) are kept current by
+# triggers. A rebuild is only needed after bulk edits made with triggers
+# disabled, after a VACUUM (which may renumber the rowids the search indexes
+# point at), or to check for drift. Deleting the daily rows and re-inserting
+# them lets the daily -> monthly / all-time triggers refill the coarser tables.
+REBUILD_STATEMENTS = [
+    'DELETE FROM product_sales_rollup',
+    'DELETE FROM product_sales_daily',
+    """
+    INSERT INTO product_sales_daily (product_id, sale_date, quantity)
+    SELECT od.product_id, date(o.order_date), SUM(od.quantity)
+    FROM order_details od
+    JOIN orders o ON o.order_id = od.order_id
+    WHERE o.status = 'Delivered'
+    GROUP BY od.product_id, date(o.order_date)
+    """,
+    'DELETE FROM order_stats_monthly',
+    'DELETE FROM order_stats_daily',
+    """
+    INSERT INTO order_stats_daily (day, store_id, status, order_count, sales)
+    SELECT date(o.order_date), o.store_id, o.status, COUNT(*), COALESCE(SUM(t.sales), 0)
+    FROM orders o
+    LEFT JOIN (SELECT order_id, SUM(total_price) AS sales FROM order_details GROUP BY order_id) t
+        ON t.order_id = o.order_id
+    GROUP BY date(o.order_date), o.store_id, o.status
+    """,
+    'DELETE FROM conversations',
+    """
+    INSERT INTO conversations (user_id, last_message_id, last_timestamp, last_direction, preview,
+                               unread_count_for_admin, unread_count_for_user, assigned_admin_id)
+    SELECT u.customer_id, m.message_id, m.timestamp, m.direction, substr(m.content, 1, 100),
+           (SELECT COUNT(*) FROM messages x WHERE x.user_id = u.customer_id AND x.direction = 'user_to_admin' AND x.is_read = 0),
+           (SELECT COUNT(*) FROM messages x WHERE x.user_id = u.customer_id AND x.direction = 'admin_to_user' AND x.is_read = 0),
+           (SELECT admin_id FROM user_admin_assignments WHERE user_id = u.customer_id)
+    FROM users u
+    JOIN messages m ON m.message_id = (
+        SELECT message_id FROM messages WHERE user_id = u.customer_id ORDER BY timestamp DESC, rowid DESC LIMIT 1
+    )
+    """,
+    # 'đ' is folded as in the migration 006 triggers
+    "INSERT INTO products_fts(products_fts) VALUES ('delete-all')",
+    """
+    INSERT INTO products_fts (rowid, product_name, description, category)
+    SELECT rowid, replace(replace(product_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(description, 'đ', 'd'), 'Đ', 'D'),
+           replace(replace(category, 'đ', 'd'), 'Đ', 'D')
+    FROM products
+    """,
+    "INSERT INTO messages_fts(messages_fts) VALUES ('delete-all')",
+    "INSERT INTO messages_fts (rowid, content) SELECT rowid, replace(replace(content, 'đ', 'd'), 'Đ', 'D') FROM messages",
+    "INSERT INTO users_fts(users_fts) VALUES ('delete-all')",
+    """
+    INSERT INTO users_fts (rowid, first_name, last_name, email, phone)
+    SELECT rowid, replace(replace(first_name, 'đ', 'd'), 'Đ', 'D'), replace(replace(last_name, 'đ', 'd'), 'Đ', 'D'), email, phone
+    FROM users
+    """,
+]
+
+
+def rebuild_rollups(database):
+    conn = sqlite3.connect(database, timeout=30, isolation_level=None)
+    try:
+        conn.execute('PRAGMA foreign_keys = ON')
+        # One write transaction: readers see either the old or the rebuilt tables
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in REBUILD_STATEMENTS:
+                conn.execute(statement)
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            conn.execute('ROLLBACK')
+            logger.error("Rollup rebuild failed: %s", e)
+            raise
+        logger.info("Rebuilt product sales, order stats and conversation rollups and search indexes")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    rebuild_rollups(sys.argv[1] if len(sys.argv) > 1 else 'database.db')
+    print("Rollups rebuilt")
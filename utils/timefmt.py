@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import pytz
+
+LOCAL_TZ_NAME = 'Asia/Ho_Chi_Minh'
+CLOCK_FORMAT = '%I:%M %p'
+DATETIME_FORMAT = '%b %d, %Y - %I:%M %p'
+MEMO_SIZE = 4096
+
+
+@lru_cache(maxsize=None)
+def local_tz():
+    return pytz.timezone(LOCAL_TZ_NAME)
+
+
+# Both display formats stop at the minute, so every timestamp within the same
+# minute (and offset) formats identically: the memo key drops seconds and
+# fractions, which is what makes repeated rows hit the cache.
+def _minute_key(value):
+    # Numbers are UTC epoch seconds, the fast path for pre-normalized storage
+    if isinstance(value, (int, float)):
+        return int(value // 60 * 60)
+    if len(value) < 19 or value[16] != ':':
+        return value
+    # 'YYYY-MM-DD HH:MM' plus the UTC offset, if any
+    if value[-1] == 'Z':
+        return value[:16] + 'Z'
+    if len(value) >= 25 and value[-6] in '+-':
+        return value[:16] + value[-6:]
+    return value[:16]
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _clock(key):
+    if isinstance(key, int):
+        dt = datetime.fromtimestamp(key, timezone.utc)
+    else:
+        # Naive timestamps (datetime.now().isoformat()) are taken as server local time
+        dt = datetime.fromisoformat(key.replace('Z', '+00:00'))
+    return dt.astimezone(local_tz()).strftime(CLOCK_FORMAT)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _datetime(key):
+    if isinstance(key, int):
+        dt = datetime.fromtimestamp(key, local_tz())
+    else:
+        # Stored as local wall time ('YYYY-MM-DD HH:MM:SS'): formatted as is
+        dt = datetime.fromisoformat(key.replace('Z', '+00:00'))
+    return dt.strftime(DATETIME_FORMAT)
+
+
+def format_clock(value):
+    # '09:05 PM' in the shop's timezone, as shown in the inbox
+    return _clock(_minute_key(value))
+
+
+def format_datetime(value):
+    # 'Jun 15, 2025 - 09:05 PM', as shown on the admin order and stock lists
+    return _datetime(_minute_key(value))
+
+
+def format_column(values, formatter=format_datetime):
+    # Batch form for result sets: each distinct value is formatted once
+    formatted = {}
+    result = []
+    for value in values:
+        text = formatted.get(value)
+        if text is None:
+            text = formatted[value] = formatter(value)
+        result.append(text)
+    return result
@@ -54,16 +54,38 @@ const categoryMap = {
     'top10': 'top10'
 };
 
+// Resized variants from the upload pipeline (utils/images.py): thumb, card or
+// detail; the original is used until they have been built
+function variantSrc(variants, size, fallback) {
+    const variant = variants && variants[size];
+    return (variant && variant.webp) || fallback;
+}
+
+function pictureHtml(variants, size, fallback, alt, attrs = '') {
+    const variant = variants && variants[size];
+    const avif = variant && variant.avif ? `<source type="image/avif" srcset="${variant.avif}">` : '';
+    return `<picture>${avif}<img src="${variantSrc(variants, size, fallback)}" alt="${alt}"${attrs}></picture>`;
+}
+
 async function fetchProducts() {
     try {
         console.log('Đang lấy dữ liệu sản phẩm từ /api/products...');
-        const response = await fetch('/api/products', {
-            method: 'GET',
-            headers: { 'Content-Type': 'application/json' }
-        });
+        // The catalog is cached server-side without stock; stock comes separately
+        const [response, stockResponse] = await Promise.all([
+            fetch('/api/products', {
+                method: 'GET',
+                headers: { 'Content-Type': 'application/json' }
+            }),
+            fetch('/api/products/stock', {
+                method: 'GET',
+                headers: { 'Content-Type': 'application/json' }
+            })
+        ]);
         if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+        if (!stockResponse.ok) throw new Error(`HTTP error! Status: ${stockResponse.status}`);
 
         const data = await response.json();
+        const stockLevels = await stockResponse.json();
         console.log('Dữ liệu sản phẩm nhận được:', JSON.stringify(data, null, 2));
 
         let productsData = Array.isArray(data) ? data : data.products;
@@ -93,9 +115,11 @@ async function fetchProducts() {
                 currentPrice: discountedPrice,
                 discount: product.discount || 0,
                 description: product.description || 'Không có mô tả.',
-                defaultImg: product.image_url || 'https://via.placeholder.com/600',
-                hoverImg: product.image_url_2 || product.image_url || 'https://via.placeholder.com/600',
-                stock: product.stock,
+                defaultImg: variantSrc(product.image_variants, 'detail', product.image_url || 'https://via.placeholder.com/600'),
+                hoverImg: product.image_url_2
+                    ? variantSrc(product.image_variants_2, 'detail', product.image_url_2)
+                    : variantSrc(product.image_variants, 'detail', product.image_url || 'https://via.placeholder.com/600'),
+                stock: stockLevels[product.product_id] ?? 0,
                 category: (product.category || 'others').toLowerCase(),
                 priceValue: discountedPrice,
                 sizes: product.sizes.map(s => ({
@@ -173,7 +197,8 @@ async function fetchReviews(productId) {
             rating: review.rating || 0,
             title: review.comment || 'No Title',
             content: review.comment || 'No comment',
-            image: review.review_img || null
+            image: review.review_img || null,
+            imageVariants: review.review_img_variants || null
         }));
     } catch (error) {
         console.error('Lỗi khi lấy đánh giá:', error);
@@ -198,7 +223,7 @@ function displayReviews(productId) {
                 </div>
                 <h3 class="review-title">${review.title}</h3>
                 <p class="review-content">${review.content}</p>
-                ${review.image ? `<img src="${review.image}" alt="Review Image" style="max-width: 100px; margin-top: 10px;">` : ''}
+                ${review.image ? pictureHtml(review.imageVariants, 'thumb', review.image, 'Review Image', ' style="max-width: 100px; margin-top: 10px;"') : ''}
             `;
             reviewsList.appendChild(reviewDiv);
         });
@@ -230,13 +255,19 @@ function updateProductCards(data) {
         card.dataset.price = discountedPrice;
         card.dataset.category = product.category;
         card.dataset.sizes = JSON.stringify(availableSizes);
-        card.dataset.defaultImg = product.image_url || 'https://via.placeholder.com/200';
-        card.dataset.hoverImg = product.image_url_2 || product.image_url || 'https://via.placeholder.com/200';
+        card.dataset.defaultImg = variantSrc(product.image_variants, 'card', product.image_url || 'https://via.placeholder.com/200');
+        card.dataset.hoverImg = product.image_url_2
+            ? variantSrc(product.image_variants_2, 'card', product.image_url_2)
+            : card.dataset.defaultImg;
+        card.dataset.defaultFull = variantSrc(product.image_variants, 'detail', product.image_url || 'https://via.placeholder.com/600');
+        card.dataset.hoverFull = product.image_url_2
+            ? variantSrc(product.image_variants_2, 'detail', product.image_url_2)
+            : card.dataset.defaultFull;
         card.dataset.productId = product.product_id;
         card.dataset.date = new Date().toISOString().split('T')[0];
         card.innerHTML = `
             <div class="image-container">
-                <img src="${product.image_url || 'https://via.placeholder.com/200'}" alt="${product.product_id}">
+                <img src="${card.dataset.defaultImg}" alt="${product.product_id}">
             </div>
             <p>${product.product_name}</p>
             <div class="price">₫${discountedPrice.toLocaleString('vi-VN')}</div>
@@ -277,8 +308,8 @@ function updateProductCards(data) {
 
                 thumbnailList.innerHTML = '';
                 const thumbnails = [
-                    { src: card.dataset.defaultImg, full: card.dataset.defaultImg },
-                    { src: card.dataset.hoverImg, full: card.dataset.hoverImg },
+                    { src: card.dataset.defaultImg, full: card.dataset.defaultFull },
+                    { src: card.dataset.hoverImg, full: card.dataset.hoverFull },
                 ];
                 thumbnails.forEach((thumb, index) => {
                     const img = document.createElement('img');
@@ -404,8 +435,9 @@ async function fetchCart() {
     }
 }
 
-async function updateCart() {
-    cart = await fetchCart();
+// cartData: the cart returned by /api/cart/batch; fetched when not given
+async function updateCart(cartData) {
+    cart = cartData || await fetchCart();
     cartItems.innerHTML = '';
     let total = 0;
 
@@ -422,7 +454,7 @@ async function updateCart() {
             cartItem.className = 'cart-item';
             cartItem.innerHTML = `
                 <input type="checkbox" class="cart-checkbox" data-cart-id="${item.cart_id}" checked>
-                <img src="${item.image_url || 'https://via.placeholder.com/50'}" alt="${item.product_name}">
+                ${pictureHtml(item.image_variants, 'thumb', item.image_url || 'https://via.placeholder.com/50', item.product_name)}
                 <div class="cart-details">
                     <span>${item.product_name} (${item.size}, x${item.quantity})</span>
                     <span>₫${(parseFloat(item.discounted_price) * item.quantity).toLocaleString('vi-VN')}</span>
@@ -438,48 +470,43 @@ async function updateCart() {
     totalPrice.textContent = `Total: ₫${total.toLocaleString('vi-VN')}`;
 }
 
-function addToCartAPI(productId, quantity, sizeId, callback) {
-    if (!sizeId) {
-        callback(new Error('Invalid size selected'));
-        return;
-    }
-    fetch('/api/cart', {
+// Cart changes go through /api/cart/batch: the change and the new cart
+// (data.cart) in one round trip, so no GET /api/cart follows
+function cartBatchAPI(operations, callback) {
+    fetch('/api/cart/batch', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ product_id: productId, quantity: quantity, size_id: sizeId })
+        body: JSON.stringify({ operations: operations })
     })
-    .then(res => {
+    .then(async res => {
         if (res.status === 401) {
             window.location.href = '/login';
             return Promise.reject(new Error('User not logged in'));
         }
-        return res.json();
+        const data = await res.json();
+        if (!res.ok) throw new Error(data.error || `HTTP error! Status: ${res.status}`);
+        return data;
     })
     .then(data => {
-        console.log('API cart response:', data);
+        console.log('API cart batch response:', data);
         callback(null, data);
     })
     .catch(err => {
-        console.error('Error adding to cart:', err);
+        console.error('Error updating cart:', err);
         callback(err);
     });
 }
 
+function addToCartAPI(productId, quantity, sizeId, callback) {
+    if (!sizeId) {
+        callback(new Error('Invalid size selected'));
+        return;
+    }
+    cartBatchAPI([{ op: 'add', product_id: productId, quantity: quantity, size_id: sizeId }], callback);
+}
+
 function removeFromCartAPI(cartId, callback) {
-    fetch('/api/cart/remove', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ cart_id: cartId })
-    })
-    .then(res => res.json())
-    .then(data => {
-        console.log('API remove cart response:', data);
-        callback(null, data);
-    })
-    .catch(err => {
-        console.error('Error removing from cart:', err);
-        callback(err);
-    });
+    cartBatchAPI([{ op: 'remove', cart_id: cartId }], callback);
 }
 
 function buyNowByAPI(productId, quantity, sizeId) {
@@ -487,29 +514,15 @@ function buyNowByAPI(productId, quantity, sizeId) {
         alert('Please select a size!');
         return;
     }
-    addToCartAPI(productId, quantity, sizeId, async (err, data) => {
-        if (!err && data.message === 'Đã thêm vào giỏ hàng') {
-            try {
-                // Kiểm tra giỏ hàng để xác nhận sản phẩm đã được thêm
-                const cartResponse = await fetch('/api/cart', {
-                    method: 'GET',
-                    headers: { 'Content-Type': 'application/json' },
-                    credentials: 'include'
-                });
-                if (!cartResponse.ok) {
-                    throw new Error(`Lỗi khi lấy giỏ hàng: ${cartResponse.status}`);
-                }
-                const cartData = await cartResponse.json();
-                if (cartData.length === 0) {
-                    alert('Giỏ hàng trống! Vui lòng thử lại.');
-                    return;
-                }
-                // Chuyển hướng tới trang checkout
-                window.location.href = '/checkout';
-            } catch (error) {
-                console.error('Lỗi khi kiểm tra giỏ hàng:', error);
-                alert('Lỗi khi kiểm tra giỏ hàng. Vui lòng thử lại!');
+    addToCartAPI(productId, quantity, sizeId, (err, data) => {
+        if (!err) {
+            // Giỏ hàng mới trả về cùng phản hồi, không cần gọi lại /api/cart
+            if (!data.cart || data.cart.length === 0) {
+                alert('Giỏ hàng trống! Vui lòng thử lại.');
+                return;
             }
+            // Chuyển hướng tới trang checkout
+            window.location.href = '/checkout';
         } else if (err && err.message === 'User not logged in') {
             // Không cần alert vì đã chuyển hướng đến trang đăng nhập
         } else {
@@ -635,7 +648,7 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
         addToCartAPI(productId, quantity, sizeId, async (err, data) => {
             if (!err) {
-                await updateCart();
+                await updateCart(data.cart);
                 alert(`Added ${quantity} ${products[productId].title} to cart!`);
                 modal.style.display = 'none';
                 document.body.style.overflow = 'auto';
@@ -693,9 +706,9 @@ document.addEventListener('DOMContentLoaded', async () => {
     cartItems.addEventListener('click', async (e) => {
         if (e.target.classList.contains('remove-cart-item')) {
             const cartId = e.target.dataset.cartId;
-            removeFromCartAPI(cartId, async (err) => {
+            removeFromCartAPI(cartId, async (err, data) => {
                 if (!err) {
-                    await updateCart();
+                    await updateCart(data.cart);
                     alert('Item removed from cart!');
                 } else {
                     alert('Error removing item. Please try again!');
@@ -16,6 +16,9 @@ document.addEventListener('DOMContentLoaded', () => {
     let senderName = 'User';
     let lastMessageNum = 0;
     let pollingInterval = null;
+    let eventSource = null;
+    let olderCursor = null;
+    let newerCursor = null;
 
     // Đảm bảo chatBox ẩn khi khởi tạo
     chatBox.style.display = 'none';
@@ -51,44 +54,88 @@ document.addEventListener('DOMContentLoaded', () => {
             if (!isVisible) {
                 console.log('Mở chatbox, tải tin nhắn');
                 loadMessages(true);
-                startPolling();
+                startEventStream();
             } else {
-                console.log('Đóng chatbox, dừng polling');
-                stopPolling();
+                console.log('Đóng chatbox, đóng kết nối');
+                stopEventStream();
             }
         });
 
-        function loadMessages(fullLoad = false) {
-            fetch(`/user_messages/${userId}`, { credentials: 'include' })
+        // History is paged: the latest page when the chatbox opens, older pages on demand,
+        // and only messages after newerCursor when polling
+        function fetchMessages(params = {}) {
+            const query = new URLSearchParams(params).toString();
+            return fetch(`/user_messages/${userId}${query ? '?' + query : ''}`, { credentials: 'include' })
                 .then(response => {
                     if (!response.ok) throw new Error(`Lỗi tải tin nhắn: ${response.status}`);
                     return response.json();
                 })
                 .then(data => {
                     if (!data.success) throw new Error(data.message);
+                    return data;
+                });
+        }
+
+        function loadMessages(fullLoad = false) {
+            const params = !fullLoad && newerCursor ? { after: newerCursor } : {};
+            fetchMessages(params)
+                .then(data => {
                     const messages = data.messages;
                     console.log('Tin nhắn từ server:', messages);
-                    if (fullLoad) {
+                    if (fullLoad || !newerCursor) {
                         messageList.innerHTML = '';
                         lastMessageNum = 0;
+                        setOlderCursor(data.older_cursor);
                     }
+                    newerCursor = data.newer_cursor;
                     if (messages.length === 0) {
                         console.log('Không có tin nhắn');
                         return;
                     }
                     messages.forEach(msg => {
                         const messageNum = parseInt(msg.message_id.replace('MS', ''));
-                        if (!lastMessageNum || messageNum > lastMessageNum) {
-                            addMessageToList(msg);
-                            lastMessageNum = messageNum;
-                        }
+                        addMessageToList(msg);
+                        if (messageNum > lastMessageNum) lastMessageNum = messageNum;
                     });
                     chatWindow.scrollTop = chatWindow.scrollHeight;
+                    if (data.has_newer) loadMessages();
                 })
                 .catch(error => console.error('Lỗi tải tin nhắn:', error));
         }
 
-        function addMessageToList(msg) {
+        function loadOlderMessages() {
+            if (!olderCursor) return;
+            fetchMessages({ before: olderCursor })
+                .then(data => {
+                    const previousHeight = chatWindow.scrollHeight;
+                    data.messages.slice().reverse().forEach(msg => addMessageToList(msg, true));
+                    setOlderCursor(data.older_cursor);
+                    chatWindow.scrollTop += chatWindow.scrollHeight - previousHeight;
+                })
+                .catch(error => console.error('Lỗi tải tin nhắn:', error));
+        }
+
+        function setOlderCursor(cursor) {
+            olderCursor = cursor;
+            let item = document.getElementById('loadOlderMessages');
+            if (!cursor) {
+                if (item) item.remove();
+                return;
+            }
+            if (!item) {
+                item = document.createElement('li');
+                item.id = 'loadOlderMessages';
+                item.textContent = 'Tải tin nhắn cũ hơn';
+                item.style.cursor = 'pointer';
+                item.style.textAlign = 'center';
+                item.style.textDecoration = 'underline';
+                item.style.marginBottom = '5px';
+                item.addEventListener('click', loadOlderMessages);
+            }
+            messageList.prepend(item);
+        }
+
+        function addMessageToList(msg, prepend = false) {
             const existingMessage = document.querySelector(`li[data-message-id="${msg.message_id}"]`);
             if (existingMessage) {
                 console.log(`Tin nhắn ${msg.message_id} đã tồn tại`);
@@ -99,8 +146,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
             const li = document.createElement('li');
             li.dataset.messageId = msg.message_id;
+            li.dataset.direction = msg.direction;
             const displayName = msg.sender_name || (msg.direction === 'user_to_admin' ? senderName : 'Admin');
             li.textContent = `${displayName}: ${msg.content} (${msg.time})`;
+            if (msg.direction === 'user_to_admin' && msg.is_read) {
+                li.dataset.read = '1';
+                li.textContent += ' ✓';
+            }
             li.style.backgroundColor = msg.direction === 'user_to_admin' ? '#d1e7dd' : '#f8d7da';
             li.style.marginBottom = '5px';
             li.style.padding = '8px';
@@ -111,7 +163,12 @@ document.addEventListener('DOMContentLoaded', () => {
             li.style.marginRight = msg.direction === 'user_to_admin' ? '10px' : 'auto';
             li.style.display = 'block';
             li.style.visibility = 'visible';
-            messageList.appendChild(li);
+            if (prepend) {
+                const olderItem = document.getElementById('loadOlderMessages');
+                messageList.insertBefore(li, olderItem ? olderItem.nextSibling : messageList.firstChild);
+            } else {
+                messageList.appendChild(li);
+            }
             console.log(`Thêm tin nhắn thành công: ${msg.message_id}`);
         }
 
@@ -155,6 +212,43 @@ document.addEventListener('DOMContentLoaded', () => {
             messageInput.value = '';
         }
 
+        // Server push while the chatbox is open: new messages and read receipts
+        function startEventStream() {
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+            if (eventSource) eventSource.close();
+            eventSource = new EventSource(`/user_messages/${userId}/stream`, { withCredentials: true });
+            eventSource.addEventListener('message', (e) => {
+                const msg = JSON.parse(e.data);
+                if (msg.direction === 'admin_to_user') {
+                    // Fetching the reply through /user_messages marks it as read
+                    loadMessages();
+                    return;
+                }
+                addMessageToList(msg);
+                const messageNum = parseInt(msg.message_id.replace('MS', ''));
+                if (messageNum > lastMessageNum) lastMessageNum = messageNum;
+                chatWindow.scrollTop = chatWindow.scrollHeight;
+            });
+            eventSource.addEventListener('read', (e) => {
+                if (JSON.parse(e.data).direction !== 'user_to_admin') return;
+                messageList.querySelectorAll('li[data-direction="user_to_admin"]:not([data-read])').forEach(li => {
+                    li.dataset.read = '1';
+                    li.textContent += ' ✓';
+                });
+            });
+        }
+
+        function stopEventStream() {
+            if (eventSource) {
+                eventSource.close();
+                eventSource = null;
+            }
+            stopPolling();
+        }
+
         function startPolling() {
             if (pollingInterval) clearInterval(pollingInterval);
             pollingInterval = setInterval(() => {